@@ -1,8 +1,110 @@
-from typing import Tuple, Dict
+from typing import Tuple, Dict, List, Optional
+import argparse
+import csv
+import json
+import os
 import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_right
+from itertools import islice, repeat
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; batches fall back to the scalar methods
+    np = None
+
+INCHES_TO_METERS = 0.0254
+POUNDS_TO_KG = 0.453592
+
+# Rows read, classified and written at a time by the batch command
+BATCH_CHUNK_ROWS = 100000
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+class CategoryScheme:
+    """
+    A category table compiled into sorted breakpoints: category i covers
+    breakpoints[i] <= value < breakpoints[i + 1], so finding a category is a
+    binary search (bisect for one value, numpy.searchsorted for an array)
+    instead of a scan over every range. The ranges must meet end to end.
+    """
+
+    def __init__(self, categories: Dict[str, Tuple[float, float]], name: str = 'custom',
+                 info: Optional[Dict[str, Dict]] = None):
+        ranges = []
+        for category, (lower, upper) in categories.items():
+            try:
+                lower, upper = float(lower), float('inf') if upper is None else float(upper)
+            except (TypeError, ValueError):
+                raise ValueError(f"Category {category!r} needs numeric bounds, got [{lower!r}, {upper!r}]") from None
+            if not lower < upper:
+                raise ValueError(f"Category {category!r} has an empty range [{lower}, {upper})")
+            ranges.append((lower, upper, category))
+        if not ranges:
+            raise ValueError("A category scheme needs at least one category")
+        ranges.sort()
+        for (_, end, before), (start, _, after) in zip(ranges, ranges[1:]):
+            if start > end:
+                raise ValueError(f"Gap between {before!r} (ends at {end:g}) and {after!r} (starts at {start:g})")
+            if start < end:
+                raise ValueError(f"{before!r} (ends at {end:g}) overlaps {after!r} (starts at {start:g})")
+        self.name = name
+        self.info = info or {}
+        self.categories = [category for _, _, category in ranges]
+        self.breakpoints = [lower for lower, _, _ in ranges] + [ranges[-1][1]]
+        self._lowers = self.breakpoints[:-1]
+        self._upper = self.breakpoints[-1]
+        self._lower_array = np.array(self._lowers) if np is not None else None
+
+    @classmethod
+    def load(cls, path: str) -> 'CategoryScheme':
+        """
+        Load a scheme from a JSON file of the form
+        {"name": ..., "categories": {category: [lower, upper], ...}}, where an
+        upper bound of null means no limit. A category may instead be an
+        object with a "range" plus "name", "risks" and "recommendations" to
+        show for it.
+        """
+        with open(path, 'r') as f:
+            config = json.load(f)
+        if not isinstance(config, dict) or not isinstance(config.get('categories'), dict):
+            raise ValueError(f"{path} has no 'categories' table")
+        ranges, info = {}, {}
+        for category, entry in config['categories'].items():
+            if isinstance(entry, dict):
+                info[category] = {key: entry[key] for key in ('name', 'risks', 'recommendations') if key in entry}
+                entry = entry.get('range')
+            if not isinstance(entry, list) or len(entry) != 2:
+                raise ValueError(f"Category {category!r} in {path} needs a [lower, upper] range")
+            lower, upper = entry
+            if not _is_number(lower) or not (upper is None or _is_number(upper)):
+                raise ValueError(f"Category {category!r} in {path} needs a numeric lower bound and a "
+                                 f"numeric or null upper bound, got {json.dumps(entry)}")
+            ranges[category] = tuple(entry)
+        return cls(ranges, config.get('name', os.path.splitext(os.path.basename(path))[0]), info)
+
+    def ranges(self) -> Dict[str, Tuple[float, float]]:
+        """The scheme as {category: (lower, upper)}, in order"""
+        return {category: (lower, upper) for category, lower, upper
+                in zip(self.categories, self.breakpoints, self.breakpoints[1:])}
+
+    def index(self, value: float) -> int:
+        """Index of the category containing value, or -1 if no category does"""
+        i = bisect_right(self._lowers, value) - 1
+        return i if i >= 0 and value < self._upper else -1
+
+    def index_many(self, values):
+        """index() for a whole array at once"""
+        values = np.asarray(values, dtype=np.float64)
+        codes = np.searchsorted(self._lower_array, values, side='right').astype(np.int16) - 1
+        codes[~(values < self._upper)] = -1  # also catches NaN
+        return codes
 
 class BMICalculator:
-    def __init__(self):
+    def __init__(self, scheme: Optional[CategoryScheme] = None):
         # BMI category ranges
         self.bmi_categories = {
             'severe_underweight': (0, 16),
@@ -135,6 +237,20 @@ class BMICalculator:
             }
         }
 
+        # Compiled once; lookups go through the scheme's breakpoints
+        self.scheme = scheme or CategoryScheme(self.bmi_categories, 'who')
+        if scheme is not None:
+            self.bmi_categories = scheme.ranges()
+            for category in scheme.categories:
+                info = self.health_info.get(category, {})
+                self.health_info[category] = {
+                    'name': scheme.info.get(category, {}).get('name',
+                            info.get('name', category.replace('_', ' ').title())),
+                    'risks': scheme.info.get(category, {}).get('risks', info.get('risks', [])),
+                    'recommendations': scheme.info.get(category, {}).get('recommendations',
+                                       info.get('recommendations', [])),
+                }
+
     def get_valid_measurement(self, prompt: str, unit: str) -> float:
         """Get and validate user input for measurements"""
         while True:
@@ -150,7 +266,7 @@ class BMICalculator:
     def convert_height(self, feet: float, inches: float) -> float:
         """Convert height from feet/inches to meters"""
         total_inches = (feet * 12) + inches
-        return total_inches * 0.0254
+        return total_inches * INCHES_TO_METERS
 
     def get_height(self, unit_system: str) -> float:
         """Get height input based on unit system"""
@@ -168,7 +284,7 @@ class BMICalculator:
             weight = self.get_valid_measurement("Enter weight (in kilograms): ", "weight")
         else:
             pounds = self.get_valid_measurement("Enter weight (in pounds): ", "weight")
-            weight = pounds * 0.453592
+            weight = pounds * POUNDS_TO_KG
         return weight
 
     def calculate_bmi(self, height: float, weight: float) -> float:
@@ -177,10 +293,70 @@ class BMICalculator:
 
     def get_bmi_category(self, bmi: float) -> str:
         """Determine BMI category"""
-        for category, (lower, upper) in self.bmi_categories.items():
-            if lower <= bmi < upper:
-                return category
-        return 'obese_class_3'  # Default for any BMI above highest range
+        index = self.scheme.index(bmi)
+        if index < 0:
+            raise ValueError(f"BMI {bmi} is outside the {self.scheme.name} category scheme")
+        return self.scheme.categories[index]
+
+    @property
+    def category_keys(self) -> List[str]:
+        """Category names in order of BMI, as indexed by calculate_many"""
+        return self.scheme.categories
+
+    def calculate_many(self, heights, weights, unit_system: str = 'metric', inches=None) -> Tuple:
+        """
+        Calculate BMI and category for many people at once.
+
+        For 'metric', heights are in meters and weights in kilograms. For
+        'imperial', heights are in feet (plus `inches`, if given) and weights
+        in pounds. With NumPy the whole batch is converted, divided and
+        classified as arrays; without it each row goes through the scalar
+        methods.
+
+        Returns:
+            tuple: (BMIs, category indexes into category_keys). A row with a
+                   missing, non-positive or non-numeric measurement gets a
+                   NaN BMI and index -1, as does a BMI the scheme does not
+                   cover.
+        """
+        if unit_system not in ('metric', 'imperial'):
+            raise ValueError(f"Unknown unit system {unit_system!r}")
+        if np is None:
+            return self._calculate_many_scalar(heights, weights, unit_system, inches)
+        height = _float_array(heights)
+        weight = _float_array(weights)
+        if unit_system == 'imperial':
+            height = height * 12 + (_float_array(inches) if inches is not None else 0)
+            height *= INCHES_TO_METERS
+            weight = weight * POUNDS_TO_KG
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bmi = weight / (height * height)
+            invalid = ~((height > 0) & (weight > 0) & np.isfinite(bmi))
+        bmi[invalid] = np.nan
+        codes = self.scheme.index_many(bmi)
+        codes[invalid] = -1
+        return bmi, codes
+
+    def _calculate_many_scalar(self, heights, weights, unit_system: str, inches) -> Tuple:
+        bmis, codes = array('d'), array('h')
+        for height, weight, extra in zip(heights, weights, repeat(0) if inches is None else inches):
+            try:
+                height, weight, extra = float(height), float(weight), float(extra)
+                if unit_system == 'imperial':
+                    height = self.convert_height(height, extra)
+                    weight = weight * POUNDS_TO_KG
+                if not (height > 0 and weight > 0):
+                    raise ValueError
+                bmi = self.calculate_bmi(height, weight)
+                if bmi != bmi or bmi == float('inf'):
+                    raise ValueError
+            except (TypeError, ValueError):
+                bmis.append(float('nan'))
+                codes.append(-1)
+                continue
+            bmis.append(bmi)
+            codes.append(self.scheme.index(bmi))
+        return bmis, codes
 
     def display_results(self, bmi: float, category: str):
         """Display BMI results and health information"""
@@ -222,13 +398,248 @@ class BMICalculator:
 
         # Calculate and display results
         bmi = self.calculate_bmi(height, weight)
-        category = self.get_bmi_category(bmi)
+        try:
+            category = self.get_bmi_category(bmi)
+        except ValueError:
+            print(f"\nYour BMI: {bmi:.1f}")
+            lowest, highest = self.scheme.breakpoints[0], self.scheme.breakpoints[-1]
+            covers = f"{lowest:g} and over" if highest == float('inf') else f"{lowest:g} to {highest:g}"
+            print(f"This is outside the {self.scheme.name} scheme, which covers BMIs of {covers}.")
+            return
         self.display_results(bmi, category)
 
-if __name__ == "__main__":
+def _float_array(values):
+    """Values as a float64 array; anything that is not a number becomes NaN"""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([_to_float(value) for value in values], dtype=np.float64)
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+def batch_file(calculator: BMICalculator, source: str, output: Optional[str] = None,
+               unit_system: str = 'metric', height_column: str = 'height', weight_column: str = 'weight',
+               inches_column: Optional[str] = None, chunk_size: int = BATCH_CHUNK_ROWS) -> Dict[str, int]:
+    """
+    Calculate BMI for every row of a CSV file with a header row, chunk_size
+    rows at a time, so memory stays bounded however long the file is. If
+    output is given, the rows are copied there with 'bmi' and 'category'
+    columns added.
+
+    Returns:
+        dict: Number of rows in each category, plus 'invalid'
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be at least 1, got {chunk_size}")
+    keys = calculator.category_keys
+    counts = [0] * (len(keys) + 1)  # the last slot counts invalid rows
+    with open(source, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        columns = []
+        for name in (height_column, weight_column, inches_column):
+            if name is not None and name not in header:
+                raise ValueError(f"{source} has no {name!r} column")
+            columns.append(header.index(name) if name is not None else None)
+        out = open(output, 'w', newline='') if output else None
+        try:
+            writer = csv.writer(out) if out else None
+            if writer:
+                writer.writerow(header + ['bmi', 'category'])
+            while True:
+                rows = list(islice(reader, chunk_size))
+                if not rows:
+                    break
+                values = [[row[i] if i < len(row) else '' for row in rows] if i is not None else None
+                          for i in columns]
+                bmis, codes = calculator.calculate_many(values[0], values[1], unit_system, values[2])
+                if np is not None:
+                    tally = np.bincount(np.asarray(codes, dtype=np.int64) % (len(keys) + 1),
+                                        minlength=len(keys) + 1)
+                    counts = [total + int(n) for total, n in zip(counts, tally)]
+                    bmis, codes = bmis.tolist(), codes.tolist()
+                else:
+                    for code in codes:
+                        counts[code] += 1
+                if writer:
+                    writer.writerows(row + (['', 'invalid'] if code < 0 else [f"{bmi:.1f}", keys[code]])
+                                     for row, bmi, code in zip(rows, bmis, codes))
+        finally:
+            if out:
+                out.close()
+    return dict(zip(keys + ['invalid'], counts))
+
+def run_batch(calculator: BMICalculator, args) -> None:
+    """The batch command: classify a CSV file and print how many rows fell in each category"""
+    start = time.perf_counter()
+    try:
+        counts = batch_file(calculator, args.source, args.output, args.units, args.height_column,
+                            args.weight_column, args.inches_column, args.chunk_size)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    for category, count in counts.items():
+        name = calculator.health_info[category]['name'] if category in calculator.health_info else 'Invalid'
+        print(f"{name:<22} {count:>12,} {count / total * 100 if total else 0:>6.1f}%")
+    print(f"{total:,} rows in {elapsed:.2f}s ({total / elapsed:,.0f} rows/sec)")
+
+def synthetic_population(n: int, seed: int = 1) -> Tuple[List[float], List[float]]:
+    """Heights (m) and weights (kg) of n made-up adults, for benchmarks"""
+    import random
+    rng = random.Random(seed)
+    heights = [rng.gauss(1.70, 0.10) for _ in range(n)]
+    weights = [max(rng.gauss(75, 16), 30) for _ in range(n)]
+    return heights, weights
+
+def benchmark_batch() -> None:
+    """Rows/sec of calculate_many and the batch command against looping the scalar methods"""
     calculator = BMICalculator()
+    size = 1000000
+    heights, weights = synthetic_population(size)
+    feet = [height / INCHES_TO_METERS / 12 for height in heights]
+    pounds = [weight / POUNDS_TO_KG for weight in weights]
+
+    def scalar_metric():
+        for height, weight in zip(heights, weights):
+            calculator.get_bmi_category(calculator.calculate_bmi(height, weight))
+
+    def scalar_imperial():
+        for height, weight in zip(feet, pounds):
+            calculator.get_bmi_category(calculator.calculate_bmi(calculator.convert_height(height, 0),
+                                                                 weight * POUNDS_TO_KG))
+
+    cases = [("scalar loop, metric", scalar_metric),
+             ("scalar loop, imperial", scalar_imperial),
+             ("calculate_many, metric lists", lambda: calculator.calculate_many(heights, weights)),
+             ("calculate_many, imperial lists", lambda: calculator.calculate_many(feet, pounds, 'imperial'))]
+    if np is not None:
+        height_array, weight_array = np.array(heights), np.array(weights)
+        cases.append(("calculate_many, metric arrays",
+                      lambda: calculator.calculate_many(height_array, weight_array)))
+    engine = "NumPy" if np is not None else "no NumPy, scalar fallback"
+    print(f"{size:,} people ({engine}):")
+    for name, function in cases:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<34} {size / elapsed:>14,.0f} rows/sec")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "screening.csv")
+        with open(source, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'height', 'weight'])
+            writer.writerows((i, f"{height:.2f}", f"{weight:.1f}")
+                             for i, (height, weight) in enumerate(zip(heights, weights)))
+        for name, output in (("batch CSV, summary only", None),
+                             ("batch CSV, writing results", os.path.join(tmp, "results.csv"))):
+            start = time.perf_counter()
+            batch_file(calculator, source, output)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<34} {size / elapsed:>14,.0f} rows/sec")
+
+def benchmark_categories() -> None:
+    """Categorising 10,000,000 BMIs: range scan vs bisect, and per-category masks vs searchsorted"""
+    import random
+    size = 10000000
+    who = CategoryScheme(BMICalculator().bmi_categories, 'who')
+    # A 64-band scheme shows how each approach grows with the number of categories
+    fine = CategoryScheme({f"band_{i}": (10 + i * 0.5, 10 + (i + 1) * 0.5 if i < 63 else None) for i in range(64)},
+                          'fine')
+    if np is not None:
+        values = np.random.default_rng(1).normal(26, 6, size).clip(10.5, None)
+        values_list = values.tolist()
+    else:
+        rng = random.Random(1)
+        values_list = [max(rng.gauss(26, 6), 10.5) for _ in range(size)]
+
+    def scan(scheme):
+        ranges = list(scheme.ranges().items())
+        def run():
+            for value in values_list:
+                for category, (lower, upper) in ranges:
+                    if lower <= value < upper:
+                        break
+        return run
+
+    def masks(scheme):
+        def run():
+            codes = np.full(size, -1, dtype=np.int16)
+            for i, (lower, upper) in enumerate(scheme.ranges().values()):
+                codes[(values >= lower) & (values < upper)] = i
+            return codes
+        return run
+
+    engine = "NumPy" if np is not None else "no NumPy, scalar lookups only"
+    print(f"{size:,} BMI values ({engine}):")
+    print(f"  {'scheme':<6} {'method':<28} {'time':>8} {'values/sec':>16}")
+    for scheme in (who, fine):
+        cases = [("range scan loop", scan(scheme)),
+                 ("bisect loop", lambda: [scheme.index(value) for value in values_list])]
+        if np is not None:
+            cases += [("mask per category (NumPy)", masks(scheme)),
+                      ("searchsorted (NumPy)", lambda: scheme.index_many(values))]
+            assert (masks(scheme)() == scheme.index_many(values)).all()
+        for name, function in cases:
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+            print(f"  {scheme.name:<6} {name:<28} {elapsed:>7.2f}s {size / elapsed:>16,.0f}")
+
+BENCHMARKS = {
+    'batch': benchmark_batch,
+    'categories': benchmark_categories,
+}
+
+def positive_int(text: str) -> int:
+    """argparse type for counts that must be at least 1"""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer {text!r}") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calculate BMI interactively or for a whole CSV file")
+    parser.add_argument("--scheme", help="JSON file with custom BMI categories (default: WHO)")
+    subparsers = parser.add_subparsers(dest="command")
+    batch_parser = subparsers.add_parser("batch", help="Calculate BMI for every row of a CSV file")
+    batch_parser.add_argument("source", help="CSV file with a header row")
+    batch_parser.add_argument("-o", "--output", help="Write the rows with 'bmi' and 'category' columns added")
+    batch_parser.add_argument("--units", choices=["metric", "imperial"], default="metric",
+                              help="metric: meters and kilograms; imperial: feet (and inches) and pounds")
+    batch_parser.add_argument("--height-column", default="height", help="Height column (default: height)")
+    batch_parser.add_argument("--weight-column", default="weight", help="Weight column (default: weight)")
+    batch_parser.add_argument("--inches-column", help="Extra inches column, for imperial heights in feet")
+    batch_parser.add_argument("--chunk-size", type=positive_int, default=BATCH_CHUNK_ROWS,
+                              help=f"Rows per chunk (default: {BATCH_CHUNK_ROWS:,})")
+    bench_parser = subparsers.add_parser("benchmark", help="Run a performance benchmark")
+    bench_parser.add_argument("name", choices=sorted(BENCHMARKS), help="Benchmark to run")
+
+    args = parser.parse_args()
+    if args.command == "benchmark":
+        return BENCHMARKS[args.name]()
+    try:
+        scheme = CategoryScheme.load(args.scheme) if args.scheme else None
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    calculator = BMICalculator(scheme)
+    if args.command == "batch":
+        return run_batch(calculator, args)
+    calculator.run()
+
+if __name__ == "__main__":
     try:
-        calculator.run()
+        main()
     except KeyboardInterrupt:
         print("\nProgram terminated by user.")
         sys.exit(0)
@@ -1,89 +1,2219 @@
+import html
+import io
 import json
-from datetime import datetime
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from datetime import date as Date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN, ROUND_HALF_UP
 from pathlib import Path
 from typing import Dict, List, Optional
 import calendar
+import csv
+import sqlite3
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+# Expenses per journal write / SQLite transaction when importing
+IMPORT_BATCH_SIZE = 10000
+
+# The journal is compacted into the snapshot once it holds this many entries,
+# or as many entries as the snapshot, whichever is larger
+COMPACT_MIN_ENTRIES = 10000
+
+# Query results kept by each tracker's LRU cache
+QUERY_CACHE_SIZE = 256
+
+CATEGORIES = [
+    "Food", "Transportation", "Housing", "Utilities",
+    "Entertainment", "Shopping", "Healthcare", "Other"
+]
+
+# Expenses are stored in cents of the base currency
+BASE_CURRENCY = "USD"
+
+# Digits after the decimal point in each currency's minor unit (ISO 4217)
+CURRENCY_MINOR_UNITS = {
+    "USD": 2, "EUR": 2, "GBP": 2, "CHF": 2, "CAD": 2, "AUD": 2, "NZD": 2, "SEK": 2,
+    "NOK": 2, "DKK": 2, "PLN": 2, "CNY": 2, "INR": 2, "MXN": 2, "BRL": 2, "ZAR": 2,
+    "JPY": 0, "KRW": 0, "HUF": 2, "BHD": 3, "KWD": 3, "OMR": 3,
+}
+
+_QUANTA = {digits: Decimal(1).scaleb(-digits) for digits in set(CURRENCY_MINOR_UNITS.values())}
+
+def to_minor_units(amount, digits: int = 2) -> int:
+    """
+    Convert an amount (float, int, numeric string or Decimal) to an integer
+    number of minor units, e.g. cents, exactly and rounding half up.
+
+    Floats that already hold a whole number of cents (everything the journal
+    and snapshots contain) take a fast path. Anything else goes through
+    Decimal, so 1.005 becomes 101 cents rather than the 100 that
+    round(1.005 * 100) gives.
+
+    Raises:
+        ValueError: If the amount is not a finite number
+    """
+    if type(amount) is float and math.isfinite(amount):
+        scaled = amount * 10 ** digits
+        minor = round(scaled)
+        if abs(scaled - minor) < 1e-6:
+            return minor
+        amount = repr(amount)
+    try:
+        quantum = _QUANTA.get(digits) or Decimal(1).scaleb(-digits)
+        return int(Decimal(amount).quantize(quantum, ROUND_HALF_UP).scaleb(digits))
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Invalid amount {amount!r}") from None
+
+# Dates are handled as day ordinals (datetime.toordinal). Text dates seen so
+# far are cached in both directions, so parsing and formatting are usually
+# one dict lookup.
+_DATE_CACHE_SIZE = 100000
+_day_of_text: Dict[str, int] = {}
+_month_starts: Dict[tuple, int] = {}
+
+class _DateText(dict):
+    """Day ordinal -> YYYY-MM-DD, formatted once per distinct day"""
+
+    def __missing__(self, day: int) -> str:
+        text = self[day] = Date.fromordinal(day).isoformat()
+        return text
+
+_text_of_day = _DateText()
+
+def parse_date(text: str) -> int:
+    """
+    Day ordinal of a YYYY-MM-DD date, accepting the same dates as
+    strptime(text, '%Y-%m-%d') (including unpadded months and days).
+
+    Raises:
+        ValueError: If the text is not a valid date
+    """
+    day = _day_of_text.get(text)
+    if day is None:
+        try:
+            if len(text) == 10 and text[4] == '-' and text[7] == '-':
+                day = Date.fromisoformat(text).toordinal()
+            else:
+                day = datetime.strptime(text, '%Y-%m-%d').toordinal()
+        except TypeError:
+            raise ValueError(f"Invalid date {text!r}") from None
+        if len(_day_of_text) >= _DATE_CACHE_SIZE:
+            _day_of_text.clear()
+        _day_of_text[text] = day
+    return day
+
+def format_date(day: int) -> str:
+    """YYYY-MM-DD for a day ordinal"""
+    return _text_of_day[day]
+
+def month_start(year: int, month: int) -> int:
+    """Day ordinal of the first day of a month"""
+    day = _month_starts.get((year, month))
+    if day is None:
+        day = _month_starts[(year, month)] = Date(year, month, 1).toordinal()
+    return day
+
+def _format_cents(cents: int) -> str:
+    return f"{'-' if cents < 0 else ''}{abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+class ExchangeRates:
+    """
+    Exchange rates against the base currency, saved as `<file>.rates`:
+
+        {"base": "USD", "rates": {"EUR": "0.92", "JPY": "151.30"}}
+
+    A rate is units of the currency per unit of the base currency. Rates are
+    kept as Decimal. The factor between two currencies, including the
+    minor-unit scaling, is worked out once per pair and cached, so a
+    conversion is one multiplication and one rounding.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, object]] = None, base: str = BASE_CURRENCY):
+        self.base = base
+        self.rates: Dict[str, Decimal] = {base: Decimal(1)}
+        self._factors: Dict[tuple, Decimal] = {}
+        for currency, rate in (rates or {}).items():
+            self.set(currency, rate)
+
+    def set(self, currency: str, rate) -> None:
+        """Set the rate of a currency (units per unit of the base currency)"""
+        currency = currency.upper()
+        if currency not in CURRENCY_MINOR_UNITS:
+            raise ValueError(f"Unknown currency {currency!r}")
+        if currency == self.base:
+            raise ValueError(f"{currency} is the base currency")
+        try:
+            rate = Decimal(str(rate))
+        except InvalidOperation:
+            raise ValueError(f"Invalid rate {rate!r}") from None
+        if not rate.is_finite() or rate <= 0:
+            raise ValueError(f"Rate must be greater than 0, got {rate}")
+        self.rates[currency] = rate
+        self._factors.clear()
+
+    def factor(self, source: str, target: str) -> Decimal:
+        """Multiplier from minor units of source to minor units of target"""
+        factor = self._factors.get((source, target))
+        if factor is None:
+            for currency in (source, target):
+                if currency not in self.rates:
+                    raise ValueError(f"No exchange rate for {currency!r}; set one with "
+                                     f"'expense-tracker.py rates {currency} RATE'")
+            factor = (self.rates[target] / self.rates[source]).scaleb(
+                CURRENCY_MINOR_UNITS[target] - CURRENCY_MINOR_UNITS[source])
+            self._factors[(source, target)] = factor
+        return factor
+
+    def convert(self, minor: int, source: str, target: str) -> int:
+        """Convert minor units of source to minor units of target, rounding half to even"""
+        if source == target:
+            return minor
+        return int((minor * self.factor(source, target)).to_integral_value(ROUND_HALF_EVEN))
+
+    @classmethod
+    def load(cls, path: str) -> 'ExchangeRates':
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data.get('rates'), data.get('base', BASE_CURRENCY))
+
+    def save(self, path: str) -> None:
+        """Write the rates atomically"""
+        data = {'base': self.base,
+                'rates': {currency: str(rate) for currency, rate in sorted(self.rates.items())
+                          if currency != self.base}}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, path)
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; file locking is skipped there
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; aggregations fall back to plain loops
+    np = None
+
+class ExpenseLedger:
+    """
+    Columnar in-memory store of expenses.
+
+    Each field is a parallel typed array instead of a dict per expense:
+    the date as a day ordinal, the amount in integer cents, the category as
+    a small code and the description as an index into a table of distinct
+    strings. A row takes about 17 bytes, where a dict of Python objects takes
+    several hundred. Aggregations are group-bys over whole columns, using
+    numpy.bincount when numpy is installed and a single zip loop otherwise.
+    """
+
+    def __init__(self, categories: List[str]):
+        self.categories: List[str] = list(categories)
+        self._category_codes = {name: code for code, name in enumerate(self.categories)}
+        self.days = array('i')
+        self.cents = array('q')
+        self.cats = array('B')
+        self.desc_ids = array('L')
+        self.descriptions: List[str] = []
+        self._description_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def category_code(self, name: str) -> int:
+        """Code for a category name, adding it if the ledger has not seen it"""
+        code = self._category_codes.get(name)
+        if code is None:
+            if len(self.categories) == 256:
+                raise ValueError("Too many distinct categories")
+            code = self._category_codes[name] = len(self.categories)
+            self.categories.append(name)
+        return code
+
+    def description_id(self, text: str) -> int:
+        """Index of a description in the string table, adding it if new"""
+        desc_id = self._description_ids.get(text)
+        if desc_id is None:
+            desc_id = self._description_ids[text] = len(self.descriptions)
+            self.descriptions.append(text)
+        return desc_id
+
+    def _columns(self):
+        return (self.days, self.cents, self.cats, self.desc_ids)
+
+    def append(self, expense: Dict) -> tuple:
+        """
+        Add one expense given as a {'date', 'amount', 'category', 'description'} dict.
+
+        Rows are kept sorted by date (and by insertion order within a day), so
+        the day column is its own index. An expense dated on or after the
+        latest one is appended. An older one is inserted at its bisect
+        position, which shifts the arrays with one memmove each.
+
+        Returns the stored (day, cents, category code, description id).
+        """
+        day = parse_date(expense['date'])
+        values = (day, to_minor_units(expense['amount']),
+                  self.category_code(expense['category']),
+                  self.description_id(expense['description']))
+        if not self.days or day >= self.days[-1]:
+            for column, value in zip(self._columns(), values):
+                column.append(value)
+        else:
+            pos = bisect_right(self.days, day)
+            for column, value in zip(self._columns(), values):
+                column.insert(pos, value)
+        return values
+
+    def extend(self, expenses) -> List[tuple]:
+        """
+        Add many expenses, sorting once at the end instead of inserting one at a time.
+
+        Returns the stored (day, cents, category code) of each new expense.
+        """
+        start = len(self)
+        for expense in expenses:
+            self.days.append(parse_date(expense['date']))
+            self.cents.append(to_minor_units(expense['amount']))
+            self.cats.append(self.category_code(expense['category']))
+            self.desc_ids.append(self.description_id(expense['description']))
+        added = list(zip(self.days[start:], self.cents[start:], self.cats[start:]))
+        days = self.days
+        if any(days[i] > days[i + 1] for i in range(max(0, start - 1), len(days) - 1)):
+            # Timsort merges the sorted old rows with the new run in near-linear time
+            order = sorted(range(len(days)), key=days.__getitem__)  # stable
+            for column in self._columns():
+                column[:] = array(column.typecode, map(column.__getitem__, order))
+        return added
+
+    def merge_block(self, days: array, cents: array, cats: array, desc_ids: array) -> None:
+        """
+        Insert a date-sorted block of rows (e.g. one month read from disk).
+
+        Rows already in the ledger for the block's dates stay after the
+        block's rows for the same day.
+        """
+        if not days:
+            return
+        lo = bisect_left(self.days, days[0])
+        hi = bisect_right(self.days, days[-1])
+        block = (days, cents, cats, desc_ids)
+        if lo == hi:
+            for column, values in zip(self._columns(), block):
+                column[lo:lo] = values
+            return
+        merged = [values + column[lo:hi] for column, values in zip(self._columns(), block)]
+        order = sorted(range(len(merged[0])), key=merged[0].__getitem__)  # stable
+        for column, values in zip(self._columns(), merged):
+            column[lo:hi] = array(column.typecode, map(values.__getitem__, order))
+
+    def row(self, i: int) -> Dict:
+        """Expense i as a dict in the original format"""
+        return {
+            'date': format_date(self.days[i]),
+            'amount': self.cents[i] / 100,
+            'category': self.categories[self.cats[i]],
+            'description': self.descriptions[self.desc_ids[i]]
+        }
+
+    def rows(self, indices=None) -> List[Dict]:
+        """Expenses at the given indices (default: all) as dicts"""
+        if indices is None:
+            indices = range(len(self))
+        return [self.row(i) for i in indices]
+
+    def select_days(self, first: int, last: int) -> range:
+        """Rows dated between two day ordinals, inclusive, found by binary search"""
+        return range(bisect_left(self.days, first), bisect_right(self.days, last))
+
+    def category_totals(self, rows: Optional[range] = None) -> List[int]:
+        """Total cents per category code, over all expenses or a range of rows"""
+        size = len(self.categories)
+        if rows is not None:
+            cats = self.cats[rows.start:rows.stop]
+            cents = self.cents[rows.start:rows.stop]
+        else:
+            cats, cents = self.cats, self.cents
+        if not cats:
+            return [0] * size
+        if np is not None:
+            # bincount sums float64 weights, which is exact below 2**53 cents
+            totals = np.bincount(np.frombuffer(cats, dtype=np.uint8),
+                                 weights=np.frombuffer(cents, dtype=np.int64), minlength=size)
+            return [int(total) for total in totals]
+        totals = [0] * size
+        for code, amount in zip(cats, cents):
+            totals[code] += amount
+        return totals
+
+    def total(self, rows: Optional[range] = None) -> int:
+        """Total cents over all expenses or a range of rows"""
+        cents = self.cents if rows is None else self.cents[rows.start:rows.stop]
+        if np is not None and len(cents) > 64:
+            # int64 cannot overflow below 2**63 cents, so this is as exact as sum()
+            return int(np.frombuffer(cents, dtype=np.int64).sum())
+        return sum(cents)
+
+class ExpenseRollups:
+    """
+    Materialized totals in integer cents, kept up to date as expenses are added.
+
+    by_month maps a (year, month) pair to a list of totals per category code,
+    and by_day maps a day ordinal to that day's total. Adding an expense
+    touches one entry in each, so summaries and breakdowns are read from
+    these tables instead of recomputed from the expenses.
+    """
+
+    def __init__(self):
+        self.by_month: Dict[tuple, List[int]] = {}
+        self.by_day: Dict[int, int] = {}
+        self.by_category: List[int] = []
+        self._months: Dict[int, tuple] = {}  # day ordinal -> (year, month) memo
+
+    def _month_of(self, day: int) -> tuple:
+        month = self._months.get(day)
+        if month is None:
+            d = datetime.fromordinal(day)
+            month = self._months[day] = (d.year, d.month)
+        return month
+
+    def add(self, day: int, code: int, cents: int) -> None:
+        """Count one expense"""
+        totals = self.by_month.get(self._month_of(day))
+        if totals is None:
+            totals = self.by_month[self._month_of(day)] = []
+        if len(totals) <= code:
+            totals.extend([0] * (code + 1 - len(totals)))
+        totals[code] += cents
+        if len(self.by_category) <= code:
+            self.by_category.extend([0] * (code + 1 - len(self.by_category)))
+        self.by_category[code] += cents
+        self.by_day[day] = self.by_day.get(day, 0) + cents
+
+    def month(self, year: int, month: int) -> List[int]:
+        """Totals per category code for one month"""
+        return self.by_month.get((year, month), [])
+
+    @classmethod
+    def from_ledger(cls, ledger: ExpenseLedger) -> 'ExpenseRollups':
+        """Recompute every table from the ledger's columns"""
+        rollups = cls()
+        for day, code, cents in zip(ledger.days, ledger.cats, ledger.cents):
+            rollups.add(day, code, cents)
+        return rollups
+
+    def to_json(self, categories: List[str]) -> Dict:
+        """Serializable form, with categories stored by name"""
+        return {
+            'categories': categories[:len(self.by_category)],
+            'months': {f"{year:04d}-{month:02d}": totals
+                       for (year, month), totals in self.by_month.items()},
+            'days': self.by_day
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict, ledger: ExpenseLedger) -> 'ExpenseRollups':
+        """Inverse of to_json, mapping stored category names to the ledger's codes"""
+        rollups = cls()
+        codes = [ledger.category_code(name) for name in data['categories']]
+        width = max(codes, default=-1) + 1
+        for key, stored in data['months'].items():
+            totals = [0] * width
+            for code, cents in zip(codes, stored):
+                totals[code] = cents
+            rollups.by_month[(int(key[:4]), int(key[5:7]))] = totals
+        rollups.by_day = {int(day): cents for day, cents in data['days'].items()}
+        rollups.by_category = [0] * width
+        for totals in rollups.by_month.values():
+            for code, cents in enumerate(totals):
+                rollups.by_category[code] += cents
+        return rollups
+
+    def __eq__(self, other) -> bool:
+        def trimmed(totals):
+            totals = list(totals)
+            while totals and totals[-1] == 0:
+                totals.pop()
+            return totals
+        return (isinstance(other, ExpenseRollups)
+                and trimmed(self.by_category) == trimmed(other.by_category)
+                and {k: trimmed(v) for k, v in self.by_month.items()}
+                == {k: trimmed(v) for k, v in other.by_month.items()}
+                and self.by_day == other.by_day)
+
+SEGMENT_MAGIC = b"EXPCOLS1"
+# Header: magic, snapshot size, snapshot mtime, metadata length
+SEGMENT_HEADER = struct.Struct("<8sQQQ")
+
+class SnapshotSegments:
+    """
+    Memory-mapped columnar copy of the snapshot, split into month partitions.
+
+    Written next to the snapshot as `<filename>.cols`, keyed by the
+    snapshot's size and mtime. A small JSON metadata block lists the
+    categories and, for each month, where its rows are. The rows follow as
+    raw day / cent / category columns, plus a JSON list of each month's
+    descriptions. Opening the file only reads the metadata, and a month's
+    rows are copied out of the map the first time a query needs them.
+    """
+
+    def __init__(self, path: str, signature: List[int]):
+        """Map path; raises ValueError if it is missing, corrupt or stale"""
+        try:
+            with open(path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            raise ValueError(f"No segment file at {path}") from None
+        try:
+            magic, size, mtime, meta_len = SEGMENT_HEADER.unpack_from(self._map)
+            if magic != SEGMENT_MAGIC or [size, mtime] != signature:
+                raise ValueError("Segment file does not match the snapshot")
+            meta = json.loads(self._map[SEGMENT_HEADER.size:SEGMENT_HEADER.size + meta_len])
+            if meta['byteorder'] != sys.byteorder:
+                raise ValueError("Segment file was written on another platform")
+        except (struct.error, KeyError, ValueError):
+            self._map.close()
+            raise ValueError("Segment file does not match the snapshot") from None
+        self.categories: List[str] = meta['categories']
+        self.rows: int = meta['rows']
+        self._base = SEGMENT_HEADER.size + meta_len
+        # (year, month) -> (first row, row count, description offset, description length)
+        self.partitions = {(year, month): (first, count, desc_at, desc_len)
+                           for year, month, first, count, desc_at, desc_len in meta['partitions']}
+
+    def read(self, key: tuple) -> tuple:
+        """Columns of one month: (days, cents, category codes, descriptions)"""
+        first, count, desc_at, desc_len = self.partitions[key]
+        base, rows = self._base, self.rows
+        days, cents, cats = array('i'), array('q'), array('B')
+        days.frombytes(self._map[base + 4 * first:base + 4 * (first + count)])
+        base += 4 * rows
+        cents.frombytes(self._map[base + 8 * first:base + 8 * (first + count)])
+        base += 8 * rows
+        cats.frombytes(self._map[base + first:base + first + count])
+        base += rows
+        descriptions = json.loads(self._map[base + desc_at:base + desc_at + desc_len])
+        return days, cents, cats, descriptions
+
+    def close(self) -> None:
+        self._map.close()
+
+    @staticmethod
+    def write(path: str, ledger: 'ExpenseLedger', signature: List[int]) -> None:
+        """Write the (fully loaded, date-sorted) ledger as a segment file"""
+        partitions = []
+        blobs = []
+        desc_at = 0
+        rows = len(ledger)
+        start = 0
+        while start < rows:
+            d = datetime.fromordinal(ledger.days[start])
+            if d.month == 12:
+                next_month = datetime(d.year + 1, 1, 1).toordinal()
+            else:
+                next_month = datetime(d.year, d.month + 1, 1).toordinal()
+            end = bisect_left(ledger.days, next_month, start)
+            descriptions = ledger.descriptions
+            blob = json.dumps([descriptions[i] for i in ledger.desc_ids[start:end]]).encode('utf-8')
+            partitions.append([d.year, d.month, start, end - start, desc_at, len(blob)])
+            blobs.append(blob)
+            desc_at += len(blob)
+            start = end
+
+        meta = json.dumps({
+            'byteorder': sys.byteorder,
+            'rows': rows,
+            'categories': ledger.categories,
+            'partitions': partitions
+        }).encode('utf-8')
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, signature[0], signature[1], len(meta)))
+            f.write(meta)
+            f.write(ledger.days.tobytes())
+            f.write(ledger.cents.tobytes())
+            f.write(ledger.cats.tobytes())
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp_path, path)
+
+class DailySeries:
+    """
+    Totals per day in cents, from an origin day onwards, with a Fenwick tree
+    over them. The total of any window of days is two O(log n) prefix sums,
+    and adding to a day is an O(log n) update. The arrays double when an
+    expense falls outside them.
+    """
+
+    def __init__(self, origin: int, daily: Optional[array] = None):
+        self.origin = origin
+        self.daily = daily if daily is not None else array('q')
+        self._build()
+
+    def _build(self) -> None:
+        daily, size = self.daily, len(self.daily)
+        tree = array('q', bytes(8 * (size + 1)))
+        for i in range(1, size + 1):
+            tree[i] += daily[i - 1]
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def add(self, day: int, cents: int) -> None:
+        i = day - self.origin
+        if i < 0:
+            grow = max(-i, len(self.daily))
+            self.daily = array('q', bytes(8 * grow)) + self.daily
+            self.origin -= grow
+            i += grow
+            self._build()
+        elif i >= len(self.daily):
+            self.daily.extend(array('q', bytes(8 * max(i + 1 - len(self.daily), len(self.daily)))))
+            self._build()
+        self.daily[i] += cents
+        tree, i = self.tree, i + 1
+        while i < len(tree):
+            tree[i] += cents
+            i += i & -i
+
+    def prefix(self, day: int) -> int:
+        """Total of every day up to and including this one"""
+        tree, total = self.tree, 0
+        i = min(day - self.origin + 1, len(self.daily))
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def window(self, first: int, last: int) -> int:
+        """Total of the days between two ordinals, inclusive"""
+        return self.prefix(last) - self.prefix(first - 1)
+
+    def rolling(self, first: int, last: int, width: int) -> List[int]:
+        """Total of the `width` days ending on each day from first to last"""
+        daily, origin, size = self.daily, self.origin, len(self.daily)
+        total = self.window(first - width + 1, first)
+        sums = [total]
+        for day in range(first + 1, last + 1):
+            i, j = day - origin, day - width - origin
+            total += (daily[i] if 0 <= i < size else 0) - (daily[j] if 0 <= j < size else 0)
+            sums.append(total)
+        return sums
+
+class ExpenseAnalytics:
+    """
+    A DailySeries per category code, plus one for all categories (key None),
+    kept current as expenses are added.
+    """
+
+    def __init__(self):
+        self.series: Dict[Optional[int], DailySeries] = {}
+
+    def add(self, day: int, code: int, cents: int) -> None:
+        for key in (code, None):
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = DailySeries(day)
+            series.add(day, cents)
+
+    @classmethod
+    def from_ledger(cls, ledger: ExpenseLedger) -> 'ExpenseAnalytics':
+        """Bucket the (date-sorted) ledger by category and day, then build each tree once"""
+        analytics = cls()
+        if not len(ledger):
+            return analytics
+        origin = ledger.days[0]
+        size = ledger.days[-1] - origin + 1
+        codes = len(ledger.categories)
+        if np is not None:
+            index = (np.frombuffer(ledger.cats, dtype=np.uint8).astype(np.int64) * size
+                     + np.frombuffer(ledger.days, dtype=np.int32) - origin)
+            buckets = np.bincount(index, weights=np.frombuffer(ledger.cents, dtype=np.int64),
+                                  minlength=codes * size).astype(np.int64)
+            daily = {code: array('q', buckets[code * size:(code + 1) * size].tobytes())
+                     for code in range(codes)}
+        else:
+            daily = {code: array('q', bytes(8 * size)) for code in range(codes)}
+            for day, code, cents in zip(ledger.days, ledger.cats, ledger.cents):
+                daily[code][day - origin] += cents
+        overall = array('q', bytes(8 * size))
+        for code, values in daily.items():
+            if any(values):
+                analytics.series[code] = DailySeries(origin, values)
+                overall = array('q', map(sum, zip(overall, values)))
+        analytics.series[None] = DailySeries(origin, overall)
+        return analytics
+
+class BudgetMonitor:
+    """
+    Spending against each budget, updated in O(1) per added expense.
+
+    A budget is {'category': name or None for all, 'period': 'month' or a
+    number of days, 'limit': amount}. A monthly budget reads the month's
+    running total from the rollups. An N-day budget keeps the spend of the N
+    days ending at the latest date seen in a ring buffer with a running sum.
+    An expense inside the window adds to the sum. Moving the window forward
+    subtracts the days that drop out of it, each day once.
+    An alert is raised when an expense takes spending over a limit.
+    """
+
+    def __init__(self, budgets: List[Dict], rollups: ExpenseRollups, categories: List[str], anchor: int):
+        self.rollups = rollups
+        self.categories = categories
+        self.anchor = anchor
+        self.budgets = []
+        for budget in budgets:
+            code = None if budget['category'] is None else categories.index(budget['category'])
+            state = {'budget': budget, 'code': code, 'limit': to_minor_units(budget['limit'])}
+            if budget['period'] != 'month':
+                state['ring'] = array('q', bytes(8 * budget['period']))
+                state['spent'] = 0
+            self.budgets.append(state)
+        self.windows = [state for state in self.budgets if 'ring' in state]
+        self._by_code: Dict[Optional[int], list] = {}
+        for state in self.budgets:
+            self._by_code.setdefault(state['code'], []).append(state)
+
+    @property
+    def widest_window(self) -> int:
+        return max((state['budget']['period'] for state in self.windows), default=0)
+
+    def _advance(self, day: int) -> None:
+        for state in self.windows:
+            ring = state['ring']
+            if day - self.anchor >= len(ring):
+                state['ring'] = array('q', bytes(8 * len(ring)))
+                state['spent'] = 0
+            else:
+                for slot in range(self.anchor + 1, day + 1):
+                    state['spent'] -= ring[slot % len(ring)]
+                    ring[slot % len(ring)] = 0
+        self.anchor = day
+
+    def add(self, day: int, code: int, cents: int, alert: bool = True) -> List[str]:
+        """Count an expense that the rollups already include; returns any alerts"""
+        if day > self.anchor:
+            self._advance(day)
+        alerts = []
+        for state in self._by_code.get(code, []) + self._by_code.get(None, []):
+            budget = state['budget']
+            if 'ring' in state:
+                ring = state['ring']
+                if day <= self.anchor - len(ring):
+                    continue
+                ring[day % len(ring)] += cents
+                state['spent'] += cents
+                spent, period = state['spent'], f"the {len(ring)} days to " \
+                    f"{format_date(self.anchor)}"
+            elif alert:
+                year, month = self.rollups._month_of(day)
+                totals = self.rollups.month(year, month)
+                spent = sum(totals) if state['code'] is None else totals[code]
+                period = f"{year}-{month:02d}"
+            else:
+                continue
+            if alert and spent - cents <= state['limit'] < spent:
+                alerts.append(f"{budget['category'] or 'All categories'}: ${_format_cents(spent)} spent in "
+                              f"{period}, over the ${_format_cents(state['limit'])} budget")
+        return alerts
+
+    def status(self, today: int) -> List[Dict]:
+        """Spending against each budget for the current month or the window ending today"""
+        if today > self.anchor:
+            self._advance(today)
+        date = datetime.fromordinal(today)
+        totals = self.rollups.month(date.year, date.month)
+        result = []
+        for state in self.budgets:
+            if 'ring' in state:
+                spent = state['spent']
+            elif state['code'] is None:
+                spent = sum(totals)
+            else:
+                spent = totals[state['code']] if state['code'] < len(totals) else 0
+            result.append(dict(state['budget'], spent=spent / 100))
+        return result
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses invalidations maxsize currsize')
+
+class QueryCache:
+    """
+    LRU cache of query results keyed by (query name, arguments).
+
+    Each result is tagged with the months it read, or with None if it read
+    every month. Adding an expense drops only the results tagged with its
+    month, plus those tagged None. When the cache holds more than maxsize
+    results, the least recently used is evicted. Results are shared with
+    every caller that hits them, so treat them as read-only.
+    """
+    MAX_TAGGED_MONTHS = 240  # longer ranges are tagged None instead
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()  # key -> (months, result)
+        self._by_month: Dict[Optional[tuple], set] = {}
+        self.hits = self.misses = self.invalidations = 0
+
+    def get(self, key: tuple, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: tuple, first: Optional[int], last: Optional[int], result) -> None:
+        """Cache a result that read the expenses between two day ordinals (None: all of them)"""
+        if self.maxsize <= 0:
+            return
+        months: List[Optional[tuple]] = [None]
+        if first is not None and last is not None:
+            start, end = datetime.fromordinal(first), datetime.fromordinal(last)
+            span = (end.year - start.year) * 12 + end.month - start.month + 1
+            if span <= self.MAX_TAGGED_MONTHS:
+                months = [((start.month - 1 + i) // 12 + start.year, (start.month - 1 + i) % 12 + 1)
+                          for i in range(max(span, 0))]
+        self._drop(key)
+        self._entries[key] = (months, result)
+        for month in months:
+            self._by_month.setdefault(month, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for month in entry[0]:
+                keys = self._by_month[month]
+                keys.discard(key)
+                if not keys:
+                    del self._by_month[month]
+
+    def invalidate(self, days) -> None:
+        """Drop the results that read any of these day ordinals"""
+        if not self._entries:
+            return
+        months = {None}
+        for day in set(days):
+            date = datetime.fromordinal(day)
+            months.add((date.year, date.month))
+        for month in months:
+            for key in list(self._by_month.get(month, ())):
+                self._drop(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_month.clear()
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.invalidations, self.maxsize, len(self._entries))
+
+_MISSING = object()
+
+def _cached_query(span):
+    """
+    Serve a query from the tracker's QueryCache. span(*args) returns the
+    (first, last) day ordinals the query reads, or None if it reads them all.
+    """
+    def decorate(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if kwargs:
+                return method(self, *args, **kwargs)
+            key = (method.__name__,) + args
+            result = self._queries.get(key, _MISSING)
+            if result is _MISSING:
+                result = method(self, *args)
+                first, last = span(*args) or (None, None)
+                self._queries.put(key, first, last, result)
+            return result
+        return wrapper
+    return decorate
+
+def _month_span(year: int, month: int) -> tuple:
+    first = month_start(year, month)
+    return first, first + calendar.monthrange(year, month)[1] - 1
+
+def _date_span(start_date: str, end_date: str) -> tuple:
+    return parse_date(start_date), parse_date(end_date)
+
+def _check_window(days) -> None:
+    if not isinstance(days, int) or days < 1:
+        raise ValueError(f"Rolling window must be at least 1 day, got {days!r}")
+
+def _date_bounds(start_date: str, end_date: str) -> tuple:
+    """A date range as zero-padded ISO strings, which compare correctly as text"""
+    return tuple(format_date(day) for day in _date_span(start_date, end_date))
+
+class _CommitGroup:
+    """Expenses from concurrent add calls that are written and fsync'd together"""
+    __slots__ = ('expenses', 'done', 'error')
+
+    def __init__(self):
+        self.expenses: List[Dict] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+
+def _synchronized(method):
+    """Run a query under the tracker's state lock, after picking up other writers' expenses"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._state_lock:
+            self.refresh()
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class ExpenseTracker:
-    def __init__(self, filename: str = "expenses.json"):
+    """
+    Expense ledger stored as a JSON snapshot plus an append-only journal.
+
+    New expenses are appended to `<filename>.journal` as one JSON line each,
+    so an add costs the same however large the ledger is. Once the journal
+    grows as large as the snapshot (and at least COMPACT_MIN_ENTRIES), it is
+    folded into a new snapshot. On load, the journal is replayed on top of the
+    snapshot, and a partly written last line from a crash is discarded.
+
+    A filename ending in .db, .sqlite or .sqlite3 selects SQLiteExpenseTracker
+    instead.
+
+    In memory, expenses are held column by column in an ExpenseLedger, and
+    running totals in ExpenseRollups. The rollups are saved to
+    `<filename>.rollups` with each snapshot.
+
+    With lazy=True (the default) the snapshot is also saved as month
+    partitions in `<filename>.cols` (see SnapshotSegments). Opening the
+    tracker then reads only that file's metadata and the rollups, and a
+    month's expenses are loaded the first time a query touches that month.
+    Totals and breakdowns come from the rollups and load nothing.
+
+    Several processes (and threads) can share one ledger. Appends and
+    compaction hold an exclusive fcntl lock on `<filename>.lock`, and a writer
+    first reads any journal lines other processes appended. If another
+    process has compacted, the writer reloads before appending. Queries read
+    new journal lines without locking. Concurrent add_expense calls in one
+    process are group-committed: one thread writes and fsyncs everything
+    queued while the previous write was in progress.
+
+    Opening a ledger writes nothing: the journal and lock file are created by
+    the first write, so a ledger in a read-only directory can still be
+    queried. The .cols and .rollups files are caches; if they cannot be
+    written, the tracker carries on without them.
+    """
+
+    def __new__(cls, filename: str = "expenses.json", *args, **kwargs):
+        if cls is ExpenseTracker and filename.lower().endswith(SQLITE_EXTENSIONS):
+            cls = SQLiteExpenseTracker
+        return super().__new__(cls)
+
+    def __init__(self, filename: str = "expenses.json", sync_every: int = 1, lazy: bool = True,
+                 cache_size: int = QUERY_CACHE_SIZE):
         self.filename = filename
-        self.expenses: List[Dict] = []
-        self.categories = [
-            "Food", "Transportation", "Housing", "Utilities",
-            "Entertainment", "Shopping", "Healthcare", "Other"
-        ]
+        self.journal_path = filename + ".journal"
+        self.rollups_path = filename + ".rollups"
+        self.segments_path = filename + ".cols"
+        self.rates_path = filename + ".rates"
+        self._rates: Optional[ExchangeRates] = None
+        self._rates_signature = None
+        self.sync_every = sync_every  # fsync the journal after this many adds
+        self.lazy = lazy
+        self._segments: Optional[SnapshotSegments] = None
+        self._pending: Dict[tuple, int] = {}  # months still on disk -> row count
+        self._pending_rows = 0
+        self._snapshot_rows = 0
+        self.categories = list(CATEGORIES)
+        self._category_set = frozenset(self.categories)
+        self.ledger = ExpenseLedger(self.categories)
+        self.rollups = ExpenseRollups()
+        self._queries = QueryCache(cache_size)
+        self.budgets_path = filename + ".budgets"
+        self._analytics: Optional[ExpenseAnalytics] = None
+        self._monitor: Optional[BudgetMonitor] = None
+        self.alerts: deque = deque(maxlen=100)  # most recent budget alerts
+        self.on_alert = None  # called with each alert message as it is raised
+        self._journal_fd: Optional[int] = None
+        self._journal_ino: Optional[int] = None
+        self._journal_offset = 0  # bytes of the journal reflected in memory
+        self._journal_entries = 0
+        self._unsynced = 0
+        self._state_lock = threading.RLock()
+        self._lock_fd: Optional[int] = None  # opened by the first _file_lock
+        self._lock_depth = 0
+        self._commit_cv = threading.Condition()
+        self._group = _CommitGroup()
+        self._committing = False
         self.load_expenses()
 
+    @contextmanager
+    def _file_lock(self, create: bool = True):
+        """
+        Hold the exclusive advisory lock on the ledger (reentrant; callers hold _state_lock).
+        Readers pass create=False: if no writer has created the lock file yet,
+        there is nobody to wait for and the lock is skipped.
+        """
+        if self._lock_depth == 0 and fcntl is not None and self._lock_fd is None:
+            if create:
+                self._lock_fd = os.open(self.filename + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+            else:
+                try:
+                    self._lock_fd = os.open(self.filename + ".lock", os.O_RDONLY)
+                except OSError:
+                    pass
+        locked = self._lock_depth == 0 and fcntl is not None and self._lock_fd is not None
+        if locked:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if locked:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
     def load_expenses(self) -> None:
-        """Load expenses from JSON file"""
+        """Open the snapshot (lazily if its segment file is current), then replay the journal"""
+        with self._state_lock, self._file_lock(create=False):
+            self._load()
+
+    def _load(self) -> None:
+        self._queries.clear()
+        if self._journal_fd is not None:
+            os.close(self._journal_fd)
+            self._journal_fd = None
+        self.ledger = ExpenseLedger(self.categories)
+        self._close_segments()
+        signature = self._snapshot_signature()
+        if self.lazy and signature != [0, 0]:
+            try:
+                self._segments = SnapshotSegments(self.segments_path, signature)
+            except ValueError:
+                self._segments = None
+
+        if self._segments is not None:
+            self._pending = {key: part[1] for key, part in self._segments.partitions.items()}
+            self._pending_rows = self._segments.rows
+            codes = [self.ledger.category_code(name) for name in self._segments.categories]
+            self._code_table = bytes(codes + [0] * (256 - len(codes)))
+        else:
+            try:
+                if Path(self.filename).exists():
+                    with open(self.filename, 'r') as f:
+                        self.ledger.extend(json.load(f))
+            except json.JSONDecodeError:
+                print("Error reading expense file. Starting with empty expense list.")
+                self.ledger = ExpenseLedger(self.categories)
+            if self.lazy and len(self.ledger):
+                # So that the next start does not have to parse the JSON
+                self._save_segments(signature)
+        self._snapshot_rows = len(self)
+
+        self.rollups = self._load_rollups()
+        if self.rollups is None:
+            self._load_all()
+            self.rollups = ExpenseRollups.from_ledger(self.ledger)
+            if self.lazy and len(self.ledger):
+                self._save_rollups()
+        self._replay_journal()
+        self._analytics = None
+        self._monitor = self._build_monitor()
+
+    def __len__(self) -> int:
+        return len(self.ledger) + self._pending_rows
+
+    def _load_month(self, key: tuple) -> None:
+        """Copy one month from the segment file into the ledger"""
+        days, cents, cats, descriptions = self._segments.read(key)
+        cats = array('B', cats.tobytes().translate(self._code_table))
+        desc_ids = array('L', map(self.ledger.description_id, descriptions))
+        self.ledger.merge_block(days, cents, cats, desc_ids)
+        self._pending_rows -= self._pending.pop(key)
+
+    def _load_days(self, first: int, last: int) -> None:
+        """Make sure every month overlapping a range of day ordinals is loaded"""
+        if self._pending:
+            start, end = datetime.fromordinal(first), datetime.fromordinal(last)
+            for key in sorted(self._pending):
+                if (start.year, start.month) <= key <= (end.year, end.month):
+                    self._load_month(key)
+
+    def _load_all(self) -> None:
+        for key in sorted(self._pending):
+            self._load_month(key)
+
+    def _close_segments(self) -> None:
+        if self._segments is not None:
+            self._segments.close()
+            self._segments = None
+        self._pending = {}
+        self._pending_rows = 0
+
+    def _snapshot_signature(self) -> List[int]:
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return [0, 0]
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _load_rollups(self) -> Optional[ExpenseRollups]:
+        """Saved rollups, if they were written for the current snapshot"""
         try:
-            if Path(self.filename).exists():
-                with open(self.filename, 'r') as f:
-                    self.expenses = json.load(f)
-        except json.JSONDecodeError:
-            print("Error reading expense file. Starting with empty expense list.")
-            self.expenses = []
+            with open(self.rollups_path, 'r') as f:
+                data = json.load(f)
+            if data.get('signature') != self._snapshot_signature():
+                return None
+            return ExpenseRollups.from_json(data, self.ledger)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_rollups(self) -> None:
+        """Write the rollups next to the snapshot they describe (a cache, so failures are ignored)"""
+        data = self.rollups.to_json(self.ledger.categories)
+        data['signature'] = self._snapshot_signature()
+        tmp_path = self.rollups_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.rollups_path)
+        except OSError:
+            pass
+
+    def _save_segments(self, signature: List[int]) -> None:
+        """Write the snapshot's segment file (a cache, so failures are ignored)"""
+        try:
+            SnapshotSegments.write(self.segments_path, self.ledger, signature)
+        except OSError:
+            pass
+
+    def rebuild_rollups(self) -> None:
+        """Recompute the rollups from the ledger"""
+        self._load_all()
+        self.rollups = ExpenseRollups.from_ledger(self.ledger)
+        self._queries.clear()
+        self._analytics = None
+        self._monitor = self._build_monitor()
+
+    def _apply(self, expense: Dict) -> None:
+        """Add an expense to the ledger and the rollups"""
+        day, cents, code, _ = self.ledger.append(expense)
+        self._count(day, code, cents)
+        self._queries.invalidate((day,))
+
+    def _count(self, day: int, code: int, cents: int) -> None:
+        """Add an expense stored in the ledger to the rollups, analytics and budgets"""
+        self.rollups.add(day, code, cents)
+        if self._analytics is not None:
+            self._analytics.add(day, code, cents)
+        if self._monitor is not None:
+            self._check_budgets(day, code, cents)
+
+    def _check_budgets(self, day: int, code: int, cents: int) -> None:
+        """Count a stored expense against the budgets and raise any alerts"""
+        for alert in self._monitor.add(day, code, cents):
+            self.alerts.append(alert)
+            if self.on_alert is not None:
+                self.on_alert(alert)
+
+    @property
+    @_synchronized
+    def expenses(self) -> List[Dict]:
+        """All expenses as a list of dicts (built on demand from the ledger columns)"""
+        self._load_all()
+        return self.ledger.rows()
+
+    def _replay_journal(self) -> None:
+        """Apply journal entries written since the last snapshot and open the journal for appending"""
+        entries = []
+        base = self._snapshot_rows
+        good_end = 0
+        if Path(self.journal_path).exists():
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # torn final write
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if good_end == 0 and 'base' in record:
+                        base = record['base']
+                    else:
+                        entries.append(record)
+                    good_end += len(line)
+            if good_end == 0:
+                # No complete header line; nothing in the journal can be trusted
+                os.remove(self.journal_path)
+            elif good_end < os.path.getsize(self.journal_path):
+                os.truncate(self.journal_path, good_end)
+
+        if not Path(self.journal_path).exists():
+            pass  # created by the first write
+        elif self._snapshot_rows == base:
+            for expense in entries:
+                self._apply(expense)
+            self._journal_entries = len(entries)
+        elif self._snapshot_rows == base + len(entries):
+            # A compaction wrote the snapshot but stopped before resetting the journal
+            self._start_journal()
+        else:
+            print("Warning: journal does not match the expense file; replaying it anyway.")
+            for expense in entries:
+                self._apply(expense)
+            self._journal_entries = len(entries)
+        self._open_journal()
+
+    def _open_journal(self) -> None:
+        """Note which journal is current and how much of it is applied (None if there is none yet)"""
+        try:
+            stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            self._journal_ino, self._journal_offset = None, 0
+            return
+        self._journal_ino = stat.st_ino
+        self._journal_offset = stat.st_size
+
+    def _journal_for_append(self) -> int:
+        """The journal descriptor for appends, creating the journal on the first write"""
+        if self._journal_fd is None:
+            if self._journal_ino is None:
+                self._start_journal()
+                self._open_journal()
+            self._journal_fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND)
+        return self._journal_fd
+
+    def refresh(self) -> None:
+        """Pick up expenses that other processes have added since this tracker last looked"""
+        with self._state_lock:
+            try:
+                stat = os.stat(self.journal_path)
+            except FileNotFoundError:
+                stat = None
+            if (None if stat is None else stat.st_ino) != self._journal_ino:
+                self.load_expenses()  # another process compacted the ledger
+            elif stat is not None and stat.st_size > self._journal_offset:
+                self._read_journal_tail()
+
+    def _read_journal_tail(self) -> None:
+        """Apply the complete lines appended to the journal after _journal_offset"""
+        with open(self.journal_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_ino != self._journal_ino:
+                return self.load_expenses()
+            f.seek(self._journal_offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1  # a line still being written is left for next time
+        records = [json.loads(line) for line in data[:end].splitlines() if line]
+        for expense in records:
+            self._apply(expense)
+        self._journal_offset += end
+        self._journal_entries += len(records)
+
+    def _start_journal(self) -> None:
+        """Atomically replace the journal with an empty one based on the current snapshot"""
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({'base': len(self)}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if self._journal_fd is not None:
+            os.close(self._journal_fd)
+            self._journal_fd = None
+        os.replace(tmp_path, self.journal_path)
+        self._journal_entries = 0
+        self._unsynced = 0
 
     def save_expenses(self) -> None:
-        """Save expenses to JSON file"""
-        with open(self.filename, 'w') as f:
-            json.dump(self.expenses, f, indent=4)
+        """Write all expenses to a new snapshot and start an empty journal"""
+        with self._state_lock, self._file_lock():
+            self.refresh()
+            self._save()
+
+    def _save(self) -> None:
+        self._load_all()
+        tmp_path = self.filename + ".tmp"
+        with open(tmp_path, 'w', buffering=1 << 20) as f:
+            # One expense per line: still a JSON array, but each line is encoded
+            # by json's C encoder, which json.dump(indent=...) does not use
+            f.write("[\n")
+            for i in range(len(self.ledger)):
+                f.write(",\n    " if i else "    ")
+                f.write(json.dumps(self.ledger.row(i)))
+            f.write("\n]\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.filename)
+        self._save_rollups()
+        self._close_segments()
+        if self.lazy:
+            self._save_segments(self._snapshot_signature())
+        self._snapshot_rows = len(self)
+        self._start_journal()
+        self._open_journal()
+
+    def compact(self) -> None:
+        """Fold the journal into the snapshot"""
+        self.save_expenses()
+
+    def sync(self) -> None:
+        """Flush journal appends to disk"""
+        if self._unsynced:
+            os.fsync(self._journal_fd)
+            self._unsynced = 0
+
+    def close(self) -> None:
+        """Sync and close the journal"""
+        if self._journal_fd is not None:
+            self.sync()
+            os.close(self._journal_fd)
+            self._journal_fd = None
+        self._close_segments()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def rates(self) -> ExchangeRates:
+        """Exchange rates from `<file>.rates`, reread only when the file changes"""
+        try:
+            stat = os.stat(self.rates_path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            signature = None
+        if self._rates is None or signature != self._rates_signature:
+            self._rates = ExchangeRates.load(self.rates_path) if signature else ExchangeRates()
+            self._rates_signature = signature
+        return self._rates
 
-    def add_expense(self, amount: float, category: str, description: str) -> None:
-        """Add a new expense"""
-        if category not in self.categories:
+    def set_rate(self, currency: str, rate) -> None:
+        """Save the rate of a currency, in units per unit of the base currency"""
+        rates = self.rates
+        rates.set(currency, rate)
+        rates.save(self.rates_path)
+
+    def in_currency(self, amount: float, currency: str) -> Decimal:
+        """Convert an amount in the base currency, as the reports return it, to another currency"""
+        currency = currency.upper()
+        minor = self.rates.convert(to_minor_units(amount), BASE_CURRENCY, currency)
+        return Decimal(minor).scaleb(-CURRENCY_MINOR_UNITS[currency])
+
+    def add_expense(self, amount: float, category: str, description: str,
+                    date: Optional[str] = None, currency: Optional[str] = None) -> None:
+        """
+        Add a new expense (dated today unless a YYYY-MM-DD date is given).
+        An amount in another currency is converted to the base currency.
+        """
+        if category not in self._category_set:
             raise ValueError(f"Invalid category. Choose from: {', '.join(self.categories)}")
 
-        expense = {
-            'date': datetime.now().strftime('%Y-%m-%d'),
+        expense = self.validate_expense({
+            'date': date or format_date(Date.today().toordinal()),
             'amount': amount,
             'category': category,
-            'description': description
-        }
-        self.expenses.append(expense)
-        self.save_expenses()
+            'description': description,
+            'currency': currency
+        })
+        self._store_batch([expense])
+
+    def validate_expense(self, record: Dict, currency: Optional[str] = None) -> Dict:
+        """
+        Check one expense record and return it in canonical form.
+
+        The record needs a YYYY-MM-DD 'date', a positive 'amount' (a number,
+        numeric string or Decimal) and a known 'category'; 'description' is
+        optional. An amount in a 'currency' other than the base currency (or
+        in `currency`, for records without one) is converted with the saved
+        exchange rates. The amount is rounded to whole cents exactly.
+
+        Raises:
+            ValueError: If a field is missing or invalid
+        """
+        try:
+            date, amount, category = record['date'], record['amount'], record['category']
+        except KeyError as e:
+            raise ValueError(f"Missing field {e}") from None
+        if category not in self._category_set:
+            raise ValueError(f"Invalid category {category!r}")
+        try:
+            date = format_date(parse_date(date))  # canonical, zero-padded
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid date {date!r}, expected YYYY-MM-DD") from None
+        currency = (record.get('currency') or currency or BASE_CURRENCY).upper()
+        if currency not in CURRENCY_MINOR_UNITS:
+            raise ValueError(f"Unknown currency {currency!r}")
+        cents = to_minor_units(amount, CURRENCY_MINOR_UNITS[currency])
+        if currency != BASE_CURRENCY:
+            cents = self.rates.convert(cents, currency, BASE_CURRENCY)
+        if not cents > 0:
+            raise ValueError(f"Amount must be greater than 0, got {amount}")
+        return {'date': date, 'amount': cents / 100, 'category': category,
+                'description': str(record.get('description') or '')}
+
+    def import_many(self, records, batch_size: int = IMPORT_BATCH_SIZE,
+                    skip_invalid: bool = False, currency: Optional[str] = None) -> tuple:
+        """
+        Validate and add expenses from any iterable of dicts, a batch at a time.
+
+        Each batch is persisted with a single write (one journal append and
+        fsync, or one SQLite transaction). Only one batch is held in memory,
+        so records can be streamed from a file of any size.
 
+        Args:
+            records: Iterable of {'date', 'amount', 'category', 'description'} dicts
+            batch_size (int): Expenses per persistence write
+            skip_invalid (bool): Skip invalid records instead of raising
+            currency (str): Currency of records without a 'currency' field
+                            (default: the base currency)
+
+        Returns:
+            tuple: (number imported, number skipped)
+
+        Raises:
+            ValueError: For the first invalid record, unless skip_invalid is set;
+                        batches before it have already been imported
+        """
+        imported = skipped = 0
+        batch = []
+        for number, record in enumerate(records, 1):
+            try:
+                batch.append(self.validate_expense(record, currency))
+            except ValueError as e:
+                if not skip_invalid:
+                    if batch:
+                        self._store_batch(batch)
+                        imported += len(batch)
+                    raise ValueError(f"Record {number}: {e} "
+                                     f"({imported:,} earlier records were imported)") from None
+                skipped += 1
+                continue
+            if len(batch) >= batch_size:
+                self._store_batch(batch)
+                imported += len(batch)
+                batch = []
+        if batch:
+            self._store_batch(batch)
+            imported += len(batch)
+        return imported, skipped
+
+    def _store_batch(self, expenses: List[Dict]) -> None:
+        """
+        Persist validated expenses and add them to memory, group-committing
+        with any other threads adding at the same time.
+        """
+        with self._commit_cv:
+            group = self._group
+            group.expenses.extend(expenses)
+            while not group.done:
+                if self._committing:
+                    self._commit_cv.wait()
+                    continue
+                # Lead this group; later callers queue up in a new one meanwhile
+                self._committing = True
+                self._group = _CommitGroup()
+                self._commit_cv.release()
+                try:
+                    self._commit(group.expenses)
+                except BaseException as e:
+                    group.error = e
+                finally:
+                    self._commit_cv.acquire()
+                    self._committing = False
+                    group.done = True
+                    self._commit_cv.notify_all()
+        if group.error is not None:
+            raise group.error
+
+    def _commit(self, expenses: List[Dict]) -> None:
+        """Append expenses to the journal in one write under the file lock"""
+        data = "".join(json.dumps(expense) + "\n" for expense in expenses).encode('utf-8')
+        with self._state_lock, self._file_lock():
+            self.refresh()
+            journal_fd = self._journal_for_append()
+            if os.fstat(journal_fd).st_size > self._journal_offset:
+                # A writer died mid-line; drop the fragment so our lines start cleanly
+                os.truncate(self.journal_path, self._journal_offset)
+            # One write() on an O_APPEND descriptor, so entries are never interleaved
+            os.write(journal_fd, data)
+            self._journal_offset += len(data)
+            if len(expenses) == 1:
+                self._apply(expenses[0])
+            else:
+                added = self.ledger.extend(expenses)
+                for day, cents, code in added:
+                    self._count(day, code, cents)
+                self._queries.invalidate(day for day, _, _ in added)
+            self._journal_entries += len(expenses)
+            self._unsynced += len(expenses)
+            if self._unsynced >= self.sync_every:
+                self.sync()
+            if self._journal_entries >= max(COMPACT_MIN_ENTRIES, len(self) - self._journal_entries):
+                self._save()
+
+    def _by_category(self, totals: List[int]) -> Dict[str, float]:
+        """Map per-code cent totals to {category: amount}, leaving out empty categories"""
+        return {category: total / 100
+                for category, total in zip(self.ledger.categories, totals) if total > 0}
+
+    @_synchronized
+    @_cached_query(_month_span)
     def get_monthly_summary(self, year: int, month: int) -> Dict:
         """Generate monthly expense summary"""
-        monthly_expenses = [
-            expense for expense in self.expenses
-            if datetime.strptime(expense['date'], '%Y-%m-%d').year == year
-            and datetime.strptime(expense['date'], '%Y-%m-%d').month == month
-        ]
-
-        summary = {
-            'total': sum(expense['amount'] for expense in monthly_expenses),
-            'by_category': {},
-            'expenses': monthly_expenses
+        first = month_start(year, month)
+        last = first + calendar.monthrange(year, month)[1] - 1
+        totals = self.rollups.month(year, month)
+        self._load_days(first, last)
+
+        return {
+            'total': sum(totals) / 100,
+            'by_category': self._by_category(totals),
+            'expenses': self.ledger.rows(self.ledger.select_days(first, last))
         }
 
-        # Calculate totals by category
+    @_synchronized
+    @_cached_query(_date_span)
+    def get_expense_report(self, start_date: str, end_date: str) -> List[Dict]:
+        """Generate expense report for date range"""
+        start, end = parse_date(start_date), parse_date(end_date)
+        self._load_days(start, end)
+        return self.ledger.rows(self.ledger.select_days(start, end))
+
+    @_synchronized
+    @_cached_query(lambda: None)
+    def get_category_breakdown(self) -> Dict[str, float]:
+        """Get total expenses by category"""
+        return self._by_category(self.rollups.by_category)
+
+    @_synchronized
+    @_cached_query(_date_span)
+    def get_daily_totals(self, start_date: str, end_date: str) -> Dict[str, float]:
+        """Total spent on each day with expenses in a date range"""
+        start, end = parse_date(start_date), parse_date(end_date)
+        by_day = self.rollups.by_day
+        return {format_date(day): by_day[day] / 100
+                for day in range(start, end + 1) if day in by_day}
+
+    def _analytics_tables(self) -> ExpenseAnalytics:
+        if self._analytics is None:
+            self._load_all()
+            self._analytics = ExpenseAnalytics.from_ledger(self.ledger)
+        return self._analytics
+
+    def _series(self, category: Optional[str]) -> Optional[DailySeries]:
+        if category is not None and category not in self._category_set:
+            raise ValueError(f"Invalid category {category!r}")
+        code = None if category is None else self.ledger.category_code(category)
+        return self._analytics_tables().series.get(code)
+
+    @_synchronized
+    def rolling_totals(self, start_date: str, end_date: str, days: int = 30,
+                       category: Optional[str] = None) -> Dict[str, float]:
+        """
+        Spend in the `days` days ending on each date of a range, for one
+        category or all. The first call indexes the whole ledger; later calls
+        and adds update that index instead of scanning the expenses.
+        """
+        _check_window(days)
+        first, last = _date_span(start_date, end_date)
+        series = self._series(category)
+        sums = series.rolling(first, last, days) if series else [0] * max(last - first + 1, 0)
+        return {format_date(first + i): cents / 100
+                for i, cents in enumerate(sums)}
+
+    def moving_average(self, start_date: str, end_date: str, days: int = 30,
+                       category: Optional[str] = None) -> Dict[str, float]:
+        """Average daily spend over the `days` days ending on each date of a range"""
+        return {date: round(total / days, 2)
+                for date, total in self.rolling_totals(start_date, end_date, days, category).items()}
+
+    @_synchronized
+    def _month_cents(self, year: int, month: int) -> Dict[str, int]:
+        totals = self.rollups.month(year, month)
+        return {category: cents for category, cents in zip(self.ledger.categories, totals) if cents}
+
+    def month_over_month(self, year: int, month: int) -> Dict[str, Dict]:
+        """Each category's total for a month against the month before, with the change"""
+        previous = (year, month - 1) if month > 1 else (year - 1, 12)
+        this, before = self._month_cents(year, month), self._month_cents(*previous)
+        changes = {}
         for category in self.categories:
-            category_total = sum(
-                expense['amount'] for expense in monthly_expenses
-                if expense['category'] == category
-            )
-            if category_total > 0:
-                summary['by_category'][category] = category_total
+            now, then = this.get(category, 0), before.get(category, 0)
+            if now or then:
+                changes[category] = {'total': now / 100, 'previous': then / 100,
+                                     'change': (now - then) / 100,
+                                     'percent': round((now - then) / then * 100, 1) if then else None}
+        return changes
+
+    @property
+    def budgets(self) -> List[Dict]:
+        """Saved budgets: {'category': name or None, 'period': 'month' or days, 'limit': amount}"""
+        try:
+            with open(self.budgets_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _build_monitor(self) -> Optional[BudgetMonitor]:
+        budgets = self.budgets
+        if not budgets:
+            return None
+        anchor = max(datetime.now().toordinal(), max(self.rollups.by_day, default=0))
+        monitor = BudgetMonitor(budgets, self.rollups, self.ledger.categories, anchor)
+        if monitor.widest_window:
+            first = anchor - monitor.widest_window + 1
+            self._load_days(first, anchor)
+            rows = self.ledger.select_days(first, anchor)
+            ledger = self.ledger
+            for day, code, cents in zip(ledger.days[rows.start:rows.stop], ledger.cats[rows.start:rows.stop],
+                                        ledger.cents[rows.start:rows.stop]):
+                monitor.add(day, code, cents, alert=False)
+        return monitor
+
+    def set_budget(self, limit, category: Optional[str] = None, days: Optional[int] = None) -> None:
+        """
+        Save a spending limit for one category (or all, if None), per calendar
+        month or, if days is given, over any window of that many days.
+        """
+        if category is not None and category not in self._category_set:
+            raise ValueError(f"Invalid category {category!r}")
+        if days is not None and not 1 <= days <= 3660:
+            raise ValueError(f"Budget window must be 1 to 3660 days, got {days}")
+        cents = to_minor_units(limit)
+        if cents <= 0:
+            raise ValueError(f"Budget must be greater than 0, got {limit}")
+        period = days or 'month'
+        budgets = [budget for budget in self.budgets
+                   if (budget['category'], budget['period']) != (category, period)]
+        budgets.append({'category': category, 'period': period, 'limit': cents / 100})
+        self._save_budgets(budgets)
+
+    def remove_budget(self, category: Optional[str] = None, days: Optional[int] = None) -> bool:
+        """Delete a budget; returns whether there was one"""
+        budgets = self.budgets
+        kept = [budget for budget in budgets
+                if (budget['category'], budget['period']) != (category, days or 'month')]
+        if len(kept) != len(budgets):
+            self._save_budgets(kept)
+        return len(kept) != len(budgets)
+
+    def _save_budgets(self, budgets: List[Dict]) -> None:
+        tmp_path = self.budgets_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(budgets, f, indent=4)
+        os.replace(tmp_path, self.budgets_path)
+        with self._state_lock:
+            self._monitor = self._build_monitor()
+
+    @_synchronized
+    def budget_status(self) -> List[Dict]:
+        """Each budget with what has been spent this month, or in the window ending today"""
+        if self._monitor is None:
+            return []
+        return self._monitor.status(datetime.now().toordinal())
 
-        return summary
+    def cache_info(self) -> CacheInfo:
+        """Hits, misses and invalidations of the query cache, and its size"""
+        return self._queries.info()
+
+    def cache_clear(self) -> None:
+        """Empty the query cache (the counters are kept)"""
+        self._queries.clear()
+
+    @_synchronized
+    def expense_months(self) -> List[tuple]:
+        """(year, month) of every month with expenses, in order"""
+        return sorted(key for key, totals in self.rollups.by_month.items() if any(totals))
+
+    @_synchronized
+    def month_version(self, year: int, month: int, category: Optional[str] = None) -> list:
+        """
+        A value that changes whenever an expense is added to a month (or to
+        one category of it). Expenses are only ever added, and always with a
+        positive amount, so the month's running totals serve.
+        """
+        totals = self.rollups.month(year, month)
+        if category is None:
+            return list(totals)
+        code = self.ledger.categories.index(category)
+        return [totals[code] if code < len(totals) else 0]
+
+    @_synchronized
+    def export_rows(self, first: int, last: int, category: Optional[str] = None) -> List[tuple]:
+        """(day ordinal, cents, category, description) of each expense between two day ordinals, in date order"""
+        self._load_days(first, last)
+        ledger = self.ledger
+        rows = ledger.select_days(first, last)
+        code = None if category is None else ledger.categories.index(category)
+        names, descriptions = ledger.categories, ledger.descriptions
+        columns = (column[rows.start:rows.stop] for column in ledger._columns())
+        return [(day, cents, names[cat], descriptions[desc_id])
+                for day, cents, cat, desc_id in zip(*columns) if code is None or cat == code]
+
+    @_synchronized
+    def verify_rollups(self) -> List[str]:
+        """
+        Compare the rollups with totals recomputed by brute force from the
+        expense records; returns a description of each difference.
+        """
+        months: Dict[tuple, Dict[str, int]] = {}
+        days: Dict[str, int] = {}
+        categories: Dict[str, int] = {}
+        for expense in self.expenses:
+            cents = to_minor_units(expense['amount'])
+            key = (int(expense['date'][:4]), int(expense['date'][5:7]))
+            month = months.setdefault(key, {})
+            month[expense['category']] = month.get(expense['category'], 0) + cents
+            days[expense['date']] = days.get(expense['date'], 0) + cents
+            categories[expense['category']] = categories.get(expense['category'], 0) + cents
+
+        def named(totals):
+            return {self.ledger.categories[code]: cents for code, cents in enumerate(totals) if cents}
+
+        problems = []
+        if named(self.rollups.by_category) != categories:
+            problems.append(f"all months: saved {named(self.rollups.by_category)}, recomputed {categories}")
+        for key in sorted(set(months) | set(self.rollups.by_month)):
+            stored = named(self.rollups.by_month.get(key, []))
+            if stored != months.get(key, {}):
+                problems.append(f"{key[0]}-{key[1]:02d}: saved {stored}, recomputed {months.get(key, {})}")
+        stored_days = {format_date(day): cents
+                       for day, cents in self.rollups.by_day.items()}
+        for day in sorted(set(days) | set(stored_days)):
+            if stored_days.get(day) != days.get(day):
+                problems.append(f"{day}: saved {stored_days.get(day)}, recomputed {days.get(day)}")
+        return problems
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+SQLITE_BATCH_SIZE = IMPORT_BATCH_SIZE
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    amount_cents INTEGER NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    description TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS expenses_date ON expenses(date, category_id, amount_cents);
+CREATE INDEX IF NOT EXISTS expenses_category ON expenses(category_id, date, amount_cents);
+"""
+
+class SQLiteRollups(ExpenseRollups):
+    """
+    The month totals a BudgetMonitor reads, for an SQLite tracker. A month is
+    fetched with one GROUP BY over the date index the first time it is asked
+    for, then kept up to date by add() until clear().
+    """
+
+    def __init__(self, tracker: 'SQLiteExpenseTracker'):
+        super().__init__()
+        self.tracker = tracker
+
+    def month(self, year: int, month: int) -> List[int]:
+        totals = self.by_month.get((year, month))
+        if totals is None:
+            totals = self.by_month[(year, month)] = self.tracker._month_totals(year, month)
+        return totals
+
+    def clear(self) -> None:
+        self.by_month.clear()
+        self.by_day.clear()
+        self.by_category.clear()
+
+class SQLiteExpenseTracker(ExpenseTracker):
+    """
+    ExpenseTracker stored in an SQLite database.
+
+    Used automatically when the filename ends in .db, .sqlite or .sqlite3.
+    Categories are a separate table referenced by id, amounts are integer
+    cents, and dates are ISO strings. Both indexes (by date and by category)
+    also hold the amount, so totals are computed from the index alone and a
+    date range is an index range scan. Summaries, reports and breakdowns are computed by SQL
+    (WHERE and GROUP BY), and only the rows a caller asks for reach Python.
+    Rolling totals and budget checks read per-day and per-month sums the same way.
+    The database runs in WAL mode, and bulk inserts are committed in
+    transactions of SQLITE_BATCH_SIZE rows.
+    """
+
+    def __init__(self, filename: str = "expenses.db", sync_every: int = 1, lazy: bool = True,
+                 cache_size: int = QUERY_CACHE_SIZE):
+        # lazy and cache_size are accepted for ExpenseTracker compatibility: SQLite
+        # loads nothing up front, and other connections can write, so results are never cached
+        self.filename = filename
+        self.rates_path = filename + ".rates"
+        self.budgets_path = filename + ".budgets"
+        self._rates: Optional[ExchangeRates] = None
+        self._rates_signature = None
+        self._queries = QueryCache(0)
+        self._state_lock = threading.RLock()
+        self._monitor: Optional[BudgetMonitor] = None
+        self.alerts: deque = deque(maxlen=100)
+        self.on_alert = None
+        self.categories = list(CATEGORIES)
+        self._category_set = frozenset(self.categories)
+        self._codes = {name: code for code, name in enumerate(self.categories)}
+        self.db = sqlite3.connect(filename, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.load_expenses()
+        self._monitor = self._build_monitor()
+
+    def load_expenses(self) -> None:
+        """Create the schema if needed and load the category ids"""
+        with self.db:
+            self.db.executescript(SQLITE_SCHEMA)
+            self.db.executemany("INSERT OR IGNORE INTO categories (name) VALUES (?)",
+                                [(name,) for name in self.categories])
+        self._category_ids = dict(self.db.execute("SELECT name, id FROM categories"))
+        self._category_names = {category_id: name for name, category_id in self._category_ids.items()}
+
+    def refresh(self) -> None:
+        """Nothing to do: SQLite does its own locking, and every query reads the database"""
+
+    def _category_id(self, name: str) -> int:
+        category_id = self._category_ids.get(name)
+        if category_id is None:
+            cursor = self.db.execute("INSERT INTO categories (name) VALUES (?)", (name,))
+            category_id = self._category_ids[name] = cursor.lastrowid
+            self._category_names[category_id] = name
+        return category_id
+
+    def _row(self, expense: Dict) -> tuple:
+        return (expense['date'], to_minor_units(expense['amount']),
+                self._category_id(expense['category']), expense['description'])
+
+    def _store_batch(self, expenses: List[Dict]) -> None:
+        """Insert validated expenses in one transaction, then check them against the budgets"""
+        rows = [self._row(expense) for expense in expenses]
+        with self.db:
+            self.db.executemany("INSERT INTO expenses (date, amount_cents, category_id, description) "
+                                "VALUES (?, ?, ?, ?)", rows)
+        if self._monitor is not None:
+            added = [(parse_date(expense['date']), self._codes[expense['category']], row[1])
+                     for expense, row in zip(expenses, rows)]
+            rollups = self._monitor.rollups
+            rollups.clear()
+            # Month totals from before the batch, so each expense is checked as it is counted
+            for day, code, cents in added:
+                rollups.month(*rollups._month_of(day))[code] -= cents
+            for day, code, cents in added:
+                rollups.add(day, code, cents)
+                self._check_budgets(day, code, cents)
+
+    def insert_many(self, expenses) -> int:
+        """Insert already valid expense dicts in transactions of SQLITE_BATCH_SIZE rows; returns the count"""
+        count = 0
+        expenses = iter(expenses)
+        while True:
+            batch = list(islice(expenses, SQLITE_BATCH_SIZE))
+            if not batch:
+                return count
+            self._store_batch(batch)
+            count += len(batch)
+
+    def _select(self, where: str = "", params: tuple = ()) -> List[Dict]:
+        rows = self.db.execute(
+            "SELECT e.date, e.amount_cents, c.name, e.description "
+            "FROM expenses e JOIN categories c ON c.id = e.category_id "
+            f"{where} ORDER BY e.date, e.id", params)
+        return [{'date': day, 'amount': cents / 100, 'category': category, 'description': description}
+                for day, cents, category, description in rows]
+
+    def _category_cents(self, where: str = "", params: tuple = ()) -> Dict[str, int]:
+        rows = self.db.execute("SELECT category_id, SUM(amount_cents) FROM expenses e "
+                               f"{where} GROUP BY category_id ORDER BY category_id", params)
+        return {self._category_names[category_id]: cents for category_id, cents in rows if cents > 0}
+
+    def _category_sums(self, where: str = "", params: tuple = ()) -> Dict[str, float]:
+        return {category: cents / 100 for category, cents in self._category_cents(where, params).items()}
+
+    @property
+    def expenses(self) -> List[Dict]:
+        return self._select()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM expenses").fetchone()[0]
+
+    def get_monthly_summary(self, year: int, month: int) -> Dict:
+        """Generate monthly expense summary"""
+        last = calendar.monthrange(year, month)[1]
+        params = (f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-{last:02d}")
+        where = "WHERE e.date BETWEEN ? AND ?"
+        by_category = self._category_cents(where, params)
+        return {
+            'total': sum(by_category.values()) / 100,
+            'by_category': {category: cents / 100 for category, cents in by_category.items()},
+            'expenses': self._select(where, params)
+        }
 
     def get_expense_report(self, start_date: str, end_date: str) -> List[Dict]:
         """Generate expense report for date range"""
-        start = datetime.strptime(start_date, '%Y-%m-%d')
-        end = datetime.strptime(end_date, '%Y-%m-%d')
-
-        return [
-            expense for expense in self.expenses
-            if start <= datetime.strptime(expense['date'], '%Y-%m-%d') <= end
-        ]
+        return self._select("WHERE e.date BETWEEN ? AND ?", _date_bounds(start_date, end_date))
 
     def get_category_breakdown(self) -> Dict[str, float]:
         """Get total expenses by category"""
-        breakdown = {category: 0.0 for category in self.categories}
-        for expense in self.expenses:
-            breakdown[expense['category']] += expense['amount']
-        return {k: v for k, v in breakdown.items() if v > 0}
+        return self._category_sums()
+
+    def get_daily_totals(self, start_date: str, end_date: str) -> Dict[str, float]:
+        """Total spent on each day with expenses in a date range"""
+        rows = self.db.execute("SELECT date, SUM(amount_cents) FROM expenses "
+                               "WHERE date BETWEEN ? AND ? GROUP BY date ORDER BY date",
+                               _date_bounds(start_date, end_date))
+        return {day: cents / 100 for day, cents in rows}
+
+    def expense_months(self) -> List[tuple]:
+        rows = self.db.execute("SELECT DISTINCT substr(date, 1, 7) FROM expenses ORDER BY 1")
+        return [(int(key[:4]), int(key[5:7])) for key, in rows]
+
+    def month_version(self, year: int, month: int, category: Optional[str] = None) -> list:
+        where, params = self._month_filter(year, month, category)
+        return list(self.db.execute(f"SELECT COUNT(*), COALESCE(SUM(amount_cents), 0) FROM expenses "
+                                    f"{where}", params).fetchone())
+
+    def export_rows(self, first: int, last: int, category: Optional[str] = None) -> List[tuple]:
+        where, params = "WHERE date BETWEEN ? AND ?", (format_date(first),
+                                                       format_date(last))
+        if category is not None:
+            where, params = where + " AND category_id = ?", params + (self._category_ids[category],)
+        rows = self.db.execute("SELECT date, amount_cents, category_id, description FROM expenses "
+                               f"{where} ORDER BY date, id", params)
+        names = self._category_names
+        return [(parse_date(day), cents, names[category_id], description)
+                for day, cents, category_id, description in rows]
+
+    def _month_filter(self, year: int, month: int, category: Optional[str]) -> tuple:
+        where = "WHERE date BETWEEN ? AND ?"
+        params = (f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-31")
+        if category is not None:
+            where, params = where + " AND category_id = ?", params + (self._category_ids[category],)
+        return where, params
+
+    def _month_cents(self, year: int, month: int) -> Dict[str, int]:
+        where, params = self._month_filter(year, month, None)
+        rows = self.db.execute(f"SELECT category_id, SUM(amount_cents) FROM expenses {where} "
+                               "GROUP BY category_id", params)
+        return {self._category_names[category_id]: cents for category_id, cents in rows if cents}
+
+    def _month_totals(self, year: int, month: int) -> List[int]:
+        """Totals per category code for one month"""
+        cents = self._month_cents(year, month)
+        return [cents.get(name, 0) for name in self.categories]
+
+    def _day_sums(self, first: int, last: int, category: Optional[str] = None) -> List[tuple]:
+        """(day ordinal, category, cents) for each day and category with expenses in a range"""
+        where, params = "WHERE date BETWEEN ? AND ?", (format_date(first), format_date(last))
+        if category is not None:
+            where, params = where + " AND category_id = ?", params + (self._category_id(category),)
+        rows = self.db.execute(f"SELECT date, category_id, SUM(amount_cents) FROM expenses {where} "
+                               "GROUP BY date, category_id", params)
+        names = self._category_names
+        return [(parse_date(day), names[category_id], cents) for day, category_id, cents in rows]
+
+    def rolling_totals(self, start_date: str, end_date: str, days: int = 30,
+                       category: Optional[str] = None) -> Dict[str, float]:
+        """
+        Spend in the `days` days ending on each date of a range, for one
+        category or all, from the day sums of the range and the days before it.
+        """
+        if category is not None and category not in self._category_set:
+            raise ValueError(f"Invalid category {category!r}")
+        _check_window(days)
+        first, last = _date_span(start_date, end_date)
+        origin = first - days + 1
+        daily = array('q', bytes(8 * max(last - origin + 1, 0)))
+        for day, _, cents in self._day_sums(origin, last, category):
+            daily[day - origin] += cents
+        sums = DailySeries(origin, daily).rolling(first, last, days)
+        return {format_date(first + i): cents / 100
+                for i, cents in enumerate(sums)}
+
+    def _build_monitor(self) -> Optional[BudgetMonitor]:
+        budgets = self.budgets
+        if not budgets:
+            return None
+        latest = self.db.execute("SELECT MAX(date) FROM expenses").fetchone()[0]
+        anchor = max(datetime.now().toordinal(), parse_date(latest) if latest else 0)
+        monitor = BudgetMonitor(budgets, SQLiteRollups(self), self.categories, anchor)
+        if monitor.widest_window:
+            for day, category, cents in self._day_sums(anchor - monitor.widest_window + 1, anchor):
+                if category in self._codes:
+                    monitor.add(day, self._codes[category], cents, alert=False)
+        return monitor
+
+    def budget_status(self) -> List[Dict]:
+        """Each budget with what has been spent this month, or in the window ending today"""
+        # Rebuilt from SQL, so expenses other connections added are included
+        self._monitor = self._build_monitor()
+        if self._monitor is None:
+            return []
+        return self._monitor.status(datetime.now().toordinal())
+
+    def verify_rollups(self) -> List[str]:
+        return []  # totals are always computed by SQL
+
+    def rebuild_rollups(self) -> None:
+        pass
+
+    def save_expenses(self) -> None:
+        self.db.commit()
+
+    def compact(self) -> None:
+        """Checkpoint the WAL into the database file"""
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def sync(self) -> None:
+        self.db.commit()
+
+    def close(self) -> None:
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+# Exported reports cache each whole month's rendered rows under <file>.exports/
+EXPORT_CACHE_VERSION = 2
+
+class CSVReport:
+    """Plain CSV: a header row, then date,amount,category,description rows"""
+    extension = 'csv'
+
+    def __init__(self, title: str, categories: List[str]):
+        self.dates = _text_of_day
+
+    def start(self) -> bytes:
+        return b"date,amount,category,description\r\n"
+
+    def chunk(self, rows: List[tuple]) -> bytes:
+        buffer = io.StringIO()
+        dates = self.dates
+        csv.writer(buffer).writerows((dates[day], _format_cents(cents), category, description)
+                                     for day, cents, category, description in rows)
+        return buffer.getvalue().encode('utf-8')
+
+    def finish(self, totals: Dict[str, int], count: int) -> bytes:
+        return b""
+
+class ColumnarReport:
+    """
+    Compact binary report, laid out like the row groups of a Parquet file:
+
+        b"EXPREP02", uint32 meta length, JSON meta {title, byteorder}
+        per chunk: uint32 rows, uint32 dictionary length, JSON list of the
+                   chunk's category names, then int32 day ordinals, int64
+                   cents, uint8 category codes into that list, uint32
+                   description lengths and the UTF-8 descriptions
+        uint32 0, uint32 footer length, JSON footer {rows, totals}
+
+    Counts and lengths are little-endian; the columns use the byte order
+    named in the meta. Each chunk carries its own category dictionary, so a
+    cached chunk stays valid whatever categories other months use.
+    """
+    extension = 'cols'
+    MAGIC = b"EXPREP02"
+
+    def __init__(self, title: str, categories: List[str]):
+        self.title = title
+
+    def start(self) -> bytes:
+        meta = json.dumps({'title': self.title, 'byteorder': sys.byteorder}).encode('utf-8')
+        return self.MAGIC + struct.pack('<I', len(meta)) + meta
+
+    def chunk(self, rows: List[tuple]) -> bytes:
+        if not rows:
+            return b""
+        days, cents, categories, descriptions = zip(*rows)
+        names = list(dict.fromkeys(categories))
+        if len(names) > 256:
+            raise ValueError("Too many distinct categories in one month for a columnar report")
+        codes = {name: code for code, name in enumerate(names)}
+        dictionary = json.dumps(names).encode('utf-8')
+        encoded = [description.encode('utf-8') for description in descriptions]
+        return b"".join((struct.pack('<II', len(rows), len(dictionary)), dictionary, array('i', days).tobytes(),
+                         array('q', cents).tobytes(), bytes(codes[name] for name in categories),
+                         array('I', map(len, encoded)).tobytes(), b"".join(encoded)))
+
+    def finish(self, totals: Dict[str, int], count: int) -> bytes:
+        footer = json.dumps({'rows': count, 'totals': totals}).encode('utf-8')
+        return struct.pack('<II', 0, len(footer)) + footer
+
+class HTMLReport:
+    """A self-contained HTML page: one table of expenses, then totals by category"""
+    extension = 'html'
+    STYLE = ("body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:2em}"
+             "th,td{border-bottom:1px solid #ddd;padding:4px 12px;text-align:left}"
+             "td.amount,th.amount{text-align:right}tbody tr:nth-child(even){background:#f6f6f6}")
+
+    def __init__(self, title: str, categories: List[str]):
+        self.title = html.escape(title)
+        self.dates = _text_of_day
+
+    def start(self) -> bytes:
+        return (f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{self.title}</title>"
+                f"<style>{self.STYLE}</style></head><body>\n<h1>{self.title}</h1>\n<table>\n"
+                "<thead><tr><th>Date</th><th class=\"amount\">Amount</th><th>Category</th>"
+                "<th>Description</th></tr></thead>\n").encode('utf-8')
+
+    def chunk(self, rows: List[tuple]) -> bytes:
+        if not rows:
+            return b""
+        dates, escape = self.dates, html.escape
+        lines = [f"<tr><td>{dates[day]}</td><td class=\"amount\">${_format_cents(cents)}</td>"
+                 f"<td>{escape(category)}</td><td>{escape(description)}</td></tr>\n"
+                 for day, cents, category, description in rows]
+        return ("<tbody>\n" + "".join(lines) + "</tbody>\n").encode('utf-8')
+
+    def finish(self, totals: Dict[str, int], count: int) -> bytes:
+        total = sum(totals.values())
+        lines = [f"<tr><td>{html.escape(category)}</td><td class=\"amount\">${_format_cents(cents)}</td>"
+                 f"<td class=\"amount\">{cents / total * 100 if total else 0:.1f}%</td></tr>\n"
+                 for category, cents in sorted(totals.items(), key=lambda item: -item[1])]
+        return ("</table>\n<h2>Totals</h2>\n<table>\n<thead><tr><th>Category</th>"
+                "<th class=\"amount\">Amount</th><th class=\"amount\">Share</th></tr></thead>\n<tbody>\n"
+                + "".join(lines) + "</tbody>\n"
+                f"<tfoot><tr><th>{count:,} expenses</th><th class=\"amount\">${_format_cents(total)}</th>"
+                "<th></th></tr></tfoot>\n</table>\n</body></html>\n").encode('utf-8')
+
+REPORT_FORMATS = {report.extension: report for report in (CSVReport, ColumnarReport, HTMLReport)}
+
+class ExportCache:
+    """
+    Rendered month chunks in `<file>.exports/`, with an index recording the
+    version of the month each was rendered from (see month_version).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.entries: Dict[str, dict] = data.get('chunks', {}) \
+            if data.get('version') == EXPORT_CACHE_VERSION else {}
+        self.changed = False
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace('/', '_') + ".part")
+
+    def get(self, key: str, version: list) -> Optional[tuple]:
+        """(chunk bytes, row count, totals) if the chunk is cached for this version"""
+        entry = self.entries.get(key)
+        if entry is None or entry['version'] != version:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read(), entry['rows'], entry['totals']
+        except OSError:
+            return None
+
+    def put(self, key: str, version: list, data: bytes, count: int, totals: Dict[str, int]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        with open(path + ".tmp", 'wb') as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        self.entries[key] = {'version': version, 'rows': count, 'totals': totals}
+        self.changed = True
+
+    def save(self) -> None:
+        if self.changed:
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': EXPORT_CACHE_VERSION, 'chunks': self.entries}, f)
+            os.replace(tmp_path, self.index_path)
+
+def export_report(tracker: ExpenseTracker, output, fmt: str = 'csv', start_date: Optional[str] = None,
+                  end_date: Optional[str] = None, category: Optional[str] = None,
+                  title: Optional[str] = None) -> Dict[str, int]:
+    """
+    Write a report of the expenses between two dates (default: all of them),
+    optionally of one category, as CSV, columnar binary or HTML.
+
+    Rows are streamed a month at a time in the order they are stored, which
+    is already date order. Each whole month is rendered once and cached; a
+    later export reuses it until an expense is added to that month, without
+    loading the month's expenses at all. Months cut by the date range are
+    rendered fresh.
+
+    Args:
+        output: Path or binary file object to write to
+        fmt (str): 'csv', 'cols' or 'html'
+
+    Returns:
+        dict: 'rows' written, 'months' covered and 'cached' months reused
+    """
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}. Choose from: {', '.join(REPORT_FORMATS)}")
+    if category is not None and category not in tracker.categories:
+        raise ValueError(f"Invalid category {category!r}")
+    first = parse_date(start_date) if start_date else None
+    last = parse_date(end_date) if end_date else None
+    if title is None:
+        title = " ".join(filter(None, (category or "All", "expenses",
+                                        start_date and f"from {start_date}", end_date and f"to {end_date}")))
+    report = REPORT_FORMATS[fmt](title, tracker.categories)
+    cache = ExportCache(tracker.filename + ".exports")
+    stats = {'rows': 0, 'months': 0, 'cached': 0}
+    totals: Dict[str, int] = {}
+
+    def write(f):
+        f.write(report.start())
+        for year, month in tracker.expense_months():
+            month_first = month_start(year, month)
+            month_last = month_first + calendar.monthrange(year, month)[1] - 1
+            if (first is not None and month_last < first) or (last is not None and month_first > last):
+                continue
+            whole = (first is None or first <= month_first) and (last is None or month_last <= last)
+            key = f"{fmt}/{year:04d}-{month:02d}/{category or '*'}"
+            version = tracker.month_version(year, month, category) if whole else None
+            cached = cache.get(key, version) if whole else None
+            if cached is not None:
+                data, count, chunk_totals = cached
+                stats['cached'] += 1
+            else:
+                rows = tracker.export_rows(max(month_first, first or month_first),
+                                           min(month_last, last or month_last), category)
+                data, count, chunk_totals = report.chunk(rows), len(rows), {}
+                for _, cents, name, _ in rows:
+                    chunk_totals[name] = chunk_totals.get(name, 0) + cents
+                if whole:
+                    cache.put(key, version, data, count, chunk_totals)
+            f.write(data)
+            stats['months'] += 1
+            stats['rows'] += count
+            for name, cents in chunk_totals.items():
+                totals[name] = totals.get(name, 0) + cents
+        f.write(report.finish(totals, stats['rows']))
+
+    if hasattr(output, 'write'):
+        write(output)
+    else:
+        with open(output, 'wb') as f:
+            write(f)
+    cache.save()
+    return stats
 
 def print_menu() -> None:
     """Display main menu"""
@@ -93,36 +2223,253 @@ def print_menu() -> None:
     print("3. View Category Breakdown")
     print("4. Generate Custom Report")
     print("5. View All Categories")
-    print("6. Exit")
+    print("6. Export Report")
+    print("7. Exit")
 
 def get_valid_date(prompt: str) -> str:
     """Get and validate date input"""
     while True:
         try:
             date_str = input(prompt + " (YYYY-MM-DD): ")
-            datetime.strptime(date_str, '%Y-%m-%d')
-            return date_str
+            return format_date(parse_date(date_str.strip()))
         except ValueError:
             print("Invalid date format. Please use YYYY-MM-DD")
 
 def get_valid_amount() -> float:
-    """Get and validate amount input"""
+    """Get and validate amount input, rounded to whole cents"""
     while True:
         try:
-            amount = float(input("Enter amount: "))
-            if amount <= 0:
+            cents = to_minor_units(input("Enter amount: ").strip())
+            if cents <= 0:
                 print("Amount must be greater than 0")
                 continue
-            return round(amount, 2)
+            return cents / 100
         except ValueError:
             print("Please enter a valid number")
 
+def positive_int(text: str) -> int:
+    """argparse type for counts that must be at least 1"""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer {text!r}") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
 def main():
-    tracker = ExpenseTracker()
+    parser = argparse.ArgumentParser(description="Track and analyze your expenses")
+    parser.add_argument("-f", "--file", default="expenses.json", help="Expense file (default: expenses.json)")
+    subparsers = parser.add_subparsers(dest="command")
+    bench_parser = subparsers.add_parser("benchmark", help="Run a performance benchmark")
+    bench_parser.add_argument("name", choices=sorted(BENCHMARKS), help="Benchmark to run")
+    check_parser = subparsers.add_parser("check", help="Verify the saved totals against the expenses")
+    check_parser.add_argument("--rebuild", action="store_true", help="Recompute the totals if they differ")
+    migrate_parser = subparsers.add_parser("migrate", help="Copy every expense into another file, e.g. a .db")
+    migrate_parser.add_argument("destination", help="Destination file (.json, or .db/.sqlite for SQLite)")
+    import_parser = subparsers.add_parser("import", help="Import expenses from a CSV or JSON-lines file")
+    import_parser.add_argument("source", help="CSV file with date,amount,category,description columns, "
+                                              "or a .jsonl file of expense objects")
+    import_parser.add_argument("--skip-invalid", action="store_true",
+                               help="Skip invalid rows instead of stopping at the first one")
+    import_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE,
+                               help=f"Expenses per write (default: {IMPORT_BATCH_SIZE:,})")
+    import_parser.add_argument("--currency", help=f"Currency of rows without a currency column "
+                                                  f"(default: {BASE_CURRENCY})")
+    export_parser = subparsers.add_parser("export", help="Write a CSV, columnar binary or HTML report")
+    export_parser.add_argument("format", choices=sorted(REPORT_FORMATS), help="Report format")
+    export_parser.add_argument("output", help="Report file to write")
+    export_parser.add_argument("--month", help="Report on one month (YYYY-MM)")
+    export_parser.add_argument("--from", dest="start_date", help="First date (YYYY-MM-DD)")
+    export_parser.add_argument("--to", dest="end_date", help="Last date (YYYY-MM-DD)")
+    export_parser.add_argument("--category", help="Report on one category")
+    budget_parser = subparsers.add_parser("budget", help="Show budgets and spending, or set/remove one")
+    budget_parser.add_argument("action", nargs="?", choices=["show", "set", "remove"], default="show")
+    budget_parser.add_argument("category", nargs="?", help="Category, or 'all'")
+    budget_parser.add_argument("limit", nargs="?", help="Spending limit (for set)")
+    budget_parser.add_argument("--days", type=int, help="Budget over any N days instead of per month")
+    trends_parser = subparsers.add_parser("trends", help="Month-over-month changes and rolling spend")
+    trends_parser.add_argument("--month", help="Month to compare with the one before (YYYY-MM, default: this month)")
+    trends_parser.add_argument("--days", type=positive_int, default=30, help="Rolling window in days (default: 30)")
+    rates_parser = subparsers.add_parser("rates", help="List exchange rates, or set one")
+    rates_parser.add_argument("currency", nargs="?", help="Currency code, e.g. EUR")
+    rates_parser.add_argument("rate", nargs="?", help=f"Units of the currency per 1 {BASE_CURRENCY}")
+
+    args = parser.parse_args()
+    if args.command == "benchmark":
+        return BENCHMARKS[args.name]()
+    if args.command == "check":
+        return check_rollups(args.file, args.rebuild)
+    if args.command == "migrate":
+        return migrate(args.file, args.destination)
+    if args.command == "import":
+        return import_file(args.file, args.source, args.batch_size, args.skip_invalid, args.currency)
+    if args.command == "export":
+        return export_file(args.file, args)
+    if args.command == "budget":
+        return manage_budgets(args.file, args.action, args.category, args.limit, args.days)
+    if args.command == "trends":
+        return show_trends(args.file, args.month, args.days)
+    if args.command == "rates":
+        return manage_rates(args.file, args.currency, args.rate)
+
+    with ExpenseTracker(args.file) as tracker:
+        interactive_mode(tracker)
+
+def check_rollups(filename: str, rebuild: bool) -> None:
+    """Report any difference between the rollups and a brute-force recomputation"""
+    with ExpenseTracker(filename) as tracker:
+        problems = tracker.verify_rollups()
+        for problem in problems[:20]:
+            print(problem)
+        if len(problems) > 20:
+            print(f"... and {len(problems) - 20} more")
+        if not problems:
+            print(f"Totals match for {len(tracker):,} expenses.")
+        elif rebuild:
+            tracker.rebuild_rollups()
+            tracker.compact()
+            print("Totals rebuilt.")
+        else:
+            print("Run with --rebuild to recompute them.")
+            sys.exit(1)
+
+def read_expense_file(path: str):
+    """
+    Stream expense records from a CSV file (with a header row) or a JSON-lines
+    file (.jsonl / .ndjson), one dict at a time.
+    """
+    if path.lower().endswith(('.jsonl', '.ndjson')):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            yield from csv.DictReader(f)
+
+def import_file(filename: str, source: str, batch_size: int, skip_invalid: bool,
+                currency: Optional[str] = None) -> None:
+    """Import a CSV/JSON-lines file and report throughput"""
+    start = time.perf_counter()
+    with ExpenseTracker(filename) as tracker:
+        try:
+            imported, skipped = tracker.import_many(read_expense_file(source), batch_size,
+                                                    skip_invalid, currency)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"Imported {imported:,} expenses ({skipped:,} skipped) in {elapsed:.1f}s "
+          f"({imported / elapsed:,.0f} rows/sec)")
+
+def export_file(filename: str, args) -> None:
+    """Export a report from the command line and say how much came from the cache"""
+    start_date, end_date = args.start_date, args.end_date
+    if args.month:
+        try:
+            year, month = map(int, args.month.split('-'))
+            start_date = f"{year:04d}-{month:02d}-01"
+            end_date = f"{year:04d}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"
+        except ValueError:
+            print(f"Error: invalid month {args.month!r}, expected YYYY-MM")
+            sys.exit(1)
+    start = time.perf_counter()
+    with ExpenseTracker(filename) as tracker:
+        try:
+            stats = export_report(tracker, args.output, args.format, start_date, end_date, args.category)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    print(f"Wrote {stats['rows']:,} expenses to {args.output} in {time.perf_counter() - start:.2f}s "
+          f"({stats['cached']} of {stats['months']} months from the cache)")
+
+def manage_budgets(filename: str, action: str, category: Optional[str], limit: Optional[str],
+                   days: Optional[int]) -> None:
+    """Set or remove a budget, then print every budget with what has been spent against it"""
+    category = None if category in (None, 'all') else category
+    with ExpenseTracker(filename) as tracker:
+        try:
+            if action == "set":
+                if limit is None:
+                    raise ValueError("give a category (or 'all') and a limit")
+                tracker.set_budget(limit, category, days)
+            elif action == "remove" and not tracker.remove_budget(category, days):
+                raise ValueError("no such budget")
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        status = tracker.budget_status()
+    if not status:
+        print("No budgets set.")
+    for budget in status:
+        period = "this month" if budget['period'] == 'month' else f"last {budget['period']} days"
+        share = budget['spent'] / budget['limit'] * 100
+        print(f"{budget['category'] or 'All categories':<16} {period:<16} ${budget['spent']:>10.2f} "
+              f"of ${budget['limit']:>10.2f} ({share:.0f}%){'  OVER' if share > 100 else ''}")
+
+def show_trends(filename: str, month: Optional[str], days: int) -> None:
+    """Print each category's change from the previous month and its rolling spend"""
+    try:
+        year, month = map(int, month.split('-')) if month else (datetime.now().year, datetime.now().month)
+        end = datetime(year, month, calendar.monthrange(year, month)[1]).strftime('%Y-%m-%d')
+    except ValueError:
+        print(f"Error: invalid month {month!r}, expected YYYY-MM")
+        sys.exit(1)
+    with ExpenseTracker(filename) as tracker:
+        changes = tracker.month_over_month(year, month)
+        print(f"{'category':<16} {calendar.month_abbr[month] + ' ' + str(year):>12} {'previous':>12} "
+              f"{'change':>12} {f'{days}-day avg':>12}")
+        for category, change in changes.items():
+            average = tracker.moving_average(end, end, days, category)[end]
+            percent = f"{change['percent']:+.1f}%" if change['percent'] is not None else "new"
+            print(f"{category:<16} {change['total']:>12.2f} {change['previous']:>12.2f} "
+                  f"{percent:>12} {average:>12.2f}")
+
+def manage_rates(filename: str, currency: Optional[str], rate: Optional[str]) -> None:
+    """Print the saved exchange rates, or set one"""
+    with ExpenseTracker(filename) as tracker:
+        if currency and rate:
+            try:
+                tracker.set_rate(currency, rate)
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+        elif currency:
+            print("Error: give both a currency and a rate")
+            sys.exit(1)
+        for code, value in sorted(tracker.rates.rates.items()):
+            if code != BASE_CURRENCY:
+                print(f"1 {BASE_CURRENCY} = {value} {code}")
+
+def migrate(source: str, destination: str) -> None:
+    """Copy all expenses from one storage backend to another"""
+    if Path(destination).exists() and os.path.getsize(destination):
+        print(f"Error: {destination} already exists")
+        sys.exit(1)
+    start = time.perf_counter()
+    with ExpenseTracker(source) as src, ExpenseTracker(destination) as dest:
+        count = copy_expenses(src, dest)
+    print(f"Copied {count:,} expenses to {destination} in {time.perf_counter() - start:.1f}s")
 
+def copy_expenses(src: ExpenseTracker, dest: ExpenseTracker) -> int:
+    """Copy every expense from src into dest; returns the count"""
+    if isinstance(dest, SQLiteExpenseTracker):
+        return dest.insert_many(src.expenses)
+    count = 0
+    for expense in src.expenses:
+        dest.ledger.append(expense)
+        count += 1
+    dest.rebuild_rollups()
+    dest.compact()
+    return count
+
+def interactive_mode(tracker: ExpenseTracker) -> None:
+    """Menu-driven interface"""
+    tracker.on_alert = lambda alert: print(f"Budget alert: {alert}")
     while True:
         print_menu()
-        choice = input("\nEnter your choice (1-6): ")
+        choice = input("\nEnter your choice (1-7): ")
 
         if choice == '1':
             # Add expense
@@ -184,12 +2531,12 @@ def main():
             end_date = get_valid_date("Enter end date")
             
             report = tracker.get_expense_report(start_date, end_date)
-            total = sum(expense['amount'] for expense in report)
+            total = sum(to_minor_units(expense['amount']) for expense in report) / 100
             
             print(f"\nExpenses from {start_date} to {end_date}")
             print(f"Total: ${total:.2f}")
             
-            for expense in sorted(report, key=lambda x: x['date']):
+            for expense in report:  # already in date order
                 print(f"{expense['date']} - {expense['category']}: "
                       f"${expense['amount']:.2f} ({expense['description']})")
 
@@ -200,11 +2547,541 @@ def main():
                 print(category)
 
         elif choice == '6':
+            # Export
+            print("\n=== Export Report ===")
+            fmt = input(f"Format ({'/'.join(REPORT_FORMATS)}): ").strip().lower() or 'csv'
+            start_date = input("Start date (YYYY-MM-DD, blank for the first expense): ").strip() or None
+            end_date = input("End date (YYYY-MM-DD, blank for the last expense): ").strip() or None
+            category = input("Category (blank for all): ").strip() or None
+            output = input("Output file: ").strip() or f"expenses.{fmt}"
+            try:
+                stats = export_report(tracker, output, fmt, start_date, end_date, category)
+                print(f"Wrote {stats['rows']:,} expenses to {output}")
+            except (OSError, ValueError) as e:
+                print(f"Error: {e}")
+
+        elif choice == '7':
             print("\nThank you for using Expense Tracker!")
             break
 
         else:
             print("Invalid choice. Please try again.")
 
+def synthetic_expenses(n: int, seed: int = 1) -> List[Dict]:
+    """Build n random expenses spread over recent years, for benchmarks"""
+    import random
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1).toordinal()
+    return [{
+        'date': format_date(start + rng.randrange(5 * 365)),
+        'amount': rng.randrange(1, 50000) / 100,
+        'category': rng.choice(CATEGORIES),
+        'description': f"Expense {i}"
+    } for i in range(n)]
+
+def benchmark_journal() -> None:
+    """Per-add latency of the journal against rewriting the whole file, as the ledger grows"""
+    adds = 200
+    print(f"{'ledger size':>12} {'journal add':>14} {'full rewrite':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (1000, 10000, 100000, 1000000):
+            path = os.path.join(tmp, f"expenses-{size}.json")
+            expenses = synthetic_expenses(size)
+            with open(path, 'w') as f:
+                json.dump(expenses, f)
+
+            with ExpenseTracker(path) as tracker:
+                latencies = []
+                for _ in range(adds):
+                    start = time.perf_counter()
+                    tracker.add_expense(12.5, "Food", "Lunch")
+                    latencies.append(time.perf_counter() - start)
+            latencies.sort()
+
+            # The old add: json.dump the whole list with indent=4
+            start = time.perf_counter()
+            with open(path + ".old", 'w') as f:
+                json.dump(expenses, f, indent=4)
+            rewrite = time.perf_counter() - start
+            print(f"{size:>12,} {latencies[adds // 2] * 1e3:>12.3f}ms {rewrite * 1e3:>12.1f}ms")
+
+def benchmark_columnar() -> None:
+    """Memory per expense and full-ledger breakdown time of the columnar ledger"""
+    import random
+    import tracemalloc
+
+    sample = synthetic_expenses(100000)
+    tracemalloc.start()
+    rows = json.loads(json.dumps(sample))
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    ledger = ExpenseLedger(CATEGORIES)
+    ledger.extend(rows)
+    column_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"Memory per expense: {dict_bytes / len(rows):.0f} bytes as dicts, "
+          f"{column_bytes / len(rows):.0f} bytes in columns (unique descriptions included)")
+
+    start = time.perf_counter()
+    breakdown = {}
+    for expense in rows:
+        breakdown[expense['category']] = breakdown.get(expense['category'], 0) + expense['amount']
+    dict_time = (time.perf_counter() - start) * 100  # scaled to 10M rows
+    del rows
+
+    size = 10000000
+    rng = random.Random(1)
+    ledger = ExpenseLedger(CATEGORIES)
+    ledger.cats = array('B', bytes(b % len(CATEGORIES) for b in rng.randbytes(size)))
+    ledger.cents = array('q', (rng.randrange(1, 50000) for _ in range(size)))
+    start = time.perf_counter()
+    ledger.category_totals()
+    column_time = time.perf_counter() - start
+    engine = "numpy.bincount" if np is not None else "a zip loop (install numpy for bincount)"
+    print(f"Breakdown of 10M expenses: {column_time * 1e3:,.0f} ms with {engine}, "
+          f"about {dict_time * 1e3:,.0f} ms looping over dicts")
+
+def benchmark_index() -> None:
+    """Month query time as the ledger grows, against a full scan"""
+    import random
+    rng = random.Random(1)
+    start_day = datetime(2000, 1, 1).toordinal()
+    first = datetime(2000, 3, 1).toordinal()
+    last = datetime(2000, 3, 31).toordinal()
+    runs = 100
+    print(f"{'ledger size':>12} {'rows':>8} {'indexed':>12} {'full scan':>12}")
+    for size in (10000, 100000, 1000000, 10000000):
+        ledger = ExpenseLedger(CATEGORIES)
+        # About 30 expenses a day, so the queried month has the same number of rows at every size
+        span = size // 30
+        ledger.days = array('i', sorted(start_day + rng.randrange(span) for _ in range(size)))
+        ledger.cents = array('q', bytes(8 * size))
+        ledger.cats = array('B', bytes(size))
+        ledger.desc_ids = array('L', bytes(ledger.desc_ids.itemsize * size))
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            rows = ledger.select_days(first, last)
+            ledger.total(rows)
+        indexed = (time.perf_counter() - start) / runs
+
+        start = time.perf_counter()
+        scanned = [i for i, day in enumerate(ledger.days) if first <= day <= last]
+        sum(ledger.cents[i] for i in scanned)
+        scan = time.perf_counter() - start
+        print(f"{size:>12,} {len(rows):>8,} {indexed * 1e3:>10.3f}ms {scan * 1e3:>10.1f}ms")
+
+def benchmark_rollups() -> None:
+    """Repeated dashboard queries answered from rollups against a recomputation"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "expenses.json")
+        with open(path, 'w') as f:
+            json.dump(synthetic_expenses(1000000), f)
+        with ExpenseTracker(path) as tracker:
+            runs = 1000
+            start = time.perf_counter()
+            for _ in range(runs):
+                tracker.get_category_breakdown()
+                tracker.rollups.month(2022, 3)
+            rolled = (time.perf_counter() - start) / runs
+
+            start = time.perf_counter()
+            tracker.ledger.category_totals()
+            tracker.ledger.category_totals(tracker.ledger.select_days(
+                datetime(2022, 3, 1).toordinal(), datetime(2022, 3, 31).toordinal()))
+            recomputed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            ExpenseRollups.from_ledger(tracker.ledger)
+            rebuild = time.perf_counter() - start
+    print(f"Breakdown + month totals, 1M expenses: {rolled * 1e6:.1f} µs from rollups, "
+          f"{recomputed * 1e3:.1f} ms recomputed")
+    print(f"Full rollup rebuild: {rebuild * 1e3:.0f} ms")
+
+def benchmark_sqlite() -> None:
+    """Query latency of the SQLite backend against the JSON backend at 1M expenses"""
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "expenses.json")
+        with open(json_path, 'w') as f:
+            json.dump(synthetic_expenses(1000000), f)
+        with ExpenseTracker(json_path) as json_tracker, \
+                ExpenseTracker(os.path.join(tmp, "expenses.db")) as sqlite_tracker:
+            start = time.perf_counter()
+            copy_expenses(json_tracker, sqlite_tracker)
+            print(f"Loaded 1M expenses into SQLite in {time.perf_counter() - start:.1f}s")
+
+            queries = [
+                ("monthly summary", lambda t: t.get_monthly_summary(2022, 3)),
+                ("30-day report", lambda t: t.get_expense_report('2023-06-01', '2023-06-30')),
+                ("category breakdown", lambda t: t.get_category_breakdown()),
+                ("daily totals (1 year)", lambda t: t.get_daily_totals('2022-01-01', '2022-12-31')),
+            ]
+            print(f"{'query':<24} {'json':>10} {'sqlite':>10}")
+            for name, query in queries:
+                timings = []
+                for tracker in (json_tracker, sqlite_tracker):
+                    runs = 20
+                    start = time.perf_counter()
+                    for _ in range(runs):
+                        query(tracker)
+                    timings.append((time.perf_counter() - start) / runs)
+                assert query(json_tracker) == query(sqlite_tracker)
+                print(f"{name:<24} {timings[0] * 1e3:>8.2f}ms {timings[1] * 1e3:>8.2f}ms")
+
+def benchmark_import() -> None:
+    """Streaming CSV import throughput of both backends, against add_expense per row"""
+    rows = synthetic_expenses(200000)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "bank-export.csv")
+        with open(source, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['date', 'amount', 'category', 'description'])
+            writer.writeheader()
+            writer.writerows(rows)
+        for name in ("expenses.json", "expenses.db"):
+            with ExpenseTracker(os.path.join(tmp, name)) as tracker:
+                start = time.perf_counter()
+                imported, _ = tracker.import_many(read_expense_file(source))
+                elapsed = time.perf_counter() - start
+            print(f"import_many into {name:<14} {imported / elapsed:>10,.0f} rows/sec")
+
+            count = 2000
+            with ExpenseTracker(os.path.join(tmp, "one-by-one-" + name)) as tracker:
+                start = time.perf_counter()
+                for row in rows[:count]:
+                    tracker.add_expense(row['amount'], row['category'], row['description'], row['date'])
+                elapsed = time.perf_counter() - start
+            print(f"add_expense into {name:<14} {count / elapsed:>10,.0f} rows/sec")
+
+LAZY_BENCHMARK_CHILD = """
+import importlib.util, resource, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("expense_tracker", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+tracker = module.ExpenseTracker(sys.argv[2], lazy=sys.argv[3] == "lazy")
+opened = time.perf_counter() - start
+if sys.argv[4] == "add":
+    tracker.add_expense(4.5, "Food", "Coffee")
+elif sys.argv[4] == "month":
+    tracker.get_monthly_summary(2022, 3)
+elif sys.argv[4] == "breakdown":
+    tracker.get_category_breakdown()
+tracker.close()
+try:
+    # VmHWM is reset by exec; ru_maxrss would include the parent's pages from fork
+    with open("/proc/self/status") as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(opened, time.perf_counter() - start, peak_kb)
+"""
+
+def benchmark_lazy() -> None:
+    """Startup time and peak memory of eager and lazy loading on a 1M-expense ledger"""
+    import subprocess
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "expenses.json")
+        with open(path, 'w') as f:
+            json.dump(synthetic_expenses(1000000), f)
+        ExpenseTracker(path).close()  # writes the segment file and rollups
+        print(f"{'mode':<28} {'open':>10} {'total':>10} {'peak RSS':>10}")
+        for mode, action in (("eager", "add"), ("lazy", "add"), ("lazy", "month"), ("lazy", "breakdown")):
+            output = subprocess.run([sys.executable, "-c", LAZY_BENCHMARK_CHILD, os.path.abspath(__file__),
+                                     path, mode, action], capture_output=True, text=True, check=True).stdout
+            opened, total, rss_kb = output.split()
+            print(f"{mode + ' open + ' + action:<28} {float(opened) * 1e3:>8.0f}ms "
+                  f"{float(total) * 1e3:>8.0f}ms {int(rss_kb) / 1024:>8.0f}MB")
+
+def benchmark_dates() -> None:
+    """Date parsing, monthly filtering and range filtering: strptime per row against day ordinals"""
+    size = 200000
+    expenses = synthetic_expenses(size)
+    texts = [expense['date'] for expense in expenses]
+    ledger = ExpenseLedger(CATEGORIES)
+    ledger.extend(expenses)
+    days = list(ledger.days)
+
+    def timed(function, runs: int = 1) -> float:
+        start = time.perf_counter()
+        for _ in range(runs):
+            function()
+        return (time.perf_counter() - start) / runs
+
+    print(f"Parse {size:,} dates:")
+    distinct = [format_date(Date(1800, 1, 1).toordinal() + i) for i in range(size)]
+    _day_of_text.clear()
+    for name, function in (
+            ("datetime.strptime", lambda: [datetime.strptime(text, '%Y-%m-%d').toordinal() for text in texts]),
+            ("date.fromisoformat", lambda: [Date.fromisoformat(text).toordinal() for text in texts]),
+            ("parse_date, all distinct", lambda: [parse_date(text) for text in distinct]),
+            ("parse_date, ledger dates", lambda: [parse_date(text) for text in texts])):
+        print(f"  {name:<34} {timed(function) / size * 1e9:>8.0f} ns/date")
+
+    year, month = 2022, 3
+    first = month_start(year, month)
+    last = first + calendar.monthrange(year, month)[1] - 1
+    print(f"Select one month of {size:,} expenses:")
+    for name, function, runs in (
+            ("strptime twice per row", lambda: [e for e in expenses
+                                                if datetime.strptime(e['date'], '%Y-%m-%d').year == year
+                                                and datetime.strptime(e['date'], '%Y-%m-%d').month == month], 1),
+            ("compare day ordinals", lambda: [i for i, day in enumerate(days) if first <= day <= last], 5),
+            ("bisect the sorted ordinals", lambda: ledger.select_days(first, last), 1000)):
+        print(f"  {name:<34} {timed(function, runs) * 1e3:>10.3f} ms")
+
+    start_date, end_date = '2021-06-15', '2022-06-14'
+    start, end = parse_date(start_date), parse_date(end_date)
+    print(f"Select a one-year range of {size:,} expenses:")
+    for name, function, runs in (
+            ("strptime per row", lambda: [e for e in expenses
+                                          if datetime.strptime(start_date, '%Y-%m-%d')
+                                          <= datetime.strptime(e['date'], '%Y-%m-%d')
+                                          <= datetime.strptime(end_date, '%Y-%m-%d')], 1),
+            ("compare day ordinals", lambda: [i for i, day in enumerate(days) if start <= day <= end], 5),
+            ("bisect the sorted ordinals", lambda: ledger.select_days(parse_date(start_date),
+                                                                      parse_date(end_date)), 1000)):
+        print(f"  {name:<34} {timed(function, runs) * 1e3:>10.3f} ms")
+
+def benchmark_analytics() -> None:
+    """Rolling 30-day spend per category over a 5-year, 1M-expense ledger, and the cost per insert"""
+    import random
+    ledger = ExpenseLedger(CATEGORIES)
+    ledger.extend(synthetic_expenses(1000000))
+    first, last = ledger.days[0], ledger.days[-1]
+    codes = [None] + list(range(len(CATEGORIES)))
+
+    start = time.perf_counter()
+    analytics = ExpenseAnalytics.from_ledger(ledger)
+    print(f"Index 1M expenses by category and day: {(time.perf_counter() - start) * 1e3:,.0f} ms")
+
+    start = time.perf_counter()
+    for code in codes:
+        analytics.series[code].rolling(first, last, 30)
+    indexed = time.perf_counter() - start
+    sample = 20
+    start = time.perf_counter()
+    for day in range(last - sample, last):
+        totals: Dict[str, float] = {}
+        for expense in ledger.rows(ledger.select_days(day - 29, day)):
+            totals[expense['category']] = totals.get(expense['category'], 0) + expense['amount']
+    per_day = (time.perf_counter() - start) / sample
+    print(f"30-day rolling spend, {last - first + 1:,} days x {len(codes)} series: {indexed * 1e3:,.0f} ms "
+          f"indexed, about {per_day * (last - first + 1):,.0f} s with one 30-day report per day")
+
+    rng = random.Random(1)
+    adds = [(rng.randrange(first, last + 1), rng.randrange(len(CATEGORIES)), rng.randrange(1, 50000))
+            for _ in range(10000)]
+    start = time.perf_counter()
+    for day, code, cents in adds:
+        analytics.add(day, code, cents)
+    update = (time.perf_counter() - start) / len(adds)
+    start = time.perf_counter()
+    ExpenseAnalytics.from_ledger(ledger)
+    print(f"Keeping the index current: {update * 1e6:.1f} µs per add, against "
+          f"{(time.perf_counter() - start) * 1e3:,.0f} ms to rebuild it")
+
+    budgets = [{'category': category, 'period': 'month', 'limit': 500} for category in CATEGORIES]
+    budgets += [{'category': None, 'period': 30, 'limit': 5000}, {'category': 'Food', 'period': 7, 'limit': 200}]
+    for size in (10000, 1000000):
+        rollups = ExpenseRollups()
+        for day, code, cents in zip(ledger.days[:size], ledger.cats[:size], ledger.cents[:size]):
+            rollups.add(day, code, cents)
+        monitor = BudgetMonitor(budgets, rollups, list(CATEGORIES), last)
+        inserts = [(last - rng.randrange(60), rng.randrange(len(CATEGORIES)), rng.randrange(1, 50000))
+                   for _ in range(10000)]
+        start = time.perf_counter()
+        for day, code, cents in inserts:
+            rollups.add(day, code, cents)
+            monitor.add(day, code, cents)
+        elapsed = (time.perf_counter() - start) / len(inserts)
+        print(f"Budget check with {len(budgets)} budgets on {size:>9,} expenses: {elapsed * 1e6:.1f} µs per insert "
+              f"(including the rollup update)")
+
+def benchmark_cache() -> None:
+    """A repeated monthly-summary/breakdown workload on 1M expenses, with and without the query cache"""
+    import random
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "expenses.json")
+        with open(path, 'w') as f:
+            json.dump(synthetic_expenses(1000000), f)
+        ExpenseTracker(path).close()
+        months = [(2023, month) for month in range(1, 13)]
+        print(f"{'cache':<10} {'queries':>8} {'time':>8} {'per query':>10} {'hits':>6} {'misses':>7} "
+              f"{'invalidated':>12}")
+        for cache_size in (0, QUERY_CACHE_SIZE):
+            rng = random.Random(1)
+            with ExpenseTracker(path, sync_every=1000, cache_size=cache_size) as tracker:
+                for year, month in months:  # load the months up front so both runs measure queries
+                    tracker.get_monthly_summary(year, month)
+                tracker.cache_clear()
+                before = tracker.cache_info()
+                queries = 1000
+                start = time.perf_counter()
+                for i in range(queries):
+                    if i % 50 == 49:
+                        year, month = rng.choice(months)
+                        tracker.add_expense(9.99, "Food", "Lunch", f"{year}-{month:02d}-15")
+                    if rng.random() < 0.2:
+                        tracker.get_category_breakdown()
+                    else:
+                        tracker.get_monthly_summary(*rng.choice(months))
+                elapsed = time.perf_counter() - start
+                info = tracker.cache_info()
+            print(f"{'off' if cache_size == 0 else f'LRU {cache_size}':<10} {queries:>8} {elapsed:>7.2f}s "
+                  f"{elapsed / queries * 1e3:>8.2f}ms {info.hits - before.hits:>6} "
+                  f"{info.misses - before.misses:>7} {info.invalidations - before.invalidations:>12}")
+
+def benchmark_export() -> None:
+    """Report export time on 1M expenses: per-row printing style, then cold and cached exports"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "expenses.json")
+        with open(path, 'w') as f:
+            json.dump(synthetic_expenses(1000000), f)
+        ExpenseTracker(path).close()
+
+        with ExpenseTracker(path) as tracker:
+            start = time.perf_counter()
+            with open(os.path.join(tmp, "naive.csv"), 'w') as f:
+                report = tracker.get_expense_report('2000-01-01', '2099-12-31')
+                for expense in sorted(report, key=lambda x: x['date']):
+                    f.write(f"{expense['date']},{expense['amount']:.2f},{expense['category']},"
+                            f"{expense['description']}\n")
+            print(f"{'report as dicts, sorted, one f-string per row':<48} "
+                  f"{time.perf_counter() - start:>6.2f}s")
+
+        for fmt in REPORT_FORMATS:
+            output = os.path.join(tmp, "report." + fmt)
+            for label in ("cold cache", "unchanged", "after adding one expense"):
+                if label.startswith("after"):
+                    with ExpenseTracker(path) as tracker:
+                        tracker.add_expense(12.5, "Food", "Lunch", "2022-03-15")
+                start = time.perf_counter()
+                with ExpenseTracker(path) as tracker:  # reopened, so cached months stay unloaded
+                    stats = export_report(tracker, output, fmt)
+                elapsed = time.perf_counter() - start
+                print(f"{'export ' + fmt + ', ' + label:<48} {elapsed:>6.2f}s "
+                      f"({stats['months'] - stats['cached']} of {stats['months']} months rendered, "
+                      f"{os.path.getsize(output) / 1e6:.0f} MB)")
+
+def benchmark_money() -> None:
+    """Totals of 10M amounts in integer cents against summing floats, checked against Decimal"""
+    import random
+    size = 10000000
+    rng = random.Random(1)
+    ledger = ExpenseLedger(CATEGORIES)
+    ledger.cats = array('B', bytes(b % len(CATEGORIES) for b in rng.randbytes(size)))
+    ledger.cents = array('q', (rng.randrange(1, 50000) for _ in range(size)))
+    amounts = [cents / 100 for cents in ledger.cents]  # what summing 'amount' fields adds up
+    exact = sum((Decimal(repr(amount)) for amount in amounts), Decimal(0))
+    exact_by_category = [Decimal(0)] * len(CATEGORIES)
+    for code, amount in zip(ledger.cats, amounts):
+        exact_by_category[code] += Decimal(repr(amount))
+
+    def float_breakdown():
+        totals = [0.0] * len(CATEGORIES)
+        for code, amount in zip(ledger.cats, amounts):
+            totals[code] += amount
+        return totals
+
+    methods = [
+        ("sum of floats", lambda: sum(amounts)),
+        ("math.fsum of floats", lambda: math.fsum(amounts)),
+        ("sum of int cents", lambda: Decimal(sum(ledger.cents)).scaleb(-2)),
+    ]
+    if np is not None:
+        methods.append(("numpy int64 sum of cents", lambda: Decimal(ledger.total()).scaleb(-2)))
+    print(f"Total of {size:,} amounts, exactly {exact}")
+    print(f"{'method':<28} {'time':>10} {'off by':>12}")
+    for name, method in methods:
+        start = time.perf_counter()
+        total = method()
+        elapsed = time.perf_counter() - start
+        error = Decimal(repr(total)) - exact if isinstance(total, float) else total - exact
+        print(f"{name:<28} {elapsed * 1e3:>8.0f}ms {error:>12.6f}")
+    if Decimal(ledger.total()).scaleb(-2) != exact:
+        raise RuntimeError("integer cents total differs from the Decimal total")
+
+    print(f"{'breakdown by category':<28} {'time':>10} {'worst off by':>12}")
+    for name, method in (("float accumulators", float_breakdown),
+                         ("int cents (category_totals)", ledger.category_totals)):
+        start = time.perf_counter()
+        totals = method()
+        elapsed = time.perf_counter() - start
+        totals = [Decimal(repr(total)) if isinstance(total, float) else Decimal(total).scaleb(-2)
+                  for total in totals]
+        error = max(abs(total - expected) for total, expected in zip(totals, exact_by_category))
+        print(f"{name:<28} {elapsed * 1e3:>8.0f}ms {error:>12.6f}")
+    if [Decimal(total).scaleb(-2) for total in ledger.category_totals()] != exact_by_category:
+        raise RuntimeError("integer cents breakdown differs from the Decimal breakdown")
+    print("Integer-cent totals match the exact Decimal totals.")
+
+CONCURRENCY_BENCHMARK_CHILD = """
+import importlib.util, sys, threading
+spec = importlib.util.spec_from_file_location("expense_tracker", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+module.COMPACT_MIN_ENTRIES = 500  # compact often, so writers race with compactions
+writer, threads, count = sys.argv[3], int(sys.argv[4]), int(sys.argv[5])
+sys.stdin.read()  # wait until every writer has started
+with module.ExpenseTracker(sys.argv[2]) as tracker:
+    def add(thread):
+        for i in range(count):
+            tracker.add_expense(1.25, "Food", f"{writer}-{thread}-{i}", f"2024-{i % 12 + 1:02d}-15")
+    workers = [threading.Thread(target=add, args=(t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+"""
+
+def benchmark_concurrency() -> None:
+    """Aggregate adds/sec with 1 to 8 writer processes on one ledger, checking no add is lost"""
+    import subprocess
+    threads, count = 4, 250
+    print(f"{'writers':>8} {'adds':>8} {'time':>8} {'adds/sec':>10}")
+    for processes in (1, 2, 4, 8):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "expenses.json")
+            children = [subprocess.Popen([sys.executable, "-c", CONCURRENCY_BENCHMARK_CHILD,
+                                          os.path.abspath(__file__), path, f"w{p}", str(threads), str(count)],
+                                         stdin=subprocess.PIPE) for p in range(processes)]
+            start = time.perf_counter()
+            for child in children:
+                child.stdin.close()
+            for child in children:
+                if child.wait():
+                    raise RuntimeError(f"writer exited with status {child.returncode}")
+            elapsed = time.perf_counter() - start
+
+            with ExpenseTracker(path) as tracker:
+                descriptions = [expense['description'] for expense in tracker.expenses]
+                expected = {f"w{p}-{t}-{i}" for p in range(processes)
+                            for t in range(threads) for i in range(count)}
+                if len(descriptions) != len(expected) or set(descriptions) != expected:
+                    raise RuntimeError(f"expected {len(expected)} expenses, found {len(descriptions)} "
+                                       f"({len(set(descriptions) & expected)} of them distinct and expected)")
+                problems = tracker.verify_rollups()
+                if problems:
+                    raise RuntimeError(f"rollups are inconsistent: {problems[0]}")
+            adds = len(expected)
+            print(f"{processes:>8} {adds:>8} {elapsed:>7.2f}s {adds / elapsed:>10,.0f}")
+
+BENCHMARKS = {
+    'journal': benchmark_journal,
+    'columnar': benchmark_columnar,
+    'index': benchmark_index,
+    'rollups': benchmark_rollups,
+    'sqlite': benchmark_sqlite,
+    'import': benchmark_import,
+    'lazy': benchmark_lazy,
+    'concurrency': benchmark_concurrency,
+    'money': benchmark_money,
+    'export': benchmark_export,
+    'cache': benchmark_cache,
+    'analytics': benchmark_analytics,
+    'dates': benchmark_dates,
+}
+
 if __name__ == "__main__":
     main()
@@ -1,20 +1,766 @@
 import random
+import secrets
 import string
 import argparse
+import asyncio
+import getpass
+import hashlib
+import hmac
+import io
+import marshal
+import math
+import mmap
+import os
+import re
+import signal
+import struct
+from array import array
+from collections import OrderedDict, deque
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice, product
+from urllib.parse import parse_qsl
 import sys
+import time
+import traceback
 
-class PasswordGenerator:
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+except ImportError:  # cryptography is optional; new vaults fall back to the BLAKE2b construction
+    ChaCha20Poly1305 = None
+
+class RandomBackend:
+    """Randomness from the random module (Mersenne Twister). Fast, but not secure."""
+    name = 'random'
+    
+    def __init__(self, seed=None):
+        # Without a seed, share the module-level generator so random.seed() still applies
+        self._random = random if seed is None else random.Random(seed)
+    
+    def randbelow(self, n):
+        return self._random.randrange(n)
+    
+    def choices(self, population, k):
+        return self._random.choices(population, k=k)
+    
+    def sample(self, population, k):
+        return self._random.sample(population, k)
+    
+    def shuffle(self, items):
+        self._random.shuffle(items)
+
+class SecretsBackend:
+    """Randomness from the secrets module, one operating system call per draw"""
+    name = 'secrets'
+    
     def __init__(self):
+        self._random = secrets.SystemRandom()
+    
+    def randbelow(self, n):
+        return secrets.randbelow(n)
+    
+    def choices(self, population, k):
+        choice = secrets.choice
+        return [choice(population) for _ in range(k)]
+    
+    def sample(self, population, k):
+        return self._random.sample(population, k)
+    
+    def shuffle(self, items):
+        self._random.shuffle(items)
+
+class BufferedCSPRNGBackend:
+    """
+    Cryptographically secure randomness read from os.urandom in large blocks.
+    
+    Bytes are mapped to pool indices by rejection sampling: only bytes below the
+    largest multiple of the pool size are kept, so every character is equally
+    likely. For character pools this runs entirely in bytes.translate.
+    """
+    name = 'buffered'
+    
+    def __init__(self, block_size=1 << 16):
+        self.block_size = block_size
+        self._buffer = b''
+        self._pos = 0
+        self._tables = {}
+    
+    def _read(self, k):
+        """Return k random bytes from the buffer, refilling it as needed"""
+        if self._pos + k > len(self._buffer):
+            self._buffer = self._buffer[self._pos:] + os.urandom(max(k, self.block_size))
+            self._pos = 0
+        data = self._buffer[self._pos:self._pos + k]
+        self._pos += k
+        return data
+    
+    def randbelow(self, n):
+        if n <= 0:
+            raise ValueError("randbelow requires a positive bound")
+        if n <= 256:
+            limit = 256 - 256 % n
+            while True:
+                value = self._read(1)[0]
+                if value < limit:
+                    return value % n
+        nbytes = (n.bit_length() + 7) // 8
+        excess = nbytes * 8 - n.bit_length()
+        while True:
+            value = int.from_bytes(self._read(nbytes), 'big') >> excess
+            if value < n:
+                return value
+    
+    def _translation(self, population):
+        """Build (and cache) the byte table and rejected bytes for a character pool"""
+        entry = self._tables.get(population)
+        if entry is None:
+            size = len(population)
+            limit = 256 - 256 % size
+            table = bytes(ord(population[b % size]) for b in range(256))
+            entry = (table, bytes(range(limit, 256)), limit)
+            self._tables[population] = entry
+        return entry
+    
+    def choices(self, population, k):
+        if not isinstance(population, str) or len(population) > 256 or not population.isascii():
+            return [population[self.randbelow(len(population))] for _ in range(k)]
+        table, rejected, limit = self._translation(population)
+        chars = ''
+        while len(chars) < k:
+            need = k - len(chars)
+            # Ask for enough bytes that one pass usually covers the rejected ones
+            raw = self._read(need * 256 // limit + 16)
+            chars += raw.translate(table, rejected).decode('ascii')
+        return chars[:k]
+    
+    def sample(self, population, k):
+        pool = list(population)
+        if k > len(pool):
+            raise ValueError("Sample larger than population")
+        for i in range(k):
+            j = i + self.randbelow(len(pool) - i)
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
+    
+    def shuffle(self, items):
+        if len(items) > 256:
+            randbelow = self.randbelow
+            for i in range(len(items) - 1, 0, -1):
+                j = randbelow(i + 1)
+                items[i], items[j] = items[j], items[i]
+            return
+        # Fisher-Yates with the rejection sampling inlined over one read of bytes
+        data = self._read(2 * len(items))
+        pos = 0
+        for i in range(len(items) - 1, 0, -1):
+            bound = i + 1
+            limit = 256 - 256 % bound
+            while True:
+                if pos == len(data):
+                    data = self._read(len(items))
+                    pos = 0
+                value = data[pos]
+                pos += 1
+                if value < limit:
+                    break
+            j = value % bound
+            items[i], items[j] = items[j], items[i]
+
+BACKENDS = {
+    'random': RandomBackend,
+    'secrets': SecretsBackend,
+    'buffered': BufferedCSPRNGBackend,
+}
+
+AMBIGUOUS_CHARS = "Il1|O0o"
+
+class PasswordPolicy:
+    """
+    The rules a generated password must follow.
+    
+    Args:
+        char_sets (dict): Character type name -> characters. A character that
+                          appears in several types only counts for the first.
+        length (int): Password length
+        min_counts (dict): Minimum characters of each type (default 0)
+        max_counts (dict): Maximum characters of each type (default unlimited)
+        exclude (str): Characters that must not appear
+        no_repeat_adjacent (bool): Forbid the same character twice in a row
+        
+    Raises:
+        ValueError: If the rules contradict each other
+    """
+    
+    def __init__(self, char_sets, length=12, min_counts=None, max_counts=None,
+                 exclude='', no_repeat_adjacent=False):
+        min_counts = dict(min_counts or {})
+        max_counts = dict(max_counts or {})
+        unknown = (set(min_counts) | set(max_counts)) - set(char_sets)
+        if unknown:
+            raise ValueError(f"Unknown or disabled character type: {', '.join(sorted(unknown))}")
+        
+        self.length = length
+        self.no_repeat_adjacent = no_repeat_adjacent
+        self.char_sets = {}
+        self.min_counts = {}
+        self.max_counts = {}
+        seen = set(exclude)
+        for name, chars in char_sets.items():
+            chars = ''.join(dict.fromkeys(c for c in chars if c not in seen))
+            seen.update(chars)
+            minimum = min_counts.get(name, 0)
+            maximum = max_counts.get(name)
+            if maximum is not None and minimum > maximum:
+                raise ValueError(f"Minimum {name} count is larger than the maximum")
+            if minimum > 0 and not chars:
+                raise ValueError(f"No {name} characters left after exclusions")
+            if not chars or maximum == 0:
+                continue
+            self.char_sets[name] = chars
+            self.min_counts[name] = minimum
+            self.max_counts[name] = maximum
+        
+        if not self.char_sets:
+            raise ValueError("At least one character type must be selected")
+        if sum(self.min_counts.values()) > length:
+            raise ValueError("Password length too short to satisfy minimum character requirements")
+        if None not in self.max_counts.values() and sum(self.max_counts.values()) < length:
+            raise ValueError("Password length too long for the maximum character limits")
+        
+        self.key = (length, no_repeat_adjacent, tuple(self.char_sets.items()),
+                    tuple(self.min_counts.items()), tuple(self.max_counts.items()))
+    
+    @property
+    def unconstrained(self):
+        """True when every character of the combined pool is allowed anywhere"""
+        return (not self.no_repeat_adjacent and not any(self.min_counts.values())
+                and all(m is None for m in self.max_counts.values()))
+
+class PolicySampler:
+    """
+    Draws passwords uniformly from every password a PasswordPolicy allows.
+    
+    Without the adjacency rule, a password is fixed by how many characters
+    of each type it has (its composition), by which characters those are,
+    and by their order. Compositions are drawn in proportion to how many
+    passwords they produce, using precomputed counting tables. The characters
+    are then drawn and shuffled.
+    
+    With no_repeat_adjacent, the number of valid completions only depends on
+    the position, the per-type counts so far and the type of the previous
+    character. Those completion counts are tabulated once, and passwords
+    are drawn one character at a time in a single pass with no rejection.
+    
+    Raises:
+        ValueError: If no password satisfies the policy
+    """
+    
+    def __init__(self, policy, backend):
+        self.policy = policy
+        self.backend = backend
+        self._sets = list(policy.char_sets.values())
+        self._pool = ''.join(self._sets)
+        self._mins = list(policy.min_counts.values())
+        self._maxs = [policy.length if m is None else m for m in policy.max_counts.values()]
+        if policy.no_repeat_adjacent:
+            self.total = self._build_sequence_tables()
+        else:
+            self.total = self._build_composition_tables()
+        if self.total == 0:
+            raise ValueError("No password satisfies the policy")
+    
+    def _build_composition_tables(self):
+        """Tabulate weighted compositions; returns the number of valid passwords"""
+        length = self.policy.length
+        count = len(self._sets)
+        # ways[k][r]: ways to fill r positions using character types k and later
+        ways = [[0] * (length + 1) for _ in range(count + 1)]
+        ways[count][0] = 1
+        self._tables = [[None] * (length + 1) for _ in range(count)]
+        for k in reversed(range(count)):
+            size = len(self._sets[k])
+            for r in range(length + 1):
+                counts = []
+                cumulative = []
+                rest = []
+                total = 0
+                for c in range(self._mins[k], min(self._maxs[k], r) + 1):
+                    weight = math.comb(r, c) * size ** c * ways[k + 1][r - c]
+                    if weight:
+                        total += weight
+                        counts.append(c)
+                        cumulative.append(total)
+                        rest.append(ways[k + 1][r - c])
+                ways[k][r] = total
+                self._tables[k][r] = (counts, cumulative, rest)
+        return ways[0][length]
+    
+    def _composition(self):
+        """Draw how many characters of each type one password gets"""
+        # One draw ranks a password among all valid ones; peel off one type per step
+        rank = self.backend.randbelow(self.total)
+        remaining = self.policy.length
+        composition = []
+        for tables in self._tables:
+            counts, cumulative, rest = tables[remaining]
+            i = bisect_right(cumulative, rank)
+            if i:
+                rank -= cumulative[i - 1]
+            # The branch holds (ways for this type) * rest[i] passwords; keep the
+            # part of the rank that selects among the later types
+            rank %= rest[i]
+            c = counts[i]
+            composition.append(c)
+            remaining -= c
+        return composition
+    
+    def _build_sequence_tables(self):
+        """Tabulate completion counts for the adjacency rule; returns the number of valid passwords"""
+        length = self.policy.length
+        sizes = [len(chars) for chars in self._sets]
+        bounded = [m is not None for m in self.policy.max_counts.values()]
+        # Counts only need tracking up to the point where they stop mattering
+        caps = [self._maxs[k] if bounded[k] else self._mins[k] for k in range(len(sizes))]
+        
+        def successors(state):
+            counts, previous = state
+            for k in range(len(sizes)):
+                if bounded[k] and counts[k] >= caps[k]:
+                    continue
+                options = sizes[k] - (k == previous)
+                if options > 0:
+                    counts_after = counts[:k] + (min(counts[k] + 1, caps[k]),) + counts[k + 1:]
+                    yield options, (counts_after, k)
+        
+        layers = [{((0,) * len(sizes), -1)}]
+        for _ in range(length):
+            layers.append({after for state in layers[-1] for _, after in successors(state)})
+        
+        completions = {state: int(all(c >= m for c, m in zip(state[0], self._mins)))
+                       for state in layers[length]}
+        self._layers = [None] * length
+        for position in reversed(range(length)):
+            table = {}
+            totals = {}
+            for state in layers[position]:
+                choices = []
+                cumulative = []
+                total = 0
+                for options, after in successors(state):
+                    weight = options * completions[after]
+                    if weight:
+                        total += weight
+                        choices.append(after)
+                        cumulative.append(total)
+                table[state] = (choices, cumulative)
+                totals[state] = total
+            self._layers[position] = table
+            completions = totals
+        return completions[((0,) * len(sizes), -1)]
+    
+    def _sample_sequence(self):
+        randbelow = self.backend.randbelow
+        state = ((0,) * len(self._sets), -1)
+        previous_index = -1
+        password = []
+        for table in self._layers:
+            choices, cumulative = table[state]
+            after = choices[bisect_right(cumulative, randbelow(cumulative[-1]))]
+            k = after[1]
+            chars = self._sets[k]
+            if k == state[1]:
+                index = randbelow(len(chars) - 1)
+                if index >= previous_index:
+                    index += 1
+            else:
+                index = randbelow(len(chars))
+            password.append(chars[index])
+            previous_index = index
+            state = after
+        return ''.join(password)
+    
+    def sample(self):
+        """Draw one password"""
+        return self.sample_many(1)[0]
+    
+    def sample_many(self, n):
+        """
+        Draw n independent passwords.
+        
+        Returns:
+            list: Generated passwords
+        """
+        length = self.policy.length
+        if self.policy.no_repeat_adjacent:
+            return [self._sample_sequence() for _ in range(n)]
+        if self.policy.unconstrained:
+            fill = self.backend.choices(self._pool, n * length)
+            return [''.join(fill[i * length:(i + 1) * length]) for i in range(n)]
+        
+        compositions = [self._composition() for _ in range(n)]
+        # One draw per character type for the whole block
+        draws = [self.backend.choices(chars, sum(c[k] for c in compositions))
+                 for k, chars in enumerate(self._sets)]
+        offsets = [0] * len(self._sets)
+        shuffle = self.backend.shuffle
+        passwords = []
+        for composition in compositions:
+            password = []
+            for k, c in enumerate(composition):
+                if c:
+                    password.extend(draws[k][offsets[k]:offsets[k] + c])
+                    offsets[k] += c
+            shuffle(password)
+            passwords.append(''.join(password))
+        return passwords
+
+BLOOM_MAGIC = b"PWBLOOM1"
+# Header: magic, size in bits, hash functions, items added
+BLOOM_HEADER = struct.Struct(">8sQQQ")
+
+def password_digest(password):
+    """SHA-1 digest of a password, the format used by breached-password lists"""
+    return hashlib.sha1(password.encode('utf-8')).digest()
+
+class BloomFilter:
+    """
+    Bloom filter over password digests, kept in a memory-mapped file.
+    
+    Membership tests may give false positives at roughly the configured
+    error rate, but never false negatives. A filter created with a path is
+    saved as it is filled and opened instantly on later runs; without a path
+    it lives in anonymous memory.
+    
+    Args:
+        path (str): Filter file, created if it does not exist (None for in-memory)
+        capacity (int): Number of items the filter is sized for
+        error_rate (float): Target false-positive rate at capacity
+        memory_limit (int): Size the filter to this many bytes instead of error_rate
+    """
+    
+    def __init__(self, path=None, capacity=1000000, error_rate=0.001, memory_limit=None):
+        self.path = path
+        self._file = None
+        if path and os.path.exists(path):
+            self._file = open(path, 'r+b')
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            magic, self.bits, self.hashes, self.items = BLOOM_HEADER.unpack_from(self._map)
+            if magic != BLOOM_MAGIC:
+                raise ValueError(f"{path} is not a Bloom filter file")
+            return
+        
+        if memory_limit:
+            bits = memory_limit * 8
+        else:
+            bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.bits = max(64, bits // 8 * 8)
+        self.hashes = max(1, round(self.bits / max(1, capacity) * math.log(2)))
+        self.items = 0
+        size = BLOOM_HEADER.size + self.bits // 8
+        if path:
+            with open(path, 'wb') as f:
+                f.truncate(size)
+            self._file = open(path, 'r+b')
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        else:
+            self._map = mmap.mmap(-1, size)
+        self._write_header()
+    
+    def _write_header(self):
+        BLOOM_HEADER.pack_into(self._map, 0, BLOOM_MAGIC, self.bits, self.hashes, self.items)
+    
+    def _positions(self, digest):
+        # Double hashing: k probe positions from two 64-bit halves of the digest
+        first = int.from_bytes(digest[:8], 'big')
+        step = int.from_bytes(digest[8:16], 'big') | 1
+        bits = self.bits
+        return [(first + i * step) % bits for i in range(self.hashes)]
+    
+    def add_digest(self, digest):
+        bitmap = self._map
+        offset = BLOOM_HEADER.size
+        for position in self._positions(digest):
+            bitmap[offset + (position >> 3)] |= 1 << (position & 7)
+        self.items += 1
+    
+    def contains_digest(self, digest):
+        bitmap = self._map
+        offset = BLOOM_HEADER.size
+        for position in self._positions(digest):
+            if not bitmap[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+    
+    def add(self, password):
+        self.add_digest(password_digest(password))
+    
+    def __contains__(self, password):
+        return self.contains_digest(password_digest(password))
+    
+    def load_hashes(self, path):
+        """
+        Add a breached-password list to the filter.
+        
+        Lines may be SHA-1 hex digests, optionally followed by ':count' as in
+        Have I Been Pwned downloads, or plain passwords.
+        
+        Returns:
+            int: Number of entries added
+        """
+        added = 0
+        with open(path, 'rb', buffering=1 << 20) as f:
+            for line in f:
+                line = line.rstrip(b'\r\n')
+                if not line:
+                    continue
+                value = line.split(b':', 1)[0]
+                if len(value) == 40:
+                    try:
+                        self.add_digest(bytes.fromhex(value.decode('ascii')))
+                        added += 1
+                        continue
+                    except ValueError:
+                        pass
+                self.add_digest(hashlib.sha1(line).digest())
+                added += 1
+        return added
+    
+    @property
+    def memory_bytes(self):
+        return len(self._map)
+    
+    @property
+    def false_positive_rate(self):
+        """Expected false-positive rate for the items added so far"""
+        return (1 - math.exp(-self.hashes * self.items / self.bits)) ** self.hashes
+    
+    def flush(self):
+        self._write_header()
+        self._map.flush()
+    
+    def close(self):
+        if self._map.closed:
+            return
+        self.flush()
+        self._map.close()
+        if self._file:
+            self._file.close()
+
+class PasswordGuard:
+    """
+    Rejects passwords that were issued before or appear in a breach list.
+    
+    Breached and previously issued passwords live in a BloomFilter, which
+    answers in O(1) with a fixed memory budget. Passwords issued in the
+    current session are also kept in an exact set of digests, so duplicates
+    within a run are always caught exactly.
+    
+    Args:
+        path (str): Bloom filter file, so issued passwords are remembered across runs
+        exact (bool): Keep the exact set of this session's digests
+        **filter_options: capacity, error_rate or memory_limit for a new filter
+    """
+    
+    def __init__(self, path=None, exact=True, **filter_options):
+        self.filter = BloomFilter(path, **filter_options)
+        self._issued = set() if exact else None
+        self.rejected = 0
+    
+    def is_known(self, password):
+        """True if the password was already issued or is (probably) breached"""
+        digest = password_digest(password)
+        if self._issued is not None and digest in self._issued:
+            return True
+        return self.filter.contains_digest(digest)
+    
+    def issue(self, password):
+        """Record a password as issued"""
+        digest = password_digest(password)
+        if self._issued is not None:
+            self._issued.add(digest)
+        self.filter.add_digest(digest)
+    
+    def stats(self):
+        """Return memory use (bytes) and the expected false-positive rate"""
+        exact_bytes = 0
+        if self._issued is not None:
+            exact_bytes = sys.getsizeof(self._issued) + len(self._issued) * sys.getsizeof(b'x' * 20)
+        return {
+            'items': self.filter.items,
+            'filter_bytes': self.filter.memory_bytes,
+            'exact_bytes': exact_bytes,
+            'false_positive_rate': self.filter.false_positive_rate,
+            'rejected': self.rejected,
+        }
+    
+    def close(self):
+        self.filter.close()
+
+PASSPHRASE_WORDLIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "passphrase_wordlist.txt")
+WORDLIST_MAGIC = b"PWWORDS1"
+# Header: magic, source size, source mtime, word count; then count + 1 offsets and the word bytes
+WORDLIST_HEADER = struct.Struct(">8sQQI")
+WORDLIST_OFFSET = struct.Struct(">I")
+
+class Wordlist:
+    """
+    Passphrase wordlist compiled to an offset-indexed binary and memory-mapped.
+    
+    The text wordlist is compiled once to <name>.bin: a header, an array of
+    word offsets and the concatenated words. Later runs map that file instead
+    of parsing the text, so opening it costs the same for any list size and
+    word i is read directly at its offset.
+    
+    Args:
+        path (str): Text wordlist, one word per line
+        cache_path (str): Compiled file (default: path with a .bin extension)
+    """
+    
+    def __init__(self, path=PASSPHRASE_WORDLIST_PATH, cache_path=None):
+        self.path = path
+        self.cache_path = cache_path or os.path.splitext(path)[0] + ".bin"
+        stat = os.stat(path)
+        if not self._open(stat):
+            self.compile(path, self.cache_path)
+            if not self._open(stat):
+                raise ValueError(f"Could not compile wordlist {path}")
+    
+    def _open(self, stat):
+        """Map the compiled file if it matches the source; returns False if it must be rebuilt"""
+        try:
+            with open(self.cache_path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        magic, size, mtime, self.count = WORDLIST_HEADER.unpack_from(self._map)
+        if magic != WORDLIST_MAGIC or size != stat.st_size or mtime != stat.st_mtime_ns:
+            self._map.close()
+            return False
+        self._offsets = WORDLIST_HEADER.size
+        self._words = self._offsets + (self.count + 1) * WORDLIST_OFFSET.size
+        return True
+    
+    @staticmethod
+    def compile(path, cache_path):
+        """Compile a text wordlist (one word per line, duplicates dropped) into the binary format"""
+        with open(path, encoding='utf-8') as f:
+            words = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+        if len(words) < 2:
+            raise ValueError(f"Wordlist {path} needs at least two words")
+        encoded = [word.encode('utf-8') for word in words]
+        offsets = array('I', [0])
+        for word in encoded:
+            offsets.append(offsets[-1] + len(word))
+        if sys.byteorder == 'little':
+            offsets.byteswap()
+        stat = os.stat(path)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(WORDLIST_HEADER.pack(WORDLIST_MAGIC, stat.st_size, stat.st_mtime_ns, len(words)))
+            f.write(offsets.tobytes())
+            f.write(b''.join(encoded))
+        os.replace(tmp_path, cache_path)
+    
+    def __len__(self):
+        return self.count
+    
+    def __getitem__(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError("wordlist index out of range")
+        start, end = struct.unpack_from(">II", self._map, self._offsets + i * WORDLIST_OFFSET.size)
+        return self._map[self._words + start:self._words + end].decode('utf-8')
+    
+    def close(self):
+        self._map.close()
+
+PASSPHRASE_CAPITALIZATION = ['lower', 'title', 'upper', 'random']
+
+class PasswordGenerator:
+    def __init__(self, backend='buffered'):
+        """
+        Args:
+            backend: Randomness backend, either a name from BACKENDS
+                     ('random', 'secrets', 'buffered') or a backend instance
+        """
+        self.backend = BACKENDS[backend]() if isinstance(backend, str) else backend
         self.lowercase_letters = string.ascii_lowercase
         self.uppercase_letters = string.ascii_uppercase
         self.digits = string.digits
         self.special_chars = "!@#$%^&*()-_=+[]{}|;:,.<>?/"
+        self._estimator = None
+        self._wordlists = {}
+        self._policies = {}
+        self._samplers = {}
+    
+    def make_policy(self, length=12, use_lowercase=True, use_uppercase=True, use_digits=True,
+                    use_special=True, min_of_each=1, min_counts=None, max_counts=None,
+                    exclude='', exclude_ambiguous=False, no_repeat_adjacent=False):
+        """
+        Build a PasswordPolicy from the generator's character sets.
+        
+        Args:
+            length (int): Length of the password to generate
+            use_lowercase (bool): Include lowercase letters
+            use_uppercase (bool): Include uppercase letters
+            use_digits (bool): Include numbers
+            use_special (bool): Include special characters
+            min_of_each (int): Minimum count of each selected character type
+            min_counts (dict): Per-type minimums overriding min_of_each, keyed by
+                               'lowercase', 'uppercase', 'digits' or 'special'
+            max_counts (dict): Per-type maximums (equal to the minimum for an exact count)
+            exclude (str): Characters that must not appear
+            exclude_ambiguous (bool): Also exclude look-alike characters (AMBIGUOUS_CHARS)
+            no_repeat_adjacent (bool): Forbid the same character twice in a row
+            
+        Returns:
+            PasswordPolicy: The validated policy
+        """
+        char_sets = {}
+        if use_lowercase:
+            char_sets['lowercase'] = self.lowercase_letters
+        if use_uppercase:
+            char_sets['uppercase'] = self.uppercase_letters
+        if use_digits:
+            char_sets['digits'] = self.digits
+        if use_special:
+            char_sets['special'] = self.special_chars
+        if not char_sets:
+            raise ValueError("At least one character type must be selected")
+        
+        key = (length, tuple(char_sets.items()), min_of_each, _freeze(min_counts),
+               _freeze(max_counts), exclude, exclude_ambiguous, no_repeat_adjacent)
+        policy = self._policies.get(key)
+        if policy is None:
+            minimums = {name: max(0, min_of_each) for name in char_sets}
+            minimums.update(min_counts or {})
+            if exclude_ambiguous:
+                exclude += AMBIGUOUS_CHARS
+            policy = PasswordPolicy(char_sets, length, minimums, max_counts, exclude, no_repeat_adjacent)
+            if len(self._policies) >= 32:
+                self._policies.clear()
+            self._policies[key] = policy
+        return policy
+    
+    def sampler(self, policy):
+        """Return a (cached) PolicySampler for a policy using this generator's backend"""
+        sampler = self._samplers.get(policy.key)
+        if sampler is None:
+            if len(self._samplers) >= 32:
+                self._samplers.clear()
+            sampler = self._samplers[policy.key] = PolicySampler(policy, self.backend)
+        return sampler
     
     def generate_password(self, length=12, use_lowercase=True, use_uppercase=True, 
-                          use_digits=True, use_special=True, min_of_each=1):
+                          use_digits=True, use_special=True, min_of_each=1, guard=None,
+                          **constraints):
         """
         Generate a random password with specified complexity requirements.
         
+        The password is drawn uniformly from every password that meets the
+        requirements, so the required characters are as random as the rest.
+        
         Args:
             length (int): Length of the password to generate
             use_lowercase (bool): Include lowercase letters
@@ -22,107 +768,1366 @@ class PasswordGenerator:
             use_digits (bool): Include numbers
             use_special (bool): Include special characters
             min_of_each (int): Minimum count of each selected character type
+            guard (PasswordGuard): Never return a password the guard already knows
+            **constraints: Extra policy rules accepted by make_policy
+                           (min_counts, max_counts, exclude, exclude_ambiguous,
+                           no_repeat_adjacent)
             
         Returns:
             str: Generated password
         """
-        # Validate inputs
-        if length < 4 and (use_lowercase + use_uppercase + use_digits + use_special) * min_of_each > length:
-            raise ValueError("Password length too short to satisfy minimum character requirements")
+        policy = self.make_policy(length, use_lowercase, use_uppercase, use_digits,
+                                  use_special, min_of_each, **constraints)
+        sampler = self.sampler(policy)
+        if guard:
+            return self._screen([sampler.sample()], guard, sampler)[0]
+        return sampler.sample()
+    
+    def iter_batches(self, n, block_size=10000, guard=None, **options):
+        """
+        Generate passwords in blocks, yielding one list of passwords per block.
+        
+        The policy and its sampling tables are worked out once, and randomness
+        for a whole block is drawn with a few large backend choices calls
+        instead of several calls per password.
+        
+        Args:
+            n (int): Number of passwords to generate
+            block_size (int): Number of passwords produced per block
+            guard (PasswordGuard): Replace passwords the guard already knows
+            **options: Same options as generate_password
             
-        if not any([use_lowercase, use_uppercase, use_digits, use_special]):
-            raise ValueError("At least one character type must be selected")
+        Yields:
+            list: Up to block_size generated passwords
+        """
+        # Validate eagerly so errors surface at the call, not at the first block
+        sampler = self.sampler(self.make_policy(**options))
+        return self._generate_blocks(sampler, n, block_size, guard)
+    
+    def _generate_blocks(self, sampler, n, block_size, guard):
+        """Block generator behind iter_batches"""
+        for start in range(0, n, block_size):
+            block = sampler.sample_many(min(block_size, n - start))
+            yield self._screen(block, guard, sampler) if guard else block
+    
+    def _screen(self, passwords, guard, sampler):
+        """Swap out passwords the guard already knows for fresh ones and issue the rest"""
+        accepted = []
+        fruitless = 0
+        while passwords:
+            before = len(accepted)
+            for password in passwords:
+                if guard.is_known(password):
+                    guard.rejected += 1
+                else:
+                    guard.issue(password)
+                    accepted.append(password)
+            fruitless = fruitless + 1 if len(accepted) == before else 0
+            if fruitless >= 1000:
+                raise ValueError("Could not find enough unused passwords for this policy")
+            passwords = sampler.sample_many(len(passwords) - (len(accepted) - before))
+        return accepted
+    
+    def generate_batch(self, n, **options):
+        """
+        Generate n passwords in one call.
         
-        # Prepare character pool
-        char_pool = ""
-        if use_lowercase:
-            char_pool += self.lowercase_letters
-        if use_uppercase:
-            char_pool += self.uppercase_letters
-        if use_digits:
-            char_pool += self.digits
-        if use_special:
-            char_pool += self.special_chars
+        Args:
+            n (int): Number of passwords to generate
+            **options: Same options as generate_password
             
-        # Generate initial password with required minimums
-        password = []
+        Returns:
+            list: Generated passwords
+        """
+        passwords = []
+        for block in self.iter_batches(n, **options):
+            passwords.extend(block)
+        return passwords
+    
+    def write_batch(self, n, out, **options):
+        """
+        Write n newline-delimited passwords to a text stream, one block at a time.
+        
+        Args:
+            n (int): Number of passwords to generate
+            out: Writable text stream (e.g. sys.stdout or an open file)
+            **options: Same options as generate_password
+            
+        Returns:
+            int: Number of passwords written
+        """
+        written = 0
+        for block in self.iter_batches(n, **options):
+            out.write('\n'.join(block))
+            out.write('\n')
+            written += len(block)
+        return written
+    
+    def wordlist(self, path=PASSPHRASE_WORDLIST_PATH):
+        """Return the (cached) memory-mapped Wordlist for path"""
+        wordlist = self._wordlists.get(path)
+        if wordlist is None:
+            wordlist = self._wordlists[path] = Wordlist(path)
+        return wordlist
+    
+    def passphrase_words(self, entropy_bits=None, words=6, capitalize='lower', wordlist=PASSPHRASE_WORDLIST_PATH):
+        """Number of words needed to reach entropy_bits (or words if no target is given)"""
+        if entropy_bits is None:
+            return words
+        if not math.isfinite(entropy_bits):
+            raise ValueError(f"Entropy must be a finite number of bits, got {entropy_bits}")
+        bits_per_word = math.log2(len(self.wordlist(wordlist))) + (capitalize == 'random')
+        return max(1, math.ceil(entropy_bits / bits_per_word))
+    
+    def passphrase_entropy(self, words=6, capitalize='lower', wordlist=PASSPHRASE_WORDLIST_PATH):
+        """Entropy in bits of a passphrase of the given number of words"""
+        return words * (math.log2(len(self.wordlist(wordlist))) + (capitalize == 'random'))
+    
+    def generate_passphrases(self, n, words=6, separator='-', capitalize='lower',
+                             entropy_bits=None, wordlist=PASSPHRASE_WORDLIST_PATH):
+        """
+        Generate diceware-style passphrases of randomly chosen words.
+        
+        Args:
+            n (int): Number of passphrases to generate
+            words (int): Words per passphrase
+            separator (str): Text placed between words
+            capitalize (str): 'lower', 'title', 'upper', or 'random' (each word
+                              title-cased or not at random, one extra bit per word)
+            entropy_bits (float): Use as many words as needed to reach this
+                                  entropy instead of a fixed word count
+            wordlist (str): Text wordlist to draw words from
+            
+        Returns:
+            list: Generated passphrases
+        """
+        if capitalize not in PASSPHRASE_CAPITALIZATION:
+            raise ValueError(f"Capitalization must be one of: {', '.join(PASSPHRASE_CAPITALIZATION)}")
+        words = self.passphrase_words(entropy_bits, words, capitalize, wordlist)
+        if words < 1:
+            raise ValueError("A passphrase needs at least one word")
+        source = self.wordlist(wordlist)
+        size = len(source)
+        randbelow = self.backend.randbelow
+        
+        passphrases = []
+        for _ in range(n):
+            chosen = [source[randbelow(size)] for _ in range(words)]
+            if capitalize == 'title':
+                chosen = [word.capitalize() for word in chosen]
+            elif capitalize == 'upper':
+                chosen = [word.upper() for word in chosen]
+            elif capitalize == 'random':
+                chosen = [word.capitalize() if randbelow(2) else word for word in chosen]
+            passphrases.append(separator.join(chosen))
+        return passphrases
+    
+    def generate_passphrase(self, **options):
+        """Generate one passphrase; takes the same options as generate_passphrases"""
+        return self.generate_passphrases(1, **options)[0]
+    
+    def iter_parallel(self, n, workers=None, chunk_size=50000, guard=None, **options):
+        """
+        Generate passwords across several processes, yielding chunks in order.
         
-        # Add minimum characters from each selected type
-        if use_lowercase and min_of_each > 0:
-            password.extend(random.sample(self.lowercase_letters, min_of_each))
-        if use_uppercase and min_of_each > 0:
-            password.extend(random.sample(self.uppercase_letters, min_of_each))
-        if use_digits and min_of_each > 0:
-            password.extend(random.sample(self.digits, min_of_each))
-        if use_special and min_of_each > 0:
-            password.extend(random.sample(self.special_chars, min_of_each))
+        Each chunk is produced by a worker with its own freshly seeded backend
+        and sent back as a single newline-joined string to keep IPC cheap. At
+        most two chunks per worker are in flight, so memory stays bounded.
+        
+        Args:
+            n (int): Number of passwords to generate
+            workers (int): Number of worker processes (default: CPU count)
+            chunk_size (int): Passwords generated per task
+            guard (PasswordGuard): Replace passwords the guard already knows
+                                   (checked in this process, in order)
+            **options: Same options as generate_password
             
-        # Fill remaining length with random characters from the pool
-        remaining_length = length - len(password)
-        if remaining_length > 0:
-            password.extend(random.choices(char_pool, k=remaining_length))
+        Yields:
+            str: Newline-joined passwords of one chunk, in submission order
+        """
+        self.iter_batches(0, **options)  # validate options before starting workers
+        if guard:
+            sampler = self.sampler(self.make_policy(**options))
+            for chunk in self.iter_parallel(n, workers, chunk_size, **options):
+                yield '\n'.join(self._screen(chunk.split('\n'), guard, sampler))
+            return
+        workers = workers or os.cpu_count() or 1
+        tasks = [(self.backend.name, min(chunk_size, n - start), options)
+                 for start in range(0, n, chunk_size)]
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for task in tasks:
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(_generate_chunk, task))
+            while pending:
+                yield pending.popleft().result()
+    
+    def generate_parallel(self, n, workers=None, chunk_size=50000, **options):
+        """
+        Generate n passwords using a pool of worker processes.
+        
+        Args:
+            n (int): Number of passwords to generate
+            workers (int): Number of worker processes (default: CPU count)
+            chunk_size (int): Passwords generated per task
+            **options: Same options as generate_password
             
-        # Shuffle the password to avoid predictable patterns
-        random.shuffle(password)
+        Returns:
+            list: Generated passwords, in a single ordered list
+        """
+        passwords = []
+        for chunk in self.iter_parallel(n, workers, chunk_size, **options):
+            passwords.extend(chunk.split('\n'))
+        return passwords
+    
+    def write_parallel(self, n, out, workers=None, chunk_size=50000, **options):
+        """
+        Write n newline-delimited passwords generated by worker processes.
         
-        return ''.join(password)
+        Returns:
+            int: Number of passwords written
+        """
+        for chunk in self.iter_parallel(n, workers, chunk_size, **options):
+            out.write(chunk)
+            out.write('\n')
+        return n
     
-    def check_password_strength(self, password):
+    def check_password_strength(self, password, guard=None):
         """
         Evaluate the strength of a password.
         
         Args:
             password (str): Password to evaluate
+            guard (PasswordGuard): Rate the password Very Weak if the guard
+                                   knows it as breached or already issued
             
         Returns:
             tuple: (score, message) where score is 1-5 and message is feedback
         """
-        score = 0
-        feedback = []
+        chars = set(password)
+        has_lower = not chars.isdisjoint(self.lowercase_letters)
+        has_upper = not chars.isdisjoint(self.uppercase_letters)
+        has_digit = not chars.isdisjoint(self.digits)
+        has_special = not chars.isdisjoint(self.special_chars)
         
-        # Length check
-        if len(password) < 8:
-            score += 1
-            feedback.append("Password is too short")
-        elif len(password) < 12:
-            score += 2
-            feedback.append("Good length")
-        else:
-            score += 3
-            feedback.append("Excellent length")
+        variety_score = has_lower + has_upper + has_digit + has_special
+        length_score = _length_score(len(password))
+        if guard and guard.is_known(password):
+            return 1, f"Strength: {STRENGTH_LABELS[1]} (1/5)\nFeedback: Password is breached or already in use"
+        final_score = SCORE_TABLE[length_score][variety_score]
+        return final_score, _strength_message(final_score, length_score, variety_score)
+    
+    def estimate_strength(self, password):
+        """
+        Evaluate a password by the number of guesses it would take to crack.
+        
+        Unlike check_password_strength, this recognises dictionary words,
+        keyboard walks, repeats, sequences and dates, so "Password123!" is
+        rated weak rather than very strong.
+        
+        Args:
+            password (str): Password to evaluate
             
-        # Character variety checks
-        has_lower = any(c in self.lowercase_letters for c in password)
-        has_upper = any(c in self.uppercase_letters for c in password)
-        has_digit = any(c in self.digits for c in password)
-        has_special = any(c in self.special_chars for c in password)
+        Returns:
+            tuple: (score, message) in the same format as check_password_strength
+        """
+        if self._estimator is None:
+            self._estimator = EntropyEstimator()
+        result = self._estimator.estimate(password)
+        score = result['score']
+        feedback = [f"About 2^{result['guesses_log2']:.0f} guesses"]
+        for kind, token in result['patterns']:
+            feedback.append(f"{PATTERN_LABELS[kind]} '{token}'")
+        if not result['patterns']:
+            feedback.append("No common patterns found")
+        return score, f"Strength: {STRENGTH_LABELS[score]} ({score}/5)\nFeedback: {' | '.join(feedback)}"
+    
+    def _class_table(self):
+        """256-entry table mapping each byte to its character-class bit (0 for none)"""
+        table = bytearray(256)
+        for bit, chars in ((1, self.lowercase_letters), (2, self.uppercase_letters),
+                           (4, self.digits), (8, self.special_chars)):
+            for c in chars.encode('ascii'):
+                table[c] = bit
+        return bytes(table)
+    
+    def score_many(self, passwords, with_messages=False):
+        """
+        Score many passwords with the same rules as check_password_strength.
         
-        variety_score = has_lower + has_upper + has_digit + has_special
-        score += variety_score
+        Characters are classified with a 256-entry byte lookup table via
+        bytes.translate, so each password costs a few C-level calls and no
+        feedback strings are built unless requested.
+        
+        Args:
+            passwords: Iterable of str or UTF-8 encoded bytes
+            with_messages (bool): Also return the feedback message for each password
+            
+        Returns:
+            array: Scores (1-5) as an array('B'), or (scores, messages) if
+                   with_messages is True
+        """
+        table = self._class_table()
+        scores = array('B')
+        messages = [] if with_messages else None
+        append = scores.append
+        for password in passwords:
+            if isinstance(password, str):
+                length = len(password)
+                password = password.encode('utf-8')
+            elif password.isascii():
+                length = len(password)
+            else:
+                length = len(password.decode('utf-8', 'replace'))
+            classes = set(password.translate(table))
+            variety_score = len(classes) - (0 in classes)
+            length_score = _length_score(length)
+            final_score = SCORE_TABLE[length_score][variety_score]
+            append(final_score)
+            if with_messages:
+                messages.append(_strength_message(final_score, length_score, variety_score))
+        return (scores, messages) if with_messages else scores
+    
+    def audit_file(self, path, chunk_size=100000):
+        """
+        Stream a file of passwords (one per line) and count scores.
+        
+        Args:
+            path (str): File to audit
+            chunk_size (int): Lines scored per call to score_many
+            
+        Returns:
+            list: Counts indexed by score, so counts[5] is the number of
+                  "Very Strong" passwords (index 0 is unused)
+        """
+        counts = [0] * 6
+        with open(path, 'rb', buffering=1 << 20) as f:
+            lines = (line.rstrip(b'\r\n') for line in f)
+            lines = (line for line in lines if line)
+            while True:
+                chunk = list(islice(lines, chunk_size))
+                if not chunk:
+                    break
+                scores = self.score_many(chunk)
+                for score in range(1, 6):
+                    counts[score] += scores.count(score)
+        return counts
+
+STRENGTH_LABELS = {
+    1: "Very Weak",
+    2: "Weak",
+    3: "Moderate",
+    4: "Strong",
+    5: "Very Strong"
+}
+
+LENGTH_FEEDBACK = {1: "Password is too short", 2: "Good length", 3: "Excellent length"}
+
+# Final 1-5 score for every (length score, variety score) pair
+SCORE_TABLE = [[min(5, max(1, (length + variety) // 2)) for variety in range(5)]
+               for length in range(4)]
+
+def _freeze(counts):
+    """Hashable form of an optional counts dict"""
+    return tuple(sorted(counts.items())) if counts else ()
+
+def _length_score(length):
+    """Score a password length: 1 (short), 2 (good) or 3 (excellent)"""
+    if length < 8:
+        return 1
+    if length < 12:
+        return 2
+    return 3
+
+def _strength_message(final_score, length_score, variety_score):
+    """Build the feedback message reported by check_password_strength"""
+    if variety_score < 2:
+        variety_feedback = "Add more types of characters"
+    elif variety_score < 4:
+        variety_feedback = "Good character variety"
+    else:
+        variety_feedback = "Excellent character variety"
+    feedback = [LENGTH_FEEDBACK[length_score], variety_feedback]
+    return f"Strength: {STRENGTH_LABELS[final_score]} ({final_score}/5)\nFeedback: {' | '.join(feedback)}"
+
+WORDLIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "password_wordlist.txt")
+INDEX_FORMAT = 1
+
+# Unshifted keyboard rows; each row is offset half a key to the right of the one above
+KEYBOARD_ROWS = ["1234567890-=", "qwertyuiop[]\\", "asdfghjkl;'", "zxcvbnm,./"]
+SHIFTED_KEYS = dict(zip('!@#$%^&*()_+{}|:"<>?', "1234567890-=[]\\;',./"))
+L33T_TABLE = str.maketrans("4@30$5!7", "aaeossit")
+DATE_RE = re.compile(r"(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})")
+REPEAT_RE = re.compile(r"(.+?)\1+")
+
+def _keyboard_graph():
+    """Map each key to its neighbours, labelled with the direction of travel"""
+    positions = {key: (r, c) for r, row in enumerate(KEYBOARD_ROWS) for c, key in enumerate(row)}
+    offsets = [(0, -1), (0, 1), (-1, 0), (-1, 1), (1, -1), (1, 0)]
+    graph = {}
+    for key, (r, c) in positions.items():
+        graph[key] = {}
+        for direction, (dr, dc) in enumerate(offsets):
+            r2, c2 = r + dr, c + dc
+            if 0 <= r2 < len(KEYBOARD_ROWS) and 0 <= c2 < len(KEYBOARD_ROWS[r2]):
+                graph[key][KEYBOARD_ROWS[r2][c2]] = direction
+    return graph
+
+KEYBOARD_GRAPH = _keyboard_graph()
+KEYBOARD_DEGREE = sum(len(n) for n in KEYBOARD_GRAPH.values()) / len(KEYBOARD_GRAPH)
+
+def _variations(changed, unchanged):
+    """Number of ways a pattern could have changed/unchanged characters (case, l33t, shift)"""
+    if changed == 0:
+        return 1
+    if unchanged == 0:
+        return 2
+    return sum(math.comb(changed + unchanged, i) for i in range(1, min(changed, unchanged) + 1))
+
+class EntropyEstimator:
+    """
+    zxcvbn-style strength estimator based on guess counts.
+    
+    The password is broken into the cheapest sequence of recognised patterns
+    (dictionary words, keyboard walks, repeats, sequences and dates) plus
+    brute-forced characters, and the guesses for each piece are multiplied.
+    
+    Dictionary matching uses an Aho-Corasick automaton over the bundled
+    wordlist. It is built once and cached next to the wordlist as a marshal
+    file, so later runs load it without reparsing the wordlist.
+    
+    The bundled wordlist is small (about 500 entries), so words missing from
+    it are priced as brute force and estimates err on the high side. Pass a
+    larger frequency-ordered list as wordlist_path for realistic results.
+    """
+    
+    def __init__(self, wordlist_path=WORDLIST_PATH, cache_path=None):
+        self.wordlist_path = wordlist_path
+        self.cache_path = cache_path or os.path.splitext(wordlist_path)[0] + ".idx"
+        self.reference_year = date.today().year
+        self._load_index()
+    
+    def _signature(self):
+        stat = os.stat(self.wordlist_path)
+        return (INDEX_FORMAT, stat.st_size, stat.st_mtime_ns)
+    
+    def _load_index(self):
+        """Load the cached automaton, rebuilding it if the wordlist changed"""
+        signature = self._signature()
+        try:
+            with open(self.cache_path, 'rb') as f:
+                cached = marshal.load(f)
+            if cached[0] == signature:
+                self._set_index(cached[1:])
+                return
+        except (OSError, EOFError, ValueError, TypeError, IndexError):
+            pass
+        
+        with open(self.wordlist_path, encoding='utf-8') as f:
+            index = self.build_index(line.strip() for line in f)
+        self._set_index(index)
+        try:
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                marshal.dump((signature,) + index, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass  # a read-only install just rebuilds the index each run
+    
+    def _set_index(self, index):
+        transitions, fail, out, ranks, lengths = index
+        self._transitions = transitions
+        self._fail = array('i', fail)
+        self._out = array('i', out)
+        self._ranks = array('i', ranks)
+        self._lengths = array('B', lengths)
+    
+    @staticmethod
+    def build_index(words):
+        """
+        Compile ranked words into a flat Aho-Corasick automaton.
+        
+        Transitions are one dict keyed by (node << 8 | character code). The
+        per-node arrays hold the failure link, the next node on the failure
+        chain that ends a word, and the rank and length of the word ending at
+        the node (rank 0 when none does).
+        
+        Args:
+            words: Iterable of words, most common first
+            
+        Returns:
+            tuple: (transitions, fail, out, ranks, lengths), the arrays as bytes
+        """
+        transitions = {}
+        ranks = [0]
+        lengths = [0]
+        rank = 0
+        for word in words:
+            word = word.lower()
+            if len(word) < 3 or len(word) > 255 or not word.isascii():
+                continue
+            rank += 1
+            node = 0
+            for ch in word:
+                key = node << 8 | ord(ch)
+                child = transitions.get(key)
+                if child is None:
+                    child = len(ranks)
+                    transitions[key] = child
+                    ranks.append(0)
+                    lengths.append(0)
+                node = child
+            if not ranks[node]:
+                ranks[node] = rank
+                lengths[node] = len(word)
+        
+        children = [[] for _ in ranks]
+        for key, child in transitions.items():
+            children[key >> 8].append((key & 0xFF, child))
+        fail = [0] * len(ranks)
+        out = [0] * len(ranks)
+        queue = deque(child for _, child in children[0])
+        while queue:
+            node = queue.popleft()
+            for code, child in children[node]:
+                link = fail[node]
+                while link and (link << 8 | code) not in transitions:
+                    link = fail[link]
+                target = transitions.get(link << 8 | code, 0)
+                fail[child] = target if target != child else 0
+                out[child] = fail[child] if ranks[fail[child]] else out[fail[child]]
+                queue.append(child)
+        
+        return (transitions, array('i', fail).tobytes(), array('i', out).tobytes(),
+                array('i', ranks).tobytes(), array('B', lengths).tobytes())
+    
+    def _dictionary_matches(self, text):
+        """Yield (start, end, rank) for every wordlist entry found in text"""
+        transitions = self._transitions
+        fail, out, ranks, lengths = self._fail, self._out, self._ranks, self._lengths
+        node = 0
+        for i, ch in enumerate(text):
+            code = ord(ch)
+            if code > 0xFF:
+                node = 0
+                continue
+            while node and (node << 8 | code) not in transitions:
+                node = fail[node]
+            node = transitions.get(node << 8 | code, 0)
+            hit = node if ranks[node] else out[node]
+            while hit:
+                yield i - lengths[hit] + 1, i, ranks[hit]
+                hit = out[hit]
+    
+    def _match_dictionary(self, password):
+        lowered = password.lower()
+        unleeted = lowered.translate(L33T_TABLE)
+        matches = {}
+        for text, l33t in ((lowered, False), (unleeted, True)):
+            for i, j, rank in self._dictionary_matches(text):
+                if l33t and lowered[i:j + 1] == unleeted[i:j + 1]:
+                    continue  # plain match, already found above
+                token = password[i:j + 1]
+                upper = sum(c.isupper() for c in token)
+                lower = sum(c.islower() for c in token)
+                if upper and not (token[0].isupper() and upper == 1) and token.upper() != token:
+                    guesses = rank * _variations(upper, lower)
+                else:
+                    guesses = rank * (2 if upper else 1)
+                if l33t:
+                    subbed = sum(a != b for a, b in zip(lowered[i:j + 1], unleeted[i:j + 1]))
+                    guesses *= _variations(subbed, len(token) - subbed)
+                key = (i, j)
+                if key not in matches or guesses < matches[key][3]:
+                    matches[key] = ('dictionary', i, j, guesses)
+        return list(matches.values())
+    
+    def _match_spatial(self, password):
+        matches = []
+        keys = [SHIFTED_KEYS.get(c, c.lower()) for c in password]
+        shifted = [c in SHIFTED_KEYS or c.isupper() for c in password]
+        starts = len(KEYBOARD_GRAPH)
+        i = 0
+        while i < len(keys) - 1:
+            j = i
+            turns = 0
+            direction = None
+            while j + 1 < len(keys) and keys[j + 1] in KEYBOARD_GRAPH.get(keys[j], ()):
+                step = KEYBOARD_GRAPH[keys[j]][keys[j + 1]]
+                if step != direction:
+                    turns += 1
+                    direction = step
+                j += 1
+            length = j - i + 1
+            if length >= 3:
+                guesses = 0
+                for walk_length in range(2, length + 1):
+                    for turn in range(1, min(turns, walk_length - 1) + 1):
+                        guesses += math.comb(walk_length - 1, turn - 1) * starts * KEYBOARD_DEGREE ** turn
+                shift_count = sum(shifted[i:j + 1])
+                guesses *= _variations(shift_count, length - shift_count)
+                matches.append(('keyboard', i, j, guesses))
+                i = j
+            else:
+                i += 1
+        return matches
+    
+    def _match_sequence(self, password):
+        matches = []
+        i = 0
+        while i < len(password) - 2:
+            delta = ord(password[i + 1]) - ord(password[i])
+            j = i + 1
+            if 0 < abs(delta) <= 5:
+                while j + 1 < len(password) and ord(password[j + 1]) - ord(password[j]) == delta:
+                    j += 1
+            if j - i + 1 >= 3:
+                first = password[i]
+                if first in "aAzZ019":
+                    base = 4
+                elif first.isdigit():
+                    base = 10
+                else:
+                    base = 26
+                guesses = base * (j - i + 1) * (2 if delta < 0 else 1)
+                matches.append(('sequence', i, j, guesses))
+                i = j
+            else:
+                i += 1
+        return matches
+    
+    def _match_repeat(self, password):
+        matches = []
+        for match in REPEAT_RE.finditer(password):
+            if len(match.group(0)) < 3:
+                continue
+            base = match.group(1)
+            count = len(match.group(0)) // len(base)
+            base_guesses = 2 ** self._minimum_log2(base)[0]
+            matches.append(('repeat', match.start(), match.end() - 1, base_guesses * count))
+        return matches
+    
+    def _year_guesses(self, year):
+        return max(abs(year - self.reference_year), 20)
+    
+    def _match_date(self, password):
+        matches = []
+        for match in DATE_RE.finditer(password):
+            parts = [int(match.group(n)) for n in (1, 3, 4)]
+            if len(match.group(1)) == 4:
+                year = self._valid_date(*parts)
+            else:
+                year = self._valid_date(parts[2], parts[0], parts[1])
+            if year:
+                matches.append(('date', match.start(), match.end() - 1, self._year_guesses(year) * 365 * 4))
+        
+        for run in re.finditer(r"\d{4,}", password):
+            digits, offset = run.group(), run.start()
+            for size in (4, 6, 8):
+                for k in range(len(digits) - size + 1):
+                    chunk = digits[k:k + size]
+                    if size == 4:
+                        year = int(chunk)
+                        if 1900 <= year <= self.reference_year + 20:
+                            matches.append(('date', offset + k, offset + k + 3, self._year_guesses(year)))
+                        continue
+                    half = 2 if size == 6 else 4
+                    splits = [(int(chunk[:half]), int(chunk[half:half + 2]), int(chunk[half + 2:])),
+                              (int(chunk[-half:]), int(chunk[:2]), int(chunk[2:4]))]
+                    for year, first, second in splits:
+                        year = self._valid_date(year, first, second)
+                        if year:
+                            matches.append(('date', offset + k, offset + k + size - 1,
+                                            self._year_guesses(year) * 365))
+                            break
+        return matches
+    
+    def _valid_date(self, year, first, second):
+        """Return the four-digit year if (year, first, second) reads as a date, else 0"""
+        if year < 100:
+            year += 2000 if year <= self.reference_year % 100 + 5 else 1900
+        if not 1900 <= year <= self.reference_year + 20:
+            return 0
+        if (1 <= first <= 12 and 1 <= second <= 31) or (1 <= second <= 12 and 1 <= first <= 31):
+            return year
+        return 0
+    
+    def _minimum_log2(self, password):
+        """Find the cheapest decomposition of password into patterns and brute force"""
+        if not password:
+            return 0.0, []
+        cardinality = 0
+        chars = set(password)
+        for chars_in_class, size in ((string.ascii_lowercase, 26), (string.ascii_uppercase, 26),
+                                     (string.digits, 10), (string.punctuation + " ", 33)):
+            if not chars.isdisjoint(chars_in_class):
+                cardinality += size
+        if any(ord(c) > 127 for c in chars):
+            cardinality += 100
+        char_bits = math.log2(cardinality)
+        
+        matches = (self._match_dictionary(password) + self._match_spatial(password)
+                   + self._match_sequence(password) + self._match_date(password)
+                   + self._match_repeat(password))
+        ending = [[] for _ in password]
+        for match in matches:
+            ending[match[2]].append(match)
+        
+        best = [0.0] + [math.inf] * len(password)
+        back = [None] * (len(password) + 1)
+        for j in range(1, len(password) + 1):
+            best[j] = best[j - 1] + char_bits
+            for match in ending[j - 1]:
+                minimum = 10 if match[1] == match[2] else 50
+                cost = best[match[1]] + math.log2(max(match[3], minimum))
+                if cost < best[j]:
+                    best[j] = cost
+                    back[j] = match
+        
+        sequence = []
+        j = len(password)
+        while j > 0:
+            match = back[j]
+            if match is None:
+                j -= 1
+            else:
+                sequence.append((match[0], password[match[1]:match[2] + 1]))
+                j = match[1]
+        sequence.reverse()
+        return best[-1], sequence
+    
+    def estimate(self, password):
+        """
+        Estimate how many guesses an attacker needs for a password.
+        
+        Args:
+            password (str): Password to evaluate
+            
+        Returns:
+            dict: 'guesses_log2' (estimated guesses as a power of two),
+                  'score' (1-5) and 'patterns', a list of (kind, token) pairs
+        """
+        bits, patterns = self._minimum_log2(password)
+        guesses_log10 = bits * math.log10(2)
+        score = 1 + sum(guesses_log10 >= threshold for threshold in (3, 6, 8, 10))
+        return {'guesses_log2': bits, 'score': score, 'patterns': patterns}
+
+PATTERN_LABELS = {
+    'dictionary': "Common word",
+    'keyboard': "Keyboard pattern",
+    'sequence': "Sequence",
+    'repeat': "Repeated characters",
+    'date': "Date or year",
+}
+
+VAULT_PATH = "passwords.vault"
+VAULT_MAGIC = b"PWVAULT1"
+# Vaults whose records are sealed with ChaCha20-Poly1305 instead
+AEAD_VAULT_MAGIC = b"PWVAULT2"
+INDEX_MAGIC = b"PWVIDX01"
+# Log header: magic, KDF salt, passphrase check, generation
+VAULT_HEADER = struct.Struct(">8s16s32s8s")
+# Index header: magic, generation, capacity, entries, log size at last sync, dead log bytes
+INDEX_HEADER = struct.Struct(">8s8sQQQQ")
+INDEX_SLOT = struct.Struct(">QQ")
+RECORD_LENGTH = struct.Struct(">I")
+RECORD_FIELDS = struct.Struct(">HH")
+DIRTY = 2 ** 64 - 1
+
+class PasswordVault:
+    """
+    Encrypted, append-only password store.
+    
+    Entries are appended to a log of length-prefixed records. When the
+    cryptography package is installed, new vaults seal each record with
+    ChaCha20-Poly1305. Without it, records are encrypted with a BLAKE2b
+    keystream and authenticated with a BLAKE2b tag; that construction is
+    encrypt-then-MAC over standard primitives but has not been reviewed as an
+    AEAD, and vaults created this way keep using it. The keys are derived
+    from the passphrase with scrypt once, when the vault is opened.
+    
+    The vault protects entries at rest against someone who copies the file
+    but does not know the passphrase. It does not hide how many entries there
+    are or roughly how long they are, and it cannot protect against anyone
+    who can read the process memory or the passphrase as it is typed.
+    
+    A memory-mapped open-addressing hash table (<path>.idx) maps a keyed hash
+    of each label to the offset of its latest record, so a lookup reads one
+    record instead of scanning the log. Appends are buffered and fsync'd every
+    sync_every entries. Replaced entries leave dead records behind, and the log
+    is compacted once they make up more than half of it.
+    
+    If the index is stale after a crash, it is rebuilt from the log on open,
+    and any torn record at the end of the log is dropped.
+    
+    Raises:
+        ValueError: If the passphrase is wrong or a record fails authentication
+    """
+    
+    def __init__(self, path=VAULT_PATH, passphrase="", sync_every=1000):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.sync_every = sync_every
+        
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            salt = os.urandom(16)
+            self._derive_keys(passphrase, salt)
+            magic = VAULT_MAGIC if ChaCha20Poly1305 is None else AEAD_VAULT_MAGIC
+            with open(path, 'wb') as f:
+                f.write(VAULT_HEADER.pack(magic, salt, self._check_value(), os.urandom(8)))
+                f.flush()
+                os.fsync(f.fileno())
         
-        if variety_score < 2:
-            feedback.append("Add more types of characters")
-        elif variety_score < 4:
-            feedback.append("Good character variety")
+        self._log = open(path, 'r+b', buffering=0)
+        magic, salt, check, self._generation = VAULT_HEADER.unpack(self._log.read(VAULT_HEADER.size))
+        if magic not in (VAULT_MAGIC, AEAD_VAULT_MAGIC):
+            raise ValueError(f"{path} is not a password vault")
+        if magic == AEAD_VAULT_MAGIC and ChaCha20Poly1305 is None:
+            raise ValueError(f"{path} needs the 'cryptography' package (pip install cryptography)")
+        self._derive_keys(passphrase, salt)
+        self._aead = ChaCha20Poly1305(self._enc_key) if magic == AEAD_VAULT_MAGIC else None
+        if not hmac.compare_digest(check, self._check_value()):
+            raise ValueError("Wrong vault passphrase")
+        
+        # BLAKE2b nonces are a random per-session prefix plus a counter, so they never repeat
+        self._nonce_prefix = os.urandom(8)
+        self._nonce_counter = 0
+        self._pending = bytearray()
+        self._flushed = os.path.getsize(path)
+        self._unsynced = 0
+        self._open_index()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def __len__(self):
+        return self._count
+    
+    def __contains__(self, label):
+        return self.get(label) is not None
+    
+    def __getitem__(self, label):
+        entry = self.get(label)
+        if entry is None:
+            raise KeyError(label)
+        return entry
+    
+    # Encryption
+    
+    def _derive_keys(self, passphrase, salt):
+        key = hashlib.scrypt(passphrase.encode('utf-8'), salt=salt, n=1 << 14, r=8, p=1, dklen=64)
+        self._enc_key, self._mac_key = key[:32], key[32:]
+    
+    def _check_value(self):
+        return hashlib.blake2b(b"vault-check", key=self._mac_key, digest_size=32).digest()
+    
+    def _label_hash(self, label):
+        digest = hashlib.blake2b(label.encode('utf-8'), key=self._mac_key, digest_size=8,
+                                 person=b"vault-index").digest()
+        return int.from_bytes(digest, 'big')
+    
+    def _keystream(self, nonce, size):
+        return b''.join(
+            hashlib.blake2b(nonce + block.to_bytes(8, 'big'), key=self._enc_key, digest_size=64).digest()
+            for block in range((size + 63) // 64))[:size]
+    
+    def _encrypt(self, plaintext):
+        if self._aead is not None:
+            nonce = os.urandom(12)
+            return nonce + self._aead.encrypt(nonce, plaintext, None)
+        self._nonce_counter += 1
+        nonce = self._nonce_prefix + self._nonce_counter.to_bytes(8, 'big')
+        stream = self._keystream(nonce, len(plaintext))
+        ciphertext = (int.from_bytes(plaintext, 'big') ^ int.from_bytes(stream, 'big')).to_bytes(len(plaintext), 'big')
+        tag = hashlib.blake2b(nonce + ciphertext, key=self._mac_key, digest_size=16).digest()
+        return nonce + ciphertext + tag
+    
+    def _decrypt(self, payload):
+        if self._aead is not None:
+            try:
+                return self._aead.decrypt(payload[:12], payload[12:], None)
+            except InvalidTag:
+                raise ValueError("Vault record failed authentication") from None
+        nonce, ciphertext, tag = payload[:16], payload[16:-16], payload[-16:]
+        expected = hashlib.blake2b(nonce + ciphertext, key=self._mac_key, digest_size=16).digest()
+        if not hmac.compare_digest(tag, expected):
+            raise ValueError("Vault record failed authentication")
+        stream = self._keystream(nonce, len(ciphertext))
+        return (int.from_bytes(ciphertext, 'big') ^ int.from_bytes(stream, 'big')).to_bytes(len(ciphertext), 'big')
+    
+    # Log
+    
+    def _read_record(self, offset):
+        """Return the encrypted payload of the record at offset"""
+        if offset >= self._flushed:
+            start = offset - self._flushed
+            size, = RECORD_LENGTH.unpack_from(self._pending, start)
+            return bytes(self._pending[start + RECORD_LENGTH.size:start + RECORD_LENGTH.size + size])
+        size, = RECORD_LENGTH.unpack(os.pread(self._log.fileno(), RECORD_LENGTH.size, offset))
+        return os.pread(self._log.fileno(), size, offset + RECORD_LENGTH.size)
+    
+    def _read_entry(self, offset):
+        """Decrypt the record at offset into (label, password, note)"""
+        plaintext = self._decrypt(self._read_record(offset))
+        label_size, password_size = RECORD_FIELDS.unpack_from(plaintext)
+        start = RECORD_FIELDS.size
+        label = plaintext[start:start + label_size].decode('utf-8')
+        start += label_size
+        password = plaintext[start:start + password_size].decode('utf-8')
+        note = plaintext[start + password_size:].decode('utf-8')
+        return label, password, note
+    
+    def _flush_pending(self):
+        if self._pending:
+            self._log.seek(self._flushed)
+            self._log.write(self._pending)
+            self._flushed += len(self._pending)
+            self._pending = bytearray()
+    
+    # Index
+    
+    def _open_index(self):
+        try:
+            self._index_file = open(self.index_path, 'r+b')
+            self._map = mmap.mmap(self._index_file.fileno(), 0)
+            magic, generation, capacity, count, synced, dead = INDEX_HEADER.unpack_from(self._map)
+        except (OSError, ValueError, struct.error):
+            self._rebuild_index()
+            return
+        if magic != INDEX_MAGIC or generation != self._generation or synced != self._flushed:
+            self._map.close()
+            self._index_file.close()
+            self._rebuild_index()
+            return
+        self._capacity, self._count, self._dead = capacity, count, dead
+        self._dirty = False
+    
+    def _create_index(self, path, capacity):
+        """Create an empty index file and map it in place of the current one"""
+        with open(path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, self._generation, capacity, 0, DIRTY, 0))
+            f.truncate(INDEX_HEADER.size + capacity * INDEX_SLOT.size)
+        self._index_file = open(path, 'r+b')
+        self._map = mmap.mmap(self._index_file.fileno(), 0)
+        self._capacity, self._count, self._dead = capacity, 0, 0
+        self._dirty = True
+    
+    def _rebuild_index(self):
+        """Rebuild the index by replaying the log, dropping a torn final record"""
+        self._create_index(self.index_path, 1024)
+        offset = VAULT_HEADER.size
+        end = self._flushed
+        while offset + RECORD_LENGTH.size <= end:
+            size, = RECORD_LENGTH.unpack(os.pread(self._log.fileno(), RECORD_LENGTH.size, offset))
+            if offset + RECORD_LENGTH.size + size > end:
+                break
+            try:
+                label = self._read_entry(offset)[0]
+            except ValueError:
+                break
+            self._insert(label, offset)
+            offset += RECORD_LENGTH.size + size
+        if offset < end:
+            self._log.truncate(offset)
+            self._flushed = offset
+        self.sync()
+    
+    def _find_slot(self, label, label_hash):
+        """Return (slot, offset) for label; offset is None if the label is absent"""
+        slot = label_hash % self._capacity
+        while True:
+            stored_hash, reference = INDEX_SLOT.unpack_from(self._map, INDEX_HEADER.size + slot * INDEX_SLOT.size)
+            if not reference:
+                return slot, None
+            if stored_hash == label_hash and self._read_entry(reference - 1)[0] == label:
+                return slot, reference - 1
+            slot = (slot + 1) % self._capacity
+    
+    def _mark_dirty(self):
+        """Flag the index as unsynced on disk before any slot changes"""
+        if not self._dirty:
+            INDEX_HEADER.pack_into(self._map, 0, INDEX_MAGIC, self._generation, self._capacity,
+                                   self._count, DIRTY, self._dead)
+            self._map.flush(0, mmap.PAGESIZE)
+            self._dirty = True
+    
+    def _insert(self, label, offset):
+        self._mark_dirty()
+        if (self._count + 1) * 2 > self._capacity:
+            self._grow()
+        label_hash = self._label_hash(label)
+        slot, old_offset = self._find_slot(label, label_hash)
+        if old_offset is None:
+            self._count += 1
+        else:
+            self._dead += RECORD_LENGTH.size + len(self._read_record(old_offset))
+        INDEX_SLOT.pack_into(self._map, INDEX_HEADER.size + slot * INDEX_SLOT.size, label_hash, offset + 1)
+    
+    def _grow(self):
+        """Double the index capacity, rehashing the stored slots without touching the log"""
+        old_map, old_file, old_capacity = self._map, self._index_file, self._capacity
+        count, dead = self._count, self._dead
+        tmp_path = self.index_path + ".tmp"
+        self._create_index(tmp_path, old_capacity * 2)
+        for slot in range(old_capacity):
+            label_hash, reference = INDEX_SLOT.unpack_from(old_map, INDEX_HEADER.size + slot * INDEX_SLOT.size)
+            if reference:
+                new_slot = label_hash % self._capacity
+                while INDEX_SLOT.unpack_from(self._map, INDEX_HEADER.size + new_slot * INDEX_SLOT.size)[1]:
+                    new_slot = (new_slot + 1) % self._capacity
+                INDEX_SLOT.pack_into(self._map, INDEX_HEADER.size + new_slot * INDEX_SLOT.size, label_hash, reference)
+        old_map.close()
+        old_file.close()
+        os.replace(tmp_path, self.index_path)
+        self._count, self._dead = count, dead
+    
+    # Public API
+    
+    def put(self, label, password, note=""):
+        """
+        Store a password under label, replacing any earlier entry.
+        
+        Args:
+            label (str): Name to look the password up by
+            password (str): Password to store
+            note (str): Optional note, e.g. the strength report
+        """
+        label_bytes = label.encode('utf-8')
+        password_bytes = password.encode('utf-8')
+        plaintext = (RECORD_FIELDS.pack(len(label_bytes), len(password_bytes))
+                     + label_bytes + password_bytes + note.encode('utf-8'))
+        payload = self._encrypt(plaintext)
+        offset = self._flushed + len(self._pending)
+        self._pending += RECORD_LENGTH.pack(len(payload))
+        self._pending += payload
+        self._insert(label, offset)
+        
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.sync()
+        elif len(self._pending) >= 1 << 20:
+            self._flush_pending()
+    
+    def get(self, label, default=None):
+        """
+        Look up a stored password.
+        
+        Returns:
+            tuple: (password, note), or default if the label is not stored
+        """
+        offset = self._find_slot(label, self._label_hash(label))[1]
+        if offset is None:
+            return default
+        return self._read_entry(offset)[1:]
+    
+    def labels(self):
+        """Return the labels of all stored passwords"""
+        labels = []
+        for slot in range(self._capacity):
+            reference = INDEX_SLOT.unpack_from(self._map, INDEX_HEADER.size + slot * INDEX_SLOT.size)[1]
+            if reference:
+                labels.append(self._read_entry(reference - 1)[0])
+        return labels
+    
+    def sync(self):
+        """Write buffered records, fsync the log and mark the index as up to date"""
+        self._flush_pending()
+        os.fsync(self._log.fileno())
+        INDEX_HEADER.pack_into(self._map, 0, INDEX_MAGIC, self._generation, self._capacity,
+                               self._count, self._flushed, self._dead)
+        self._map.flush()
+        self._dirty = False
+        self._unsynced = 0
+        if self._dead > max(1 << 20, (self._flushed - VAULT_HEADER.size) // 2):
+            self.compact()
+    
+    def compact(self):
+        """Rewrite the log with only the latest record of each label"""
+        self._flush_pending()
+        self._mark_dirty()
+        generation = os.urandom(8)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as out:
+            self._log.seek(0)
+            header = bytearray(self._log.read(VAULT_HEADER.size))
+            header[-8:] = generation
+            out.write(header)
+            position = VAULT_HEADER.size
+            for slot in range(self._capacity):
+                at = INDEX_HEADER.size + slot * INDEX_SLOT.size
+                label_hash, reference = INDEX_SLOT.unpack_from(self._map, at)
+                if reference:
+                    payload = self._read_record(reference - 1)
+                    out.write(RECORD_LENGTH.pack(len(payload)))
+                    out.write(payload)
+                    INDEX_SLOT.pack_into(self._map, at, label_hash, position + 1)
+                    position += RECORD_LENGTH.size + len(payload)
+            out.flush()
+            os.fsync(out.fileno())
+        # A crash between the two steps leaves mismatched generations, so the
+        # index is rebuilt from the new log on the next open
+        os.replace(tmp_path, self.path)
+        self._log.close()
+        self._log = open(self.path, 'r+b', buffering=0)
+        self._generation = generation
+        self._flushed = position
+        self._dead = 0
+        INDEX_HEADER.pack_into(self._map, 0, INDEX_MAGIC, self._generation, self._capacity,
+                               self._count, self._flushed, self._dead)
+        self._map.flush()
+        self._dirty = False
+    
+    def close(self):
+        """Sync and close the vault"""
+        if self._log.closed:
+            return
+        self.sync()
+        self._map.close()
+        self._index_file.close()
+        self._log.close()
+
+SERVICE_POOL_SIZE = 1000
+SERVICE_MAX_POOLS = 64
+SERVICE_MAX_COUNT = 1000
+SERVICE_REFILL_BLOCK = 250
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                500: 'Internal Server Error'}
+
+class PasswordService:
+    """
+    Long-running asyncio HTTP service wrapping a PasswordGenerator.
+    
+    Each distinct policy gets a pool of pre-generated passwords. Requests
+    are answered from the pool, and a background task tops the pool back up
+    in small blocks whenever it falls below half full, yielding to the event
+    loop between blocks. A request only generates inline when its pool is
+    empty, e.g. for the first request with a new policy.
+    
+    Endpoints (GET, HTTP/1.1 with keep-alive):
+        /password?length=16&special=0&min_digits=2&count=5
+        /passphrase?words=6&separator=-&capitalize=title
+        /stats
+    
+    Args:
+        generator (PasswordGenerator): Generator to draw passwords from
+        pool_size (int): Passwords kept ready per policy
+        guard (PasswordGuard): Never serve a password the guard already knows
+    """
+    
+    def __init__(self, generator, pool_size=SERVICE_POOL_SIZE, guard=None):
+        self.generator = generator
+        self.pool_size = pool_size
+        self.guard = guard
+        self._pools = OrderedDict()
+        self._refilling = set()
+        self.requests = 0
+        self.pool_hits = 0
+    
+    def _pool(self, key):
+        """Return the pool for key, evicting the least recently used pool if there are too many"""
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = deque()
+            if len(self._pools) > SERVICE_MAX_POOLS:
+                self._pools.popitem(last=False)
         else:
-            feedback.append("Excellent character variety")
+            self._pools.move_to_end(key)
+        return pool
+    
+    def take(self, key, make, count=1, screen=None):
+        """
+        Take count items from the pool for key, scheduling a refill if it runs low.
+        
+        Args:
+            key: Hashable pool key (one per policy)
+            make (callable): make(n) generates n fresh items for this pool
+            count (int): Number of items wanted
+            screen (callable): screen(items) replaces items that may not be
+                               served and records the rest as issued
             
-        # Normalize score to 1-5 range
-        final_score = min(5, max(1, score // 2))
-        
-        strength_labels = {
-            1: "Very Weak",
-            2: "Weak",
-            3: "Moderate",
-            4: "Strong",
-            5: "Very Strong"
-        }
+        Returns:
+            list: count items
+        """
+        pool = self._pool(key)
+        taken = [pool.popleft() for _ in range(min(count, len(pool)))]
+        if len(taken) == count:
+            self.pool_hits += 1
+        else:
+            taken.extend(make(count - len(taken)))
+        if len(pool) < self.pool_size // 2 and key not in self._refilling:
+            self._refilling.add(key)
+            asyncio.get_running_loop().create_task(self._refill(key, pool, make))
+        # Screened as they are served, not when pooled, so the guard only records issued items
+        return screen(taken) if screen else taken
+    
+    async def _refill(self, key, pool, make):
+        """Top a pool up to pool_size one small block at a time"""
+        try:
+            while len(pool) < self.pool_size and self._pools.get(key) is pool:
+                pool.extend(make(min(SERVICE_REFILL_BLOCK, self.pool_size - len(pool))))
+                await asyncio.sleep(0)
+        finally:
+            self._refilling.discard(key)
+    
+    def _password_source(self, query):
+        """Pool key, block generator and guard screen for the password policy described by query"""
+        flags = {name: query.get(name, '1') not in ('0', 'false', 'no')
+                 for name in ('lowercase', 'uppercase', 'digits', 'special')}
+        min_counts = {name: int(query['min_' + name]) for name in flags if 'min_' + name in query}
+        max_counts = {name: int(query['max_' + name]) for name in flags if 'max_' + name in query}
+        for name in flags:
+            if 'exact_' + name in query:
+                min_counts[name] = max_counts[name] = int(query['exact_' + name])
+        policy = self.generator.make_policy(
+            length=int(query.get('length', 12)),
+            use_lowercase=flags['lowercase'], use_uppercase=flags['uppercase'],
+            use_digits=flags['digits'], use_special=flags['special'],
+            min_of_each=int(query.get('min_each', 1)),
+            min_counts=min_counts, max_counts=max_counts,
+            exclude=query.get('exclude', ''),
+            exclude_ambiguous=query.get('exclude_ambiguous') == '1',
+            no_repeat_adjacent=query.get('no_repeat') == '1')
+        sampler = self.generator.sampler(policy)
+        guard = self.guard
         
-        result_message = f"Strength: {strength_labels[final_score]} ({final_score}/5)\nFeedback: {' | '.join(feedback)}"
+        def screen(passwords):
+            return self.generator._screen(passwords, guard, sampler)
         
-        return final_score, result_message
+        # Keyed by the policy, not the sampler, which the generator's cache may replace
+        return ('password',) + policy.key, sampler.sample_many, screen if guard else None
+    
+    def passwords(self, query):
+        """Handle /password: take passwords with the query's policy from its pool"""
+        key, make, screen = self._password_source(query)
+        return self.take(key, make, self._count(query), screen)
+    
+    def passphrases(self, query):
+        """Handle /passphrase: take passphrases with the requested word options from their pool"""
+        options = {
+            'words': int(query.get('words', 6)),
+            'separator': query.get('separator', '-'),
+            'capitalize': query.get('capitalize', 'lower')
+        }
+        if 'entropy' in query:
+            options['words'] = self.generator.passphrase_words(
+                float(query['entropy']), capitalize=options['capitalize'])
+        self.generator.generate_passphrases(0, **options)  # validate before pooling
+        key = ('passphrase',) + tuple(options.values())
+        return self.take(key, lambda n: self.generator.generate_passphrases(n, **options),
+                         self._count(query))
+    
+    @staticmethod
+    def _count(query):
+        count = int(query.get('count', 1))
+        if not 1 <= count <= SERVICE_MAX_COUNT:
+            raise ValueError(f"count must be between 1 and {SERVICE_MAX_COUNT}")
+        return count
+    
+    def respond(self, method, target):
+        """Route one request; returns (status, body)"""
+        path, _, query_string = target.partition('?')
+        query = dict(parse_qsl(query_string))
+        if method != 'GET':
+            return 405, "Only GET is supported\n"
+        self.requests += 1
+        try:
+            if path == '/password':
+                return 200, '\n'.join(self.passwords(query)) + '\n'
+            if path == '/passphrase':
+                return 200, '\n'.join(self.passphrases(query)) + '\n'
+        except (ValueError, OverflowError) as e:
+            return 400, f"Error: {e}\n"
+        if path == '/stats':
+            ready = sum(len(pool) for pool in self._pools.values())
+            return 200, (f"requests {self.requests}\npool_hits {self.pool_hits}\n"
+                         f"pools {len(self._pools)}\nready {ready}\n")
+        return 404, "Not found\n"
+    
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                request = lines[0].split()
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if len(request) != 3:
+                    status, body = 400, "Malformed request line\n"
+                else:
+                    try:
+                        status, body = self.respond(request[0], request[1])
+                    except Exception:
+                        # A bug in one request must not drop the connection without a response
+                        traceback.print_exc()
+                        status, body = 500, "Internal server error\n"
+                keep_alive = (len(request) == 3 and request[2] == 'HTTP/1.1'
+                              and headers.get('connection', '').lower() != 'close')
+                payload = body.encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                    f"Content-Type: text/plain; charset=utf-8\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Cache-Control: no-store\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+                    + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def serve(self, host='127.0.0.1', port=8080, unix_path=None):
+        """Listen on a Unix socket (if unix_path is given) or host:port until cancelled"""
+        # Fill the default policy's pool up front so the first request is a pool hit
+        key, make, _ = self._password_source({})
+        self._pool(key).extend(make(self.pool_size))
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle, path=unix_path)
+            address = f"unix:{unix_path}"
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            address = "http://%s:%d" % server.sockets[0].getsockname()[:2]
+        print(f"Listening on {address}", flush=True)
+        stopped = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+        except (NotImplementedError, AttributeError):
+            pass  # no SIGTERM handling on this platform; Ctrl+C still works
+        try:
+            async with server:
+                await stopped.wait()
+        finally:
+            if unix_path and os.path.exists(unix_path):
+                os.unlink(unix_path)
+
+def _generate_chunk(task):
+    """Worker entry point: generate one chunk with an independently seeded backend"""
+    backend_name, count, options = task
+    if backend_name == 'random':
+        # Seed every chunk from the OS, so no two workers or chunks share a stream
+        backend = RandomBackend(seed=secrets.randbits(128))
+    else:
+        backend = BACKENDS[backend_name]()
+    generator = PasswordGenerator(backend=backend)
+    return '\n'.join(generator.generate_batch(count, **options))
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        return serve_main(sys.argv[2:])
+    
     # Command-line interface
     parser = argparse.ArgumentParser(description="Generate secure random passwords")
     parser.add_argument("-l", "--length", type=int, default=12, help="Password length (default: 12)")
@@ -131,7 +2136,47 @@ def main():
     parser.add_argument("--no-digits", action="store_true", help="Exclude numbers")
     parser.add_argument("--no-special", action="store_true", help="Exclude special characters")
     parser.add_argument("-m", "--min-each", type=int, default=1, help="Minimum of each char type (default: 1)")
+    parser.add_argument("--min", action="append", default=[], metavar="TYPE=N",
+                        help="Minimum of one char type (lowercase, uppercase, digits, special)")
+    parser.add_argument("--max", action="append", default=[], metavar="TYPE=N",
+                        help="Maximum of one char type")
+    parser.add_argument("--exact", action="append", default=[], metavar="TYPE=N",
+                        help="Exact count of one char type")
+    parser.add_argument("--exclude", default="", help="Characters that must not appear")
+    parser.add_argument("--exclude-ambiguous", action="store_true",
+                        help=f"Exclude look-alike characters ({AMBIGUOUS_CHARS})")
+    parser.add_argument("--no-repeat", action="store_true",
+                        help="Never use the same character twice in a row")
     parser.add_argument("-c", "--count", type=int, default=1, help="Number of passwords to generate (default: 1)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write passwords only, one per line, using the bulk generator")
+    parser.add_argument("-o", "--output", help="Write streamed passwords to FILE instead of stdout")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Generate with N worker processes (default: 1)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default='buffered',
+                        help="Randomness source (default: buffered os.urandom)")
+    parser.add_argument("--guard", metavar="FILE",
+                        help="Reject passwords found in this Bloom filter file and add new ones to it")
+    parser.add_argument("--breached", metavar="LIST",
+                        help="Load a breached-password list (SHA-1 hashes or passwords) into --guard")
+    parser.add_argument("--guard-capacity", type=int, default=10000000,
+                        help="Items a new --guard filter is sized for (default: 10,000,000)")
+    parser.add_argument("--passphrase", action="store_true",
+                        help="Generate passphrases of random words instead of passwords")
+    parser.add_argument("--words", type=int, default=6, help="Words per passphrase (default: 6)")
+    parser.add_argument("--separator", default="-", help="Text between passphrase words (default: -)")
+    parser.add_argument("--capitalize", choices=PASSPHRASE_CAPITALIZATION, default='lower',
+                        help="Capitalization of passphrase words (default: lower)")
+    parser.add_argument("--entropy", type=float, metavar="BITS",
+                        help="Use as many passphrase words as needed to reach BITS of entropy")
+    parser.add_argument("--wordlist", default=PASSPHRASE_WORDLIST_PATH,
+                        help="Passphrase wordlist, one word per line")
+    parser.add_argument("--estimator", choices=['basic', 'entropy'], default='basic',
+                        help="Strength check: character classes (basic) or guess entropy")
+    parser.add_argument("--audit", metavar="FILE",
+                        help="Score every password in FILE (one per line) and print a histogram")
+    parser.add_argument("--benchmark", choices=sorted(BENCHMARKS),
+                        help="Run a throughput benchmark using --count passwords")
     
     # Interactive mode if no arguments provided
     if len(sys.argv) == 1:
@@ -144,19 +2189,127 @@ def main():
         print("Error: At least one character type must be enabled")
         return
     
-    generator = PasswordGenerator()
+    try:
+        min_counts = parse_counts(args.min + args.exact)
+        max_counts = parse_counts(args.max + args.exact)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    
+    generator = PasswordGenerator(backend=args.backend)
+    options = {
+        'length': args.length,
+        'use_lowercase': not args.no_lowercase,
+        'use_uppercase': not args.no_uppercase,
+        'use_digits': not args.no_digits,
+        'use_special': not args.no_special,
+        'min_of_each': args.min_each,
+        'min_counts': min_counts,
+        'max_counts': max_counts,
+        'exclude': args.exclude,
+        'exclude_ambiguous': args.exclude_ambiguous,
+        'no_repeat_adjacent': args.no_repeat
+    }
+    
+    if args.benchmark:
+        return BENCHMARKS[args.benchmark](generator, args.count, options)
+    
+    if args.breached and not args.guard:
+        print("Error: --breached needs a --guard filter file to load into")
+        return
+    guard = None
+    if args.guard:
+        try:
+            guard = PasswordGuard(args.guard, capacity=args.guard_capacity)
+            if args.breached:
+                loaded = guard.filter.load_hashes(args.breached)
+                print(f"Loaded {loaded:,} breached entries into '{args.guard}'", file=sys.stderr)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return
+        options['guard'] = guard
+    try:
+        run_cli(generator, args, options)
+    finally:
+        if guard:
+            print_guard_stats(guard)
+            guard.close()
+
+def serve_main(argv):
+    """Command-line entry point for `password_generator.py serve`"""
+    parser = argparse.ArgumentParser(prog="password_generator.py serve",
+                                     description="Serve passwords over HTTP from pre-generated pools")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="TCP port (default: 8080, 0 picks a free port)")
+    parser.add_argument("--unix", metavar="PATH", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--pool-size", type=int, default=SERVICE_POOL_SIZE,
+                        help=f"Passwords kept ready per policy (default: {SERVICE_POOL_SIZE})")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default='buffered',
+                        help="Randomness source (default: buffered os.urandom)")
+    parser.add_argument("--guard", metavar="FILE",
+                        help="Never serve passwords found in this Bloom filter file, and add served ones")
+    args = parser.parse_args(argv)
+    
+    guard = None
+    try:
+        if args.guard:
+            guard = PasswordGuard(args.guard)
+        service = PasswordService(PasswordGenerator(backend=args.backend), args.pool_size, guard)
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+    finally:
+        if guard:
+            guard.close()
+
+def run_cli(generator, args, options):
+    """Generate, stream or audit passwords as requested on the command line"""
+    if args.passphrase:
+        return run_passphrases(generator, args)
+    
+    if args.audit:
+        try:
+            counts = generator.audit_file(args.audit)
+        except OSError as e:
+            print(f"Error: {e}")
+            return
+        print_histogram(counts)
+        return
+    
+    if args.stream:
+        try:
+            if args.output:
+                with open(args.output, 'w', buffering=1 << 20) as f:
+                    write_passwords(generator, args, f, options)
+            else:
+                write_passwords(generator, args, sys.stdout, options)
+                sys.stdout.flush()
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+        return
+    
+    if args.workers > 1:
+        try:
+            passwords = generator.generate_parallel(args.count, workers=args.workers, **options)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+    else:
+        passwords = None
+    
     for i in range(args.count):
         try:
-            password = generator.generate_password(
-                length=args.length,
-                use_lowercase=not args.no_lowercase,
-                use_uppercase=not args.no_uppercase,
-                use_digits=not args.no_digits,
-                use_special=not args.no_special,
-                min_of_each=args.min_each
-            )
+            if passwords is not None:
+                password = passwords[i]
+            else:
+                password = generator.generate_password(**options)
             
-            strength, message = generator.check_password_strength(password)
+            if args.estimator == 'entropy':
+                strength, message = generator.estimate_strength(password)
+            else:
+                strength, message = generator.check_password_strength(password)
             print(f"\nPassword {i+1}:\n{password}")
             print(message)
             
@@ -164,19 +2317,94 @@ def main():
             print(f"Error: {e}")
             return
 
+def run_passphrases(generator, args):
+    """Generate passphrases for the CLI"""
+    options = {
+        'words': args.words,
+        'separator': args.separator,
+        'capitalize': args.capitalize,
+        'entropy_bits': args.entropy,
+        'wordlist': args.wordlist
+    }
+    try:
+        if args.stream:
+            out = open(args.output, 'w', buffering=1 << 20) if args.output else sys.stdout
+            try:
+                for start in range(0, args.count, 10000):
+                    block = generator.generate_passphrases(min(10000, args.count - start), **options)
+                    out.write('\n'.join(block))
+                    out.write('\n')
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+            return
+        
+        passphrases = generator.generate_passphrases(args.count, **options)
+        words = generator.passphrase_words(args.entropy, args.words, args.capitalize, args.wordlist)
+        bits = generator.passphrase_entropy(words, args.capitalize, args.wordlist)
+        size = len(generator.wordlist(args.wordlist))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+    for i, passphrase in enumerate(passphrases):
+        print(f"\nPassphrase {i+1}:\n{passphrase}")
+        print(f"Entropy: {bits:.1f} bits ({words} words from a list of {size:,})")
+
+def parse_counts(values):
+    """Parse TYPE=N command-line values into a dict of counts"""
+    counts = {}
+    for value in values:
+        name, _, number = value.partition('=')
+        if not number.isdigit():
+            raise ValueError(f"Expected TYPE=N, got '{value}'")
+        counts[name] = int(number)
+    return counts
+
+def print_guard_stats(guard):
+    """Report the guard's memory use and false-positive rate on stderr"""
+    stats = guard.stats()
+    print(f"Guard: {stats['items']:,} items, {stats['rejected']:,} rejected, "
+          f"filter {stats['filter_bytes'] / 2**20:.1f} MiB + exact set {stats['exact_bytes'] / 2**20:.1f} MiB, "
+          f"false-positive rate {stats['false_positive_rate']:.2e}", file=sys.stderr)
+
+def print_histogram(counts):
+    """Print a strength histogram from audit_file counts"""
+    total = sum(counts)
+    print(f"Audited {total:,} passwords")
+    for score in range(1, 6):
+        share = counts[score] / total if total else 0
+        bar = '#' * round(share * 40)
+        print(f"{STRENGTH_LABELS[score]:>11} ({score}/5): {counts[score]:>12,} {share:6.1%} {bar}")
+
+def write_passwords(generator, args, out, options):
+    """Stream passwords for the CLI, in parallel when --workers is above 1"""
+    if args.workers > 1:
+        generator.write_parallel(args.count, out, workers=args.workers, **options)
+    else:
+        generator.write_batch(args.count, out, **options)
+
+def open_vault(vault):
+    """Return the session's vault, asking for the passphrase the first time"""
+    if vault is None:
+        passphrase = getpass.getpass(f"Passphrase for '{VAULT_PATH}': ")
+        vault = PasswordVault(VAULT_PATH, passphrase, sync_every=1)
+    return vault
+
 def interactive_mode():
     """Run the password generator in interactive mode with a menu interface"""
     generator = PasswordGenerator()
+    vault = None
     
     while True:
         print("\n===== PASSWORD GENERATOR =====")
         print("1. Generate a password")
         print("2. Check password strength")
         print("3. Password generation options")
-        print("4. Exit")
+        print("4. Look up a saved password")
+        print("5. Exit")
         print("==============================")
         
-        choice = input("Enter your choice (1-4): ")
+        choice = input("Enter your choice (1-5): ")
         
         if choice == '1':
             # Get saved options or use defaults
@@ -199,11 +2427,12 @@ def interactive_mode():
                 print(message)
                 print("-----------------------------")
                 
-                save = input("Save this password to file? (y/n): ").lower()
+                save = input("Save this password to the vault? (y/n): ").lower()
                 if save == 'y':
-                    with open("saved_passwords.txt", "a") as f:
-                        f.write(f"{password} - {message}\n")
-                    print("Password saved to 'saved_passwords.txt'")
+                    label = input("Label for this password: ")
+                    vault = open_vault(vault)
+                    vault.put(label, password, message)
+                    print(f"Password saved to '{VAULT_PATH}'")
             
             except ValueError as e:
                 print(f"Error: {e}")
@@ -271,11 +2500,332 @@ def interactive_mode():
                 print("Invalid input. Please enter a number when requested.")
         
         elif choice == '4':
+            label = input("Label to look up: ")
+            try:
+                vault = open_vault(vault)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
+            try:
+                entry = vault.get(label)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
+            if entry is None:
+                print(f"No password saved under '{label}'")
+            else:
+                print("\n----- Saved Password -----")
+                print(entry[0])
+                print(entry[1])
+                print("--------------------------")
+        
+        elif choice == '5':
+            if vault is not None:
+                vault.close()
             print("Thank you for using Password Generator. Goodbye!")
             break
         
         else:
             print("Invalid choice. Please try again.")
 
+def benchmark_batch(generator, count, options):
+    """Compare the per-password CLI loop against the bulk streaming generator"""
+    # Current path: one generate_password + check_password_strength + two prints per password
+    out = io.StringIO()
+    start = time.perf_counter()
+    for i in range(count):
+        password = generator.generate_password(**options)
+        strength, message = generator.check_password_strength(password)
+        print(f"\nPassword {i+1}:\n{password}", file=out)
+        print(message, file=out)
+    loop_time = time.perf_counter() - start
+    
+    out = io.StringIO()
+    start = time.perf_counter()
+    generator.write_batch(count, out, **options)
+    batch_time = time.perf_counter() - start
+    
+    print(f"Passwords: {count:,} (length {options['length']})")
+    print(f"Per-password loop: {loop_time:.3f}s ({count / loop_time:,.0f} passwords/sec)")
+    print(f"Streaming batch:   {batch_time:.3f}s ({count / batch_time:,.0f} passwords/sec)")
+    print(f"Speedup: {loop_time / batch_time:.1f}x")
+
+def benchmark_backends(generator, count, options):
+    """Compare batch generation throughput across randomness backends"""
+    print(f"Passwords: {count:,} (length {options['length']})")
+    baseline = None
+    for name in ['random', 'buffered', 'secrets']:
+        backend_generator = PasswordGenerator(backend=name)
+        start = time.perf_counter()
+        backend_generator.write_batch(count, io.StringIO(), **options)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{name:>8}: {elapsed:.3f}s ({count / elapsed:,.0f} passwords/sec, "
+              f"{elapsed / baseline:.1f}x the random backend)")
+
+def benchmark_parallel(generator, count, options):
+    """Measure parallel generation scaling and check shards for duplicates"""
+    print(f"Passwords: {count:,} (length {options['length']}, {os.cpu_count()} CPUs)")
+    baseline = None
+    for workers in [1, 2, 4, 8]:
+        start = time.perf_counter()
+        passwords = generator.generate_parallel(count, workers=workers,
+                                                chunk_size=max(1000, count // (workers * 8)),
+                                                **options)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        duplicates = len(passwords) - len(set(passwords))
+        print(f"{workers} workers: {elapsed:.3f}s ({count / elapsed:,.0f} passwords/sec, "
+              f"{baseline / elapsed:.1f}x scaling, {duplicates} duplicates)")
+
+def benchmark_scoring(generator, count, options):
+    """Compare check_password_strength in a loop against score_many"""
+    passwords = generator.generate_batch(count, **options)
+    
+    start = time.perf_counter()
+    for password in passwords:
+        generator.check_password_strength(password)
+    loop_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    scores = generator.score_many(passwords)
+    batch_time = time.perf_counter() - start
+    
+    sample = passwords[:1000]
+    assert list(scores[:1000]) == [generator.check_password_strength(p)[0] for p in sample]
+    print(f"Passwords: {count:,} (length {options['length']})")
+    print(f"check_password_strength loop: {loop_time:.3f}s ({count / loop_time:,.0f} passwords/sec)")
+    print(f"score_many:                   {batch_time:.3f}s ({count / batch_time:,.0f} passwords/sec)")
+    print(f"Speedup: {loop_time / batch_time:.1f}x")
+
+def benchmark_entropy(generator, count, options):
+    """Time the dictionary index cold build, warm load and per-password scoring"""
+    with open(WORDLIST_PATH, encoding='utf-8') as f:
+        words = [line.strip() for line in f]
+    start = time.perf_counter()
+    EntropyEstimator.build_index(words)
+    build_time = time.perf_counter() - start
+    
+    EntropyEstimator()  # make sure the cache file exists
+    start = time.perf_counter()
+    estimator = EntropyEstimator()
+    load_time = time.perf_counter() - start
+    
+    passwords = generator.generate_batch(count, **options)
+    passwords += ["Password123!", "qwerty2024", "correcthorse", "12/05/1990", "aaaaaa"] * (count // 5 + 1)
+    start = time.perf_counter()
+    for password in passwords:
+        estimator.estimate(password)
+    score_time = time.perf_counter() - start
+    
+    print(f"Wordlist: {len(words):,} words")
+    print(f"Cold index build: {build_time * 1000:.2f} ms")
+    print(f"Warm index load:  {load_time * 1000:.2f} ms")
+    print(f"Scoring: {score_time / len(passwords) * 1e6:.1f} µs/password over {len(passwords):,} passwords")
+
+def benchmark_policy(generator, count, options):
+    """Measure exact policy sampling throughput and check uniformity on a small policy"""
+    policies = [
+        ("default (1 of each)", {}),
+        ("exactly 2 digits", {'min_counts': {'digits': 2}, 'max_counts': {'digits': 2}}),
+        ("no ambiguous, no adjacent repeats", {'exclude_ambiguous': True, 'no_repeat_adjacent': True}),
+        ("all of the above, 3+ special", {'min_counts': {'digits': 2, 'special': 3},
+                                          'max_counts': {'digits': 2},
+                                          'exclude_ambiguous': True, 'no_repeat_adjacent': True}),
+    ]
+    print(f"Passwords: {count:,} (length {options['length']})")
+    for label, constraints in policies:
+        policy_options = dict(options, **constraints)
+        start = time.perf_counter()
+        generator.generate_batch(count, **policy_options)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>34}: {count / elapsed:,.0f} passwords/sec")
+    
+    # Every valid password of a tiny policy should come up equally often
+    for no_repeat in (False, True):
+        policy = PasswordPolicy({'letters': 'abc', 'digits': '01'}, 4,
+                                {'letters': 1, 'digits': 1}, no_repeat_adjacent=no_repeat)
+        sampler = PolicySampler(policy, generator.backend)
+        draws = 200 * sampler.total
+        observed = {}
+        for password in sampler.sample_many(draws):
+            observed[password] = observed.get(password, 0) + 1
+        expected = draws / sampler.total
+        chi_square = sum((observed.get(p, 0) - expected) ** 2 / expected for p in observed)
+        chi_square += (sampler.total - len(observed)) * expected
+        df = sampler.total - 1
+        # Wilson-Hilferty approximation of the chi-square upper tail
+        z = ((chi_square / df) ** (1 / 3) - (1 - 2 / (9 * df))) / math.sqrt(2 / (9 * df))
+        p_value = 0.5 * math.erfc(z / math.sqrt(2))
+        rule = "no adjacent repeats" if no_repeat else "min 1 of each"
+        print(f"Uniformity ({rule}, {sampler.total} passwords): "
+              f"chi-square {chi_square:.1f} on {df} df, p = {p_value:.3f}")
+
+def benchmark_vault(generator, count, options):
+    """Compare vault insert/lookup latency against appending to a text file"""
+    import tempfile
+    passwords = generator.generate_batch(count, **options)
+    labels = [f"account-{i}" for i in range(count)]
+    probes = [labels[generator.backend.randbelow(count)] for _ in range(min(count, 1000))]
+    text_probes = probes[:20]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, "saved_passwords.txt")
+        start = time.perf_counter()
+        for label, password in zip(labels, passwords):
+            with open(text_path, "a") as f:
+                f.write(f"{label} {password} - Strength\n")
+        text_insert = time.perf_counter() - start
+        start = time.perf_counter()
+        for label in text_probes:
+            prefix = label + " "
+            with open(text_path) as f:
+                next(line for line in f if line.startswith(prefix))
+        text_lookup = time.perf_counter() - start
+        
+        vault_path = os.path.join(tmp, "bench.vault")
+        start = time.perf_counter()
+        with PasswordVault(vault_path, "benchmark") as vault:
+            for label, password in zip(labels, passwords):
+                vault.put(label, password, "Strength")
+        vault_insert = time.perf_counter() - start
+        start = time.perf_counter()
+        with PasswordVault(vault_path, "benchmark") as vault:
+            open_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for label in probes:
+                vault.get(label)
+            vault_lookup = time.perf_counter() - start
+    
+    print(f"Entries: {count:,}")
+    print(f"Text file: {text_insert / count * 1e6:8.1f} µs/insert, "
+          f"{text_lookup / len(text_probes) * 1e6:10.1f} µs/lookup")
+    print(f"Vault:     {vault_insert / count * 1e6:8.1f} µs/insert, "
+          f"{vault_lookup / len(probes) * 1e6:10.1f} µs/lookup (open {open_time * 1000:.1f} ms)")
+
+def benchmark_guard(generator, count, options):
+    """Measure Bloom filter throughput, memory and false-positive rate"""
+    guard = PasswordGuard(capacity=count, error_rate=0.001)
+    breached = [os.urandom(20) for _ in range(count)]
+    start = time.perf_counter()
+    for digest in breached:
+        guard.filter.add_digest(digest)
+    add_time = time.perf_counter() - start
+    
+    unseen = [os.urandom(20) for _ in range(count)]
+    start = time.perf_counter()
+    false_positives = sum(guard.filter.contains_digest(digest) for digest in unseen)
+    lookup_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    generator.generate_batch(count, **options)
+    plain_time = time.perf_counter() - start
+    start = time.perf_counter()
+    generator.generate_batch(count, guard=guard, **options)
+    guarded_time = time.perf_counter() - start
+    
+    stats = guard.stats()
+    print(f"Items: {count:,} breached + {count:,} issued")
+    print(f"Filter: {stats['filter_bytes'] / 2**20:.2f} MiB ({stats['filter_bytes'] * 8 / count:.1f} bits/breached item), "
+          f"{guard.filter.hashes} hashes")
+    print(f"Add: {add_time / count * 1e6:.2f} µs/item, lookup: {lookup_time / count * 1e6:.2f} µs/item")
+    print(f"False positives at capacity: {false_positives / count:.4%} measured, 0.1000% target")
+    print(f"Generation: {count / plain_time:,.0f} passwords/sec plain, "
+          f"{count / guarded_time:,.0f} with guard ({stats['rejected']} rejected)")
+
+def benchmark_passphrase(generator, count, options):
+    """Time wordlist startup (text parse vs memory map) and passphrase generation"""
+    Wordlist(PASSPHRASE_WORDLIST_PATH).close()  # make sure the compiled file exists
+    runs = 100
+    start = time.perf_counter()
+    for _ in range(runs):
+        with open(PASSPHRASE_WORDLIST_PATH, encoding='utf-8') as f:
+            words = [line.strip() for line in f if line.strip()]
+    parse_time = (time.perf_counter() - start) / runs
+    start = time.perf_counter()
+    for _ in range(runs):
+        Wordlist(PASSPHRASE_WORDLIST_PATH).close()
+    map_time = (time.perf_counter() - start) / runs
+    
+    start = time.perf_counter()
+    generator.generate_passphrases(count)
+    elapsed = time.perf_counter() - start
+    
+    print(f"Wordlist: {len(words):,} words ({math.log2(len(words)):.1f} bits/word)")
+    print(f"Startup: {parse_time * 1e6:.0f} µs parsing text, {map_time * 1e6:.0f} µs memory-mapping")
+    print(f"Generation: {count / elapsed:,.0f} six-word passphrases/sec")
+
+async def _load_test(host, port, requests, concurrency, target):
+    """Send requests over concurrent keep-alive connections; returns (latencies, elapsed)"""
+    latencies = []
+    request = f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1')
+    
+    async def client(n):
+        reader, writer = await asyncio.open_connection(host, port)
+        for _ in range(n):
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(re.search(rb'Content-Length: (\d+)', head).group(1))
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(client(requests // concurrency + (i < requests % concurrency))
+                           for i in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def benchmark_serve(generator, count, options):
+    """Load-test the serve mode against starting a new process for every password"""
+    import subprocess
+    
+    script = os.path.abspath(__file__)
+    server = subprocess.Popen([sys.executable, script, 'serve', '--port', '0'],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        line = server.stdout.readline()
+        host, port = re.search(r'http://([^:]+):(\d+)', line).groups()
+        rows = []
+        for target in ('/password', '/password?length=20&exact_digits=4&no_repeat=1'):
+            for concurrency in (1, 16):
+                latencies, elapsed = asyncio.run(_load_test(host, int(port), count, concurrency, target))
+                rows.append((f"serve {target[:30]} x{concurrency}", latencies, elapsed))
+    finally:
+        server.terminate()
+        server.wait()
+    
+    calls = min(count, 50)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(calls):
+        call_start = time.perf_counter()
+        subprocess.run([sys.executable, script, '-c', '1', '--stream'],
+                       stdout=subprocess.DEVNULL, check=True)
+        latencies.append(time.perf_counter() - call_start)
+    rows.append(("subprocess per call", latencies, time.perf_counter() - start))
+    
+    print(f"{'mode':<42} {'p50':>10} {'p99':>10} {'req/s':>10}")
+    for name, latencies, elapsed in rows:
+        print(f"{name:<42} {_percentile(latencies, 0.5) * 1e3:>8.3f}ms "
+              f"{_percentile(latencies, 0.99) * 1e3:>8.3f}ms {len(latencies) / elapsed:>10,.0f}")
+
+BENCHMARKS = {
+    'batch': benchmark_batch,
+    'backends': benchmark_backends,
+    'parallel': benchmark_parallel,
+    'scoring': benchmark_scoring,
+    'entropy': benchmark_entropy,
+    'policy': benchmark_policy,
+    'vault': benchmark_vault,
+    'guard': benchmark_guard,
+    'passphrase': benchmark_passphrase,
+    'serve': benchmark_serve,
+}
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,192 @@
+import importlib.util
+import json
+import os
+import random
+import shutil
+import struct
+import tempfile
+import unittest
+from array import array
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec = importlib.util.spec_from_file_location('expense_tracker', os.path.join(ROOT, 'expense-tracker.py'))
+et = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(et)
+
+def read_columnar(path):
+    """Decode a ColumnarReport file into (meta, [(date, cents, category, description)], footer)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data[:8] == et.ColumnarReport.MAGIC
+    length, = struct.unpack_from('<I', data, 8)
+    meta = json.loads(data[12:12 + length])
+    pos, rows = 12 + length, []
+    while True:
+        count, = struct.unpack_from('<I', data, pos)
+        if count == 0:
+            break
+        length, = struct.unpack_from('<I', data, pos + 4)
+        names = json.loads(data[pos + 8:pos + 8 + length])
+        pos += 8 + length
+        days, cents, lengths = array('i'), array('q'), array('I')
+        days.frombytes(data[pos:pos + 4 * count])
+        pos += 4 * count
+        cents.frombytes(data[pos:pos + 8 * count])
+        pos += 8 * count
+        codes = data[pos:pos + count]
+        pos += count
+        lengths.frombytes(data[pos:pos + 4 * count])
+        pos += 4 * count
+        for day, amount, code, size in zip(days, cents, codes, lengths):
+            rows.append((et.format_date(day), amount, names[code], data[pos:pos + size].decode('utf-8')))
+            pos += size
+    length, = struct.unpack_from('<I', data, pos + 4)
+    return meta, rows, json.loads(data[pos + 8:pos + 8 + length])
+
+class TrackerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.trackers = []
+
+    def tearDown(self):
+        for tracker in self.trackers:
+            tracker.close()
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def open(self, name, **options):
+        tracker = et.ExpenseTracker(self.path(name), **options)
+        self.trackers.append(tracker)
+        return tracker
+
+class ExportTest(TrackerTestCase):
+    def write_legacy_ledger(self, name):
+        # Written by an older version, with categories outside CATEGORIES
+        expenses = [{'date': '2024-01-05', 'amount': 12.5, 'category': 'Groceries', 'description': 'milk'},
+                    {'date': '2024-01-09', 'amount': 3.0, 'category': 'Food', 'description': 'tea'},
+                    {'date': '2024-02-02', 'amount': 7.25, 'category': 'Pets', 'description': 'kibble'},
+                    {'date': '2024-02-03', 'amount': 1.0, 'category': 'Groceries', 'description': 'bread'}]
+        with open(self.path(name), 'w') as f:
+            json.dump(expenses, f)
+        return [(e['date'], round(e['amount'] * 100), e['category'], e['description']) for e in expenses]
+
+    def test_columnar_export_of_unknown_categories(self):
+        expected = self.write_legacy_ledger('legacy.json')
+        for lazy in (True, False):
+            with self.subTest(lazy=lazy):
+                tracker = self.open('legacy.json', lazy=lazy)
+                for _ in range(2):  # the second export reuses the cached months
+                    et.export_report(tracker, self.path('report.cols'), 'cols')
+                    _, rows, footer = read_columnar(self.path('report.cols'))
+                    self.assertEqual(rows, expected)
+                    self.assertEqual(footer['totals'], {'Groceries': 1350, 'Food': 300, 'Pets': 725})
+                tracker.close()
+
+class SidecarTest(TrackerTestCase):
+    EXPENSES = [{'date': '2024-01-05', 'amount': 12.5, 'category': 'Food', 'description': 'lunch'},
+                {'date': '2024-02-02', 'amount': 40.0, 'category': 'Bills', 'description': 'phone'}]
+
+    def write_ledger(self, name):
+        with open(self.path(name), 'w') as f:
+            json.dump(self.EXPENSES, f)
+
+    def test_opening_writes_nothing(self):
+        self.write_ledger('ledger.json')
+        for lazy in (True, False):
+            with self.subTest(lazy=lazy):
+                # The caches cannot be written: their temporary paths are taken by directories
+                os.mkdir(self.path('ledger.json.cols.tmp'))
+                os.mkdir(self.path('ledger.json.rollups.tmp'))
+                tracker = self.open('ledger.json', lazy=lazy)
+                self.assertEqual(tracker.get_category_breakdown(), {'Food': 12.5, 'Bills': 40.0})
+                self.assertEqual(len(tracker.get_expense_report('2024-01-01', '2024-12-31')), 2)
+                tracker.close()
+                self.assertEqual(sorted(os.listdir(self.directory)),
+                                 ['ledger.json', 'ledger.json.cols.tmp', 'ledger.json.rollups.tmp'])
+                os.rmdir(self.path('ledger.json.cols.tmp'))
+                os.rmdir(self.path('ledger.json.rollups.tmp'))
+
+    def test_first_write_creates_journal(self):
+        self.write_ledger('ledger.json')
+        reader, writer = self.open('ledger.json'), self.open('ledger.json')
+        writer.add_expense(5, 'Food', 'snack', '2024-02-03')
+        self.assertTrue(os.path.exists(self.path('ledger.json.journal')))
+        self.assertTrue(os.path.exists(self.path('ledger.json.lock')))
+        self.assertEqual(reader.get_category_breakdown()['Food'], 17.5)
+        reader.add_expense(1, 'Food', 'gum', '2024-02-04')
+        self.assertEqual(writer.get_category_breakdown()['Food'], 18.5)
+        self.assertEqual(self.open('ledger.json').verify_rollups(), [])
+
+class AnalyticsTest(TrackerTestCase):
+    def test_rolling_window_must_be_positive(self):
+        for name in ('rolling.json', 'rolling.db'):
+            tracker = self.open(name)
+            tracker.add_expense(10, 'Food', 'lunch', '2024-03-01')
+            self.assertEqual(tracker.moving_average('2024-03-01', '2024-03-02', 2),
+                             {'2024-03-01': 5.0, '2024-03-02': 5.0})
+            for days in (0, -3, 1.5):
+                with self.subTest(backend=name, days=days):
+                    with self.assertRaises(ValueError):
+                        tracker.rolling_totals('2024-03-01', '2024-03-31', days)
+                    with self.assertRaises(ValueError):
+                        tracker.moving_average('2024-03-01', '2024-03-31', days)
+
+class RollupConsistencyTest(TrackerTestCase):
+    STEPS = 60
+
+    def random_expense(self, rng):
+        return {'date': et.format_date(et.parse_date('2023-11-20') + rng.randrange(100)),
+                'amount': rng.randrange(1, 100000) / 100, 'category': rng.choice(et.CATEGORIES),
+                'description': f"item {rng.randrange(1000)}"}
+
+    def check(self, tracker, expected):
+        self.assertEqual(tracker.verify_rollups(), [])
+        totals = {}
+        for expense in expected:
+            cents = round(expense['amount'] * 100)
+            totals[expense['category']] = totals.get(expense['category'], 0) + cents
+        breakdown = tracker.get_category_breakdown()
+        self.assertEqual({name: round(amount * 100) for name, amount in breakdown.items() if amount}, totals)
+
+    def run_sequence(self, name, seed, **options):
+        rng = random.Random(seed)
+        tracker, expected = self.open(name, **options), []
+        for _ in range(self.STEPS):
+            step = rng.choice(['add', 'add', 'import', 'other writer', 'compact', 'reopen'])
+            if step == 'add':
+                expense = self.random_expense(rng)
+                tracker.add_expense(expense['amount'], expense['category'], expense['description'], expense['date'])
+                expected.append(expense)
+            elif step == 'import':
+                batch = [self.random_expense(rng) for _ in range(rng.randrange(1, 40))]
+                tracker.import_many(batch, batch_size=rng.randrange(1, 10))
+                expected.extend(batch)
+            elif step == 'other writer':
+                expense = self.random_expense(rng)
+                other = self.open(name, **options)
+                other.add_expense(expense['amount'], expense['category'], expense['description'], expense['date'])
+                other.close()
+                expected.append(expense)
+                tracker.refresh()
+            elif step == 'compact':
+                tracker.compact()
+            else:
+                tracker.close()
+                tracker = self.open(name, **options)
+            self.check(tracker, expected)
+
+    def test_random_sequences_keep_rollups_consistent(self):
+        for seed in range(4):
+            for lazy in (True, False):
+                with self.subTest(seed=seed, lazy=lazy):
+                    self.run_sequence(f'ledger-{seed}-{lazy}.json', seed, lazy=lazy)
+
+    def test_random_sequences_on_sqlite(self):
+        for seed in range(2):
+            with self.subTest(seed=seed):
+                self.run_sequence(f'ledger-{seed}.db', seed)
+
+if __name__ == '__main__':
+    unittest.main()
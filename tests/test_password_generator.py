@@ -0,0 +1,312 @@
+import asyncio
+import contextlib
+import io
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from itertools import product
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import password_generator
+from password_generator import (AMBIGUOUS_CHARS, AEAD_VAULT_MAGIC, BACKENDS, VAULT_MAGIC, PasswordGenerator,
+                                PasswordGuard, PasswordPolicy, PasswordService, PasswordVault, PolicySampler,
+                                RandomBackend, _generate_chunk)
+
+def allowed(policy, password):
+    """Brute-force check of one password against a policy"""
+    if len(password) != policy.length:
+        return False
+    counts = {name: 0 for name in policy.char_sets}
+    for c in password:
+        name = next((name for name, chars in policy.char_sets.items() if c in chars), None)
+        if name is None:
+            return False
+        counts[name] += 1
+    for name, count in counts.items():
+        maximum = policy.max_counts[name]
+        if count < policy.min_counts[name] or (maximum is not None and count > maximum):
+            return False
+    if policy.no_repeat_adjacent and any(a == b for a, b in zip(password, password[1:])):
+        return False
+    return True
+
+def chi_square_p_value(observed, total, draws):
+    """Upper tail p-value of a chi-square test of draws against the uniform distribution"""
+    expected = draws / total
+    chi_square = sum((count - expected) ** 2 / expected for count in observed.values())
+    chi_square += (total - len(observed)) * expected
+    df = total - 1
+    # Wilson-Hilferty approximation of the chi-square upper tail
+    z = ((chi_square / df) ** (1 / 3) - (1 - 2 / (9 * df))) / math.sqrt(2 / (9 * df))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+class PolicySamplerTest(unittest.TestCase):
+    SMALL_POLICIES = [
+        ("min 1 of each", {}),
+        ("exact counts", {'min_counts': {'letters': 2}, 'max_counts': {'letters': 2}}),
+        ("no adjacent repeats", {'no_repeat_adjacent': True}),
+        ("everything", {'min_counts': {'digits': 2}, 'max_counts': {'letters': 2},
+                        'exclude': 'c', 'no_repeat_adjacent': True}),
+    ]
+
+    def small_policy(self, **rules):
+        rules.setdefault('min_counts', {'letters': 1, 'digits': 1})
+        return PasswordPolicy({'letters': 'abc', 'digits': '012'}, 4, **rules)
+
+    def test_total_matches_brute_force(self):
+        for name, rules in self.SMALL_POLICIES:
+            with self.subTest(name):
+                policy = self.small_policy(**rules)
+                pool = ''.join(policy.char_sets.values())
+                valid = sum(allowed(policy, ''.join(p)) for p in product(pool, repeat=policy.length))
+                self.assertEqual(PolicySampler(policy, RandomBackend(1)).total, valid)
+
+    def test_uniform_over_every_valid_password(self):
+        for name, rules in self.SMALL_POLICIES:
+            with self.subTest(name):
+                sampler = PolicySampler(self.small_policy(**rules), RandomBackend(7))
+                draws = 100 * sampler.total
+                observed = {}
+                for password in sampler.sample_many(draws):
+                    self.assertTrue(allowed(sampler.policy, password), password)
+                    observed[password] = observed.get(password, 0) + 1
+                self.assertEqual(len(observed), sampler.total)
+                self.assertGreater(chi_square_p_value(observed, sampler.total, draws), 1e-4)
+
+    def test_uniform_over_required_positions(self):
+        # The required digit must not favour any position
+        sampler = PolicySampler(PasswordPolicy({'letters': 'abcdefgh', 'digits': '0'}, 6,
+                                               {'digits': 1}, {'digits': 1}), RandomBackend(3))
+        positions = [0] * 6
+        draws = 60000
+        for password in sampler.sample_many(draws):
+            positions[password.index('0')] += 1
+        observed = {i: count for i, count in enumerate(positions)}
+        self.assertGreater(chi_square_p_value(observed, 6, draws), 1e-4)
+
+class PolicyConstraintTest(unittest.TestCase):
+    def setUp(self):
+        self.generators = [PasswordGenerator(name) for name in BACKENDS]
+
+    def generate(self, **options):
+        options.setdefault('length', 16)
+        for generator in self.generators:
+            yield from generator.generate_batch(500, **options)
+
+    def test_exact_minimums_per_class(self):
+        generator = self.generators[0]
+        for password in self.generate(min_counts={'digits': 3, 'special': 2, 'uppercase': 0},
+                                      max_counts={'digits': 3}):
+            self.assertEqual(sum(c in generator.digits for c in password), 3)
+            self.assertGreaterEqual(sum(c in generator.special_chars for c in password), 2)
+            self.assertGreaterEqual(sum(c in generator.lowercase_letters for c in password), 1)
+
+    def test_min_of_each(self):
+        generator = self.generators[0]
+        for password in self.generate(min_of_each=3):
+            for chars in (generator.lowercase_letters, generator.uppercase_letters,
+                          generator.digits, generator.special_chars):
+                self.assertGreaterEqual(sum(c in chars for c in password), 3)
+
+    def test_exclude(self):
+        for password in self.generate(exclude='aeiouAEIOU0'):
+            self.assertFalse(set(password) & set('aeiouAEIOU0'), password)
+
+    def test_exclude_ambiguous(self):
+        for password in self.generate(exclude_ambiguous=True):
+            self.assertFalse(set(password) & set(AMBIGUOUS_CHARS), password)
+
+    def test_no_repeat_adjacent(self):
+        # Few characters, so repeats would be common without the rule
+        for password in self.generate(use_uppercase=False, use_special=False, use_lowercase=False,
+                                      length=40, no_repeat_adjacent=True, exclude='23456789'):
+            self.assertFalse(any(a == b for a, b in zip(password, password[1:])), password)
+            self.assertLessEqual(set(password), set('01'))
+
+    def test_unsatisfiable_policies_are_rejected(self):
+        generator = self.generators[0]
+        cases = [
+            {'length': 4, 'min_of_each': 2},
+            {'length': 20, 'use_uppercase': False, 'use_special': False, 'use_digits': False,
+             'max_counts': {'lowercase': 10}},
+            {'min_counts': {'digits': 3}, 'max_counts': {'digits': 2}},
+            {'min_counts': {'digits': 1}, 'exclude': '0123456789'},
+            {'use_lowercase': False, 'use_uppercase': False, 'use_digits': False, 'use_special': False},
+            {'min_counts': {'emoji': 1}},
+        ]
+        for options in cases:
+            with self.subTest(options=options):
+                with self.assertRaises(ValueError):
+                    generator.generate_password(**options)
+
+    def test_policy_with_no_valid_password_is_rejected(self):
+        # Only one character, but it may not repeat
+        policy = PasswordPolicy({'digits': '7'}, 2, no_repeat_adjacent=True)
+        with self.assertRaises(ValueError):
+            PolicySampler(policy, RandomBackend(1))
+
+@unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), "needs forked workers")
+class ParallelGenerationTest(unittest.TestCase):
+    OPTIONS = {'length': 16}
+
+    def test_forked_workers_get_independent_streams(self):
+        # Every worker forks from the same seeded parent, so a stream derived from it would repeat
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                random.seed(1234)
+                # One fresh process per chunk, each forked from the seeded parent
+                with multiprocessing.get_context('fork').Pool(4, maxtasksperchild=1) as pool:
+                    chunks = pool.map(_generate_chunk, [(backend, 200, self.OPTIONS)] * 16, chunksize=1)
+                self.assertEqual(len(set(chunks)), len(chunks))
+                passwords = '\n'.join(chunks).split('\n')
+                self.assertEqual(len(set(passwords)), len(passwords))
+
+    def test_chunks_in_one_worker_differ(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                random.seed(1234)
+                first = _generate_chunk((backend, 100, self.OPTIONS))
+                random.seed(1234)
+                self.assertNotEqual(_generate_chunk((backend, 100, self.OPTIONS)), first)
+
+    def test_no_duplicates_across_shards(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                random.seed(1234)
+                generator = PasswordGenerator(backend)
+                passwords = generator.generate_parallel(20000, workers=4, chunk_size=500,
+                                                        min_counts={'digits': 2}, **self.OPTIONS)
+                self.assertEqual(len(passwords), 20000)
+                self.assertEqual(len(set(passwords)), len(passwords))
+                self.assertTrue(all(len(p) == 16 and sum(c.isdigit() for c in p) >= 2 for p in passwords))
+
+class PasswordServiceTest(unittest.TestCase):
+    def run_service(self, test, **options):
+        """Run the coroutine test(service) in an event loop, so pools can refill"""
+        return asyncio.run(test(PasswordService(PasswordGenerator(), **options)))
+
+    def test_guard_records_passwords_when_served(self):
+        guard = PasswordGuard(capacity=10000)
+
+        async def test(service):
+            served = service.respond('GET', '/password?count=5')[1].split()
+            await self.refilled(service)
+            pool = service._pools[next(iter(service._pools))]
+            self.assertEqual(len(pool), 100)
+            self.assertEqual(guard.filter.items, 5)
+            # A pooled password issued elsewhere in the meantime is swapped out, not served
+            guard.issue(pool[0])
+            served += service.respond('GET', '/password?count=10')[1].split()
+            self.assertEqual(guard.filter.items, 16)
+            self.assertEqual(guard.rejected, 1)
+            self.assertEqual(len(set(served)), 15)
+            self.assertTrue(all(guard.is_known(password) for password in served))
+            await self.refilled(service)
+        self.run_service(test, pool_size=100, guard=guard)
+
+    @staticmethod
+    async def refilled(service):
+        while service._refilling:
+            await asyncio.sleep(0)
+
+    def test_pool_survives_sampler_cache_eviction(self):
+        async def test(service):
+            service.respond('GET', '/password?length=16')
+            await self.refilled(service)
+            pools = len(service._pools)
+            # More policies than the generator caches samplers for
+            for length in range(20, 60):
+                service.respond('GET', f'/password?length={length}')
+            hits = service.pool_hits
+            self.assertEqual(service.respond('GET', '/password?length=16')[0], 200)
+            self.assertEqual(service.pool_hits, hits + 1)
+            self.assertEqual(len(service._pools), pools + 40)
+            await self.refilled(service)
+        self.run_service(test, pool_size=20)
+
+    def test_unexpected_errors_return_500(self):
+        async def test(service):
+            def broken(query):
+                raise RuntimeError("boom")
+            service.passwords = broken
+            reader = asyncio.StreamReader()
+            reader.feed_data(b"GET /password HTTP/1.1\r\nConnection: close\r\n\r\n")
+            reader.feed_eof()
+            written = []
+
+            class Writer:
+                write = written.append
+                def close(self):
+                    pass
+                async def drain(self):
+                    pass
+            with contextlib.redirect_stderr(io.StringIO()):
+                await service.handle(reader, Writer())
+            return b"".join(written)
+        response = self.run_service(test)
+        self.assertTrue(response.startswith(b"HTTP/1.1 500 Internal Server Error\r\n"), response)
+
+class PasswordVaultTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test.vault')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def magic(self):
+        with open(self.path, 'rb') as f:
+            return f.read(8)
+
+    def check_round_trip(self):
+        with PasswordVault(self.path, "secret") as vault:
+            vault.put('mail', 'hunter2', 'Weak')
+            vault.put('bank', 'correct horse', 'Strong')
+        with PasswordVault(self.path, "secret") as vault:
+            self.assertEqual(vault.get('mail'), ('hunter2', 'Weak'))
+            self.assertEqual(vault['bank'][0], 'correct horse')
+        with self.assertRaises(ValueError):
+            PasswordVault(self.path, "wrong")
+        # Flip one byte of the last record's ciphertext
+        with open(self.path, 'r+b') as f:
+            f.seek(-20, os.SEEK_END)
+            byte = f.read(1)
+            f.seek(-20, os.SEEK_END)
+            f.write(bytes([byte[0] ^ 1]))
+        with PasswordVault(self.path, "secret") as vault:
+            self.assertEqual(vault['mail'][0], 'hunter2')
+            with self.assertRaises(ValueError):
+                vault.get('bank')
+
+    @unittest.skipIf(password_generator.ChaCha20Poly1305 is None, "needs the cryptography package")
+    def test_new_vaults_use_aead(self):
+        self.check_round_trip()
+        self.assertEqual(self.magic(), AEAD_VAULT_MAGIC)
+
+    def test_blake2b_vaults(self):
+        with mock.patch.object(password_generator, 'ChaCha20Poly1305', None):
+            self.check_round_trip()
+        self.assertEqual(self.magic(), VAULT_MAGIC)
+        # Still readable, and still in the same format, once cryptography is available
+        with PasswordVault(self.path, "secret") as vault:
+            vault.put('shop', 'swordfish')
+        with PasswordVault(self.path, "secret") as vault:
+            self.assertEqual(vault['shop'][0], 'swordfish')
+        self.assertEqual(self.magic(), VAULT_MAGIC)
+
+    def test_aead_vault_without_cryptography_is_rejected(self):
+        with open(self.path, 'wb') as f:
+            f.write(password_generator.VAULT_HEADER.pack(AEAD_VAULT_MAGIC, bytes(16), bytes(32), bytes(8)))
+        with mock.patch.object(password_generator, 'ChaCha20Poly1305', None):
+            with self.assertRaisesRegex(ValueError, "cryptography"):
+                PasswordVault(self.path, "secret")
+
+if __name__ == '__main__':
+    unittest.main()